@@ -1,10 +1,15 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Union, Any
+from typing import Callable, Optional, Union, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
+from cache_utils import TTLCache
+
 load_dotenv()
 
 # Config
@@ -20,6 +25,60 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# --- Off-Loop Password Hashing ---
+# A bcrypt hash or verify takes ~200 ms of CPU. Request handlers run them on
+# a dedicated pool (bcrypt releases the GIL) so the event loop keeps serving
+# other requests; PASSWORD_HASH_WORKERS caps how many run at once and the
+# rest wait in the pool's queue.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+class PasswordHashPool:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.pending = 0  # submitted and not yet finished
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.total_queue_wait = 0.0
+        self.total_run_time = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            return started, fn(*args)
+
+        self.pending += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, self.pending - self.workers)
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.total_queue_wait += started - submitted
+        self.total_run_time += time.perf_counter() - started
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": min(self.pending, self.workers),
+            "queue_depth": max(0, self.pending - self.workers),
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "avg_queue_wait_ms": round(self.total_queue_wait / self.completed * 1000, 1) if self.completed else 0.0,
+            "avg_run_ms": round(self.total_run_time / self.completed * 1000, 1) if self.completed else 0.0,
+        }
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -31,9 +90,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Tokens whose signature and claims were already verified, mapped to their
+# payloads. An entry lives until the token's `exp` at the latest, so a hit
+# skips the HMAC check and claim parsing without ever accepting an expired
+# token. Invalid tokens are not cached.
+token_cache = TTLCache(
+    "tokens",
+    ttl_seconds=float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "900")),
+    max_entries=int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "8192")),
+)
+
 def decode_access_token(token: str) -> Optional[dict]:
+    payload = token_cache.get(token)
+    if payload is not None:
+        return dict(payload)
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    expires_at = payload.get("exp")
+    ttl = expires_at - time.time() if isinstance(expires_at, (int, float)) else None
+    if ttl is None or ttl > 0:
+        token_cache.set(token, payload, ttl_seconds=ttl)
+    return dict(payload)
@@ -0,0 +1,102 @@
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Bumped on every invalidation so a read that raced a write can't
+        # repopulate the cache with pre-write data.
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        """
+        Stores `value`. If `version` is given and stale, the write is dropped.
+        `ttl_seconds` can shorten (never extend) this entry's lifetime.
+        """
+        if version is not None and version != self.version:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self.version += 1
+        self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        self.version += 1
+        for key in [k for k in self._entries if predicate(k)]:
+            del self._entries[key]
+
+    def clear(self):
+        self.version += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# --- Invalidation Registry ---
+# Caches register a callback per MongoDB collection they mirror. Change events
+# (from this process or from the change-stream watcher in db.py) are published
+# here so every registered cache can drop what the write made stale.
+
+ChangeListener = Callable[[str, dict], None]
+
+_listeners: Dict[str, List[ChangeListener]] = defaultdict(list)
+
+
+def register_invalidation_listener(collections: Iterable[str], listener: ChangeListener):
+    """Calls `listener(collection, event)` for every change published on `collections`."""
+    for collection in collections:
+        _listeners[collection].append(listener)
+
+
+def watched_collections() -> Set[str]:
+    return set(_listeners)
+
+
+def publish_change(collection: str, event: dict):
+    """
+    Fans a change event out to the listeners of `collection`.
+
+    `event` has the shape of a MongoDB change-stream event; listeners should
+    treat a missing `fullDocument` as "anything in this collection may have
+    changed".
+    """
+    for listener in _listeners.get(collection, []):
+        listener(collection, event)
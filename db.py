@@ -1,23 +1,55 @@
 import os
-from typing import List, Optional, Any
+import asyncio
+import base64
+from collections import defaultdict
+from typing import Callable, List, Optional, Any, Tuple
 from datetime import datetime, timezone, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import ASCENDING, DESCENDING
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, UpdateOne, UpdateMany, DeleteOne
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError, PyMongoError
 from dotenv import load_dotenv
 from bson.objectid import ObjectId
+from bson import json_util
+
+from cache_utils import TTLCache, register_invalidation_listener, watched_collections, publish_change
+from plan_utils import diff_plans, apply_plan_delta
+from memory_db import MemoryClient
 
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+# "mongo" talks to MONGODB_URI through Motor. "memory" keeps every collection
+# in this process (memory_db.MemoryClient exposes the same async collection
+# API the helpers below use), so benchmarks and load tests run without a server.
+DB_BACKENDS = ("mongo", "memory")
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo")
 DB_NAME = "campus_agent_db"
 COLLECTION_NAME = "generations"
+# Documents fetched per round trip by the streaming iter_* helpers
+STREAM_BATCH_SIZE = int(os.getenv("MONGODB_STREAM_BATCH_SIZE", "500"))
+# Documents sent per insert_many/bulk_write call by the bulk writers
+BULK_WRITE_CHUNK_SIZE = int(os.getenv("MONGODB_BULK_CHUNK_SIZE", "1000"))
 
 client = None
 db = None
 
+# Workspace reference data read on nearly every view. Cached per
+# (collection, workspace_id, projection) and invalidated by the write helpers.
+REFERENCE_COLLECTIONS = ("buildings", "rooms", "departments", "degrees", "programs", "courses", "holiday_rules")
+reference_cache = TTLCache(
+    "reference",
+    ttl_seconds=float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("REFERENCE_CACHE_MAX_ENTRIES", "1024")),
+)
+
 def get_database():
     global client, db
     if client is None:
+        if DB_BACKEND == "memory":
+            client = MemoryClient()
+            db = client[DB_NAME]
+            print("Using the in-memory database backend.")
+            return db
         try:
             print(f"Connecting to MongoDB at {MONGODB_URI}")
             client = AsyncIOMotorClient(MONGODB_URI)
@@ -28,6 +60,225 @@ def get_database():
             raise e
     return db
 
+def use_database_backend(backend: str):
+    """
+    Switches every helper in this module to `backend` ("mongo" or "memory").
+
+    Drops the current connection and every cache (reference data, users,
+    workspace members); meant for benchmark and test harnesses, before any
+    requests are served.
+    """
+    global DB_BACKEND, client, db
+    if backend not in DB_BACKENDS:
+        raise ValueError(f"Unknown database backend '{backend}'; expected one of {', '.join(DB_BACKENDS)}")
+    if client is not None:
+        client.close()
+    DB_BACKEND = backend
+    client = None
+    db = None
+    reference_cache.clear()
+    user_cache.clear()
+    workspace_member_cache.clear()
+    return get_database()
+
+# --- Index Registry ---
+# Compound indexes matching the query shapes used by the helpers below.
+# Every collection reachable through the generic CRUD routes gets at least a
+# workspace_id-prefixed index so `delete_document`/`update_document` never scan.
+
+INDEXES = {
+    COLLECTION_NAME: [
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "students": [
+        IndexModel([("workspace_id", ASCENDING), ("batch_year", ASCENDING), ("program_id", ASCENDING), ("semester", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("id", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("enrolled_courses", ASCENDING)]),
+    ],
+    "rooms": [
+        IndexModel([("workspace_id", ASCENDING), ("building_id", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "buildings": [IndexModel([("workspace_id", ASCENDING), ("id", ASCENDING)])],
+    "departments": [IndexModel([("workspace_id", ASCENDING), ("id", ASCENDING)])],
+    "degrees": [IndexModel([("workspace_id", ASCENDING)])],
+    "programs": [IndexModel([("workspace_id", ASCENDING)])],
+    "exams": [IndexModel([("workspace_id", ASCENDING)])],
+    "courses": [
+        IndexModel([("workspace_id", ASCENDING), ("semester", ASCENDING), ("batch_ids", ASCENDING)]),
+        IndexModel([("workspace_id", ASCENDING), ("code", ASCENDING)]),
+    ],
+    "exam_cycles": [IndexModel([("workspace_id", ASCENDING), ("semester", ASCENDING), ("batch_year", ASCENDING)])],
+    "calendar_events": [IndexModel([("workspace_id", ASCENDING), ("date", ASCENDING)])],
+    "holiday_rules": [IndexModel([("workspace_id", ASCENDING)])],
+    "enrollments": [IndexModel([("workspace_id", ASCENDING), ("course_code", ASCENDING)], unique=True)],
+    "users": [IndexModel([("email", ASCENDING)], unique=True)],
+    "workspaces": [
+        IndexModel([("owner_id", ASCENDING)]),
+        IndexModel([("members", ASCENDING)]),
+    ],
+    "invitations": [IndexModel([("token", ASCENDING)], unique=True)],
+    "exam_plans": [
+        # Legacy unversioned plans (saved before the version chain) are read by created_at
+        IndexModel([("workspace_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel(
+            [("workspace_id", ASCENDING), ("version", ASCENDING)],
+            unique=True, partialFilterExpression={"version": {"$exists": True}}
+        ),
+    ],
+    "exam_plan_heads": [IndexModel([("workspace_id", ASCENDING)], unique=True)],
+    "assignments": [
+        IndexModel([("workspace_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("reminder_sent", ASCENDING), ("deadline", ASCENDING)]),
+    ],
+    "assignment_rosters": [IndexModel([("assignment_id", ASCENDING), ("roll_number", ASCENDING)], unique=True)],
+    "seat_allocations": [
+        IndexModel([("workspace_id", ASCENDING), ("exam_date", ASCENDING), ("exam_session", ASCENDING), ("room_id", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("allocation_id", ASCENDING)]),
+    ],
+    "seat_allocation_slots": [
+        IndexModel([("workspace_id", ASCENDING), ("exam_date", ASCENDING), ("exam_session", ASCENDING)], unique=True),
+    ],
+    "assignment_submissions": [
+        IndexModel([("assignment_id", ASCENDING), ("roll_number", ASCENDING)], unique=True),
+        IndexModel([("assignment_id", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+async def ensure_indexes():
+    """Creates every index in INDEXES. Idempotent, meant to run once at startup."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                # e.g. a unique index over pre-existing duplicates; keep the app bootable
+                print(f"Failed to create index {index.document['name']} on {collection_name}: {e}")
+
+# --- Cross-Worker Cache Coherence ---
+
+CHANGE_STREAM_OPERATIONS = ["insert", "update", "replace", "delete", "drop", "rename", "invalidate"]
+CHANGE_STREAMS_NOT_SUPPORTED = 40573  # "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_HISTORY_LOST = 286
+
+async def watch_cache_invalidations(retry_seconds: float = 5.0):
+    """
+    Tails a database-level change stream over every collection a cache has
+    registered for and publishes each event through cache_utils, so writes
+    made by other uvicorn workers invalidate this process's caches too.
+
+    Needs a replica set (a single-node one is enough). On a standalone server
+    it logs once and returns, leaving only same-process invalidation.
+    """
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    collections = sorted(watched_collections())
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": collections},
+        "operationType": {"$in": CHANGE_STREAM_OPERATIONS}
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                if resume_token is None:
+                    # Anything cached before the stream opened may already be stale
+                    for collection_name in collections:
+                        _publish_stream_change(collection_name, {"operationType": "reset"})
+                print(f"Watching change streams on: {', '.join(collections)}")
+                async for event in stream:
+                    resume_token = stream.resume_token
+                    _publish_stream_change(event["ns"]["coll"], event)
+        except asyncio.CancelledError:
+            raise
+        except OperationFailure as e:
+            if e.code == CHANGE_STREAMS_NOT_SUPPORTED:
+                print("Change streams unavailable (MongoDB is not a replica set); cross-worker cache invalidation disabled.")
+                return
+            if e.code == CHANGE_STREAM_HISTORY_LOST:
+                resume_token = None
+            print(f"Change stream failed: {e}")
+        except PyMongoError as e:
+            print(f"Change stream interrupted: {e}")
+        await asyncio.sleep(retry_seconds)
+
+def _publish_stream_change(collection_name: str, event: dict):
+    # A failing listener must not end the watcher, or invalidation would
+    # stop for the rest of the process
+    try:
+        publish_change(collection_name, event)
+    except Exception as e:
+        print(f"Cache listener for {collection_name} failed: {e!r}")
+
+def _str_id(doc: Optional[dict]) -> Optional[dict]:
+    """
+    Every helper here hands documents out with `_id` as a string, so callers
+    can compare and store it directly; this is the one place that converts.
+    """
+    if doc is not None and "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    return doc
+
+# --- Keyset Pagination ---
+# Pages are ordered by (sort_field, _id) so ties stay stable, and the cursor
+# carries the last row's pair. Every paginated query has a matching
+# (..., sort_field, _id) index in INDEXES, so fetching a page reads `limit`
+# index entries no matter how deep into the collection it is.
+
+def encode_page_cursor(doc: dict, sort_field: str) -> str:
+    raw = json_util.dumps([doc.get(sort_field), doc["_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_page_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        value, last_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError("Invalid page cursor")
+    if not isinstance(last_id, ObjectId):
+        raise ValueError("Invalid page cursor")
+    return value, last_id
+
+async def find_page(
+    collection_name: str,
+    query: dict,
+    sort_field: str,
+    descending: bool = False,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Returns (docs, next_cursor) for one keyset page of `query`.
+
+    Without `limit` the whole sorted result is returned and next_cursor is
+    None. Like every helper here, `_id` comes back as a string.
+    """
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    direction = DESCENDING if descending else ASCENDING
+    if after:
+        value, last_id = decode_page_cursor(after)
+        op = "$lt" if descending else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_field: {op: value}},
+            {sort_field: value, "_id": {op: last_id}},
+        ]}]}
+    cursor = db[collection_name].find(query, projection).sort([(sort_field, direction), ("_id", direction)])
+    if limit is not None:
+        cursor = cursor.limit(limit + 1)
+    docs = await cursor.to_list(length=None)
+    next_cursor = None
+    if limit is not None and len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_page_cursor(docs[-1], sort_field)
+    return [_str_id(doc) for doc in docs], next_cursor
+
 async def save_generation_to_db(data: dict):
     """Saves a generated interview plan to the database."""
     database = get_database()
@@ -53,34 +304,91 @@ async def get_generation_history(limit: int = 10):
     
     cursor = collection.find({}).sort("created_at", -1).limit(limit)
     
-    history = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
-        history.append(doc)
-        
-    return history
+    return [_str_id(doc) async for doc in cursor]
+
+async def get_generation_history_page(limit: int = 20, after: Optional[str] = None):
+    """Keyset-paginated generation history, newest first. Returns (history, next_cursor)."""
+    return await find_page(COLLECTION_NAME, {}, "created_at", descending=True, limit=limit, after=after)
 
 # --- Exam Agent DB Helpers ---
 
-async def get_all_students(workspace_id: str):
+# Field projections ("views") for the bulk fetchers. Pass one as `projection`
+# so a call site only pulls the fields it actually reads; `None` returns the
+# whole document.
+STUDENT_ALLOCATION_FIELDS = {"id": 1, "name": 1, "enrolled_courses": 1, "program_id": 1, "batch_year": 1, "workspace_id": 1}
+STUDENT_CYCLE_FIELDS = {"semester": 1, "batch_year": 1, "program_id": 1}
+# Everything the student write hooks (cycle membership, enrollment index) diff
+STUDENT_WRITE_FIELDS = {**STUDENT_CYCLE_FIELDS, "id": 1, "enrolled_courses": 1}
+COURSE_SCHEDULING_FIELDS = {"code": 1, "name": 1, "semester": 1, "program_ids": 1, "batch_ids": 1, "workspace_id": 1}
+EXAM_CYCLE_SCHEDULING_FIELDS = {"student_ids": 0}
+ROOM_ALLOCATION_FIELDS = {"id": 1, "name": 1, "capacity": 1, "rows": 1, "columns": 1, "building_id": 1, "floor_id": 1, "workspace_id": 1, "seating_type": 1}
+
+def _student_defaults() -> dict:
+    # Old mock data and sheet imports without a batch_year column leave these unset
+    return {"semester": 1, "batch_year": datetime.now(timezone.utc).year}
+
+def _fill_student_defaults(doc: dict) -> dict:
+    _str_id(doc)
+    # Ensure default values are filled for old mock data
+    if "program_id" not in doc:
+        doc["program_id"] = "Unknown"
+    for field, value in _student_defaults().items():
+        doc.setdefault(field, value)
+    return doc
+
+async def iter_students(workspace_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
+    """Streams a workspace's students without materialising the whole roster."""
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.students.find({"workspace_id": workspace_id})
-    students = []
+    cursor = db.students.find({"workspace_id": workspace_id}, projection, batch_size=batch_size)
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        # Ensure default values are filled for old mock data
-        if "program_id" not in doc:
-            doc["program_id"] = "Unknown"
-        if "semester" not in doc:
-            doc["semester"] = 1
-        if "batch_year" not in doc:
-            doc["batch_year"] = datetime.now(timezone.utc).year
-        students.append(doc)
-    return students
+        yield _fill_student_defaults(doc)
+
+def invalidate_reference_cache(collection_name: str, workspace_id: Optional[str] = None):
+    """Drops cached reference lists for a collection, optionally only for one workspace."""
+    if collection_name not in REFERENCE_COLLECTIONS:
+        return
+    reference_cache.invalidate_where(
+        lambda key: key[0] == collection_name and (workspace_id is None or key[1] == workspace_id)
+    )
+
+def _on_reference_change(collection_name: str, event: dict):
+    workspace_id = (event.get("fullDocument") or {}).get("workspace_id")
+    invalidate_reference_cache(collection_name, workspace_id)
+
+register_invalidation_listener(REFERENCE_COLLECTIONS, _on_reference_change)
 
-async def get_filtered_students(workspace_id: str, batch_year: Optional[int] = None, program_id: Optional[str] = None, semester: Optional[int] = None):
+async def _get_reference_docs(collection_name: str, workspace_id: str, projection: Optional[dict] = None):
+    key = (collection_name, workspace_id, tuple(sorted(projection.items())) if projection else None)
+    docs = reference_cache.get(key)
+    if docs is None:
+        db = get_database()
+        if db is None:
+            raise RuntimeError("Database connection failed")
+        version = reference_cache.version
+        docs = [_str_id(doc) async for doc in db[collection_name].find({"workspace_id": workspace_id}, projection)]
+        reference_cache.set(key, docs, version=version)
+    # Callers mutate what they get back (e.g. popping _id), so hand out copies
+    return [dict(doc) for doc in docs]
+
+async def get_reference_json(collection_name: str, workspace_id: str, encode: Callable[[List[dict]], bytes], tag: str) -> bytes:
+    """
+    A workspace's reference docs already run through `encode` (tagged `tag`),
+    cached beside the document lists so the same writes invalidate both.
+    """
+    key = (collection_name, workspace_id, ("json", tag))
+    body = reference_cache.get(key)
+    if body is None:
+        version = reference_cache.version
+        body = encode(await _get_reference_docs(collection_name, workspace_id))
+        reference_cache.set(key, body, version=version)
+    return body
+
+async def get_all_students(workspace_id: str, projection: Optional[dict] = None):
+    return [doc async for doc in iter_students(workspace_id, projection)]
+
+async def get_filtered_students(workspace_id: str, batch_year: Optional[int] = None, program_id: Optional[str] = None, semester: Optional[int] = None, projection: Optional[dict] = None):
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
@@ -93,69 +401,81 @@ async def get_filtered_students(workspace_id: str, batch_year: Optional[int] = N
     if semester is not None:
         query["semester"] = semester
         
-    cursor = db.students.find(query)
+    cursor = db.students.find(query, projection)
     students = []
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        # Ensure default values are filled for old mock data
-        if "program_id" not in doc:
-            doc["program_id"] = "Unknown"
-        if "semester" not in doc:
-            doc["semester"] = 1
-        if "batch_year" not in doc:
-            doc["batch_year"] = datetime.now(timezone.utc).year
-        students.append(doc)
+        students.append(_fill_student_defaults(doc))
     return students
 
-async def get_all_rooms(workspace_id: str):
-    db = get_database()
-    if db is None:
-        raise RuntimeError("Database connection failed")
-    cursor = db.rooms.find({"workspace_id": workspace_id})
-    rooms = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        rooms.append(doc)
-    return rooms
+STUDENT_SORT_FIELDS = ("id", "name")
 
-async def get_all_buildings(workspace_id: str):
+async def get_students_page(
+    workspace_id: str,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    sort: str = "id",
+    descending: bool = False,
+    batch_year: Optional[int] = None,
+    program_id: Optional[str] = None,
+    semester: Optional[int] = None,
+    projection: Optional[dict] = None,
+):
+    """Filtered, sorted, keyset-paginated students. Returns (students, next_cursor)."""
+    if sort not in STUDENT_SORT_FIELDS:
+        raise ValueError(f"Students can only be sorted by: {', '.join(STUDENT_SORT_FIELDS)}")
+    query = {"workspace_id": workspace_id}
+    if batch_year is not None:
+        query["batch_year"] = batch_year
+    if program_id:
+        query["program_id"] = program_id
+    if semester is not None:
+        query["semester"] = semester
+    docs, next_cursor = await find_page("students", query, sort, descending, limit, after, projection)
+    return [_fill_student_defaults(doc) for doc in docs], next_cursor
+
+async def get_students_by_ids(workspace_id: str, student_ids: List[str], projection: Optional[dict] = None):
+    """Point lookups by document `_id` (as found in the enrollment index) for an explicit set of students."""
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.buildings.find({"workspace_id": workspace_id})
-    buildings = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        buildings.append(doc)
-    return buildings
+    object_ids = [ObjectId(sid) for sid in student_ids if ObjectId.is_valid(sid)]
+    cursor = db.students.find({"workspace_id": workspace_id, "_id": {"$in": object_ids}}, projection, batch_size=STREAM_BATCH_SIZE)
+    return [_fill_student_defaults(doc) async for doc in cursor]
 
-async def get_all_departments(workspace_id: str):
+async def get_student_batch_years(workspace_id: str) -> List[int]:
+    """Distinct batch years in a workspace; only the batch_year field crosses the wire."""
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.departments.find({"workspace_id": workspace_id})
-    depts = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        depts.append(doc)
-    return depts
+    batches = await db.students.distinct("batch_year", {"workspace_id": workspace_id})
+    return sorted([b for b in batches if isinstance(b, int)])
 
-async def get_all_degrees(workspace_id: str):
+async def iter_rooms(workspace_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.degrees.find({"workspace_id": workspace_id})
-    degrees = []
+    cursor = db.rooms.find({"workspace_id": workspace_id}, projection, batch_size=batch_size)
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        degrees.append(doc)
-    return degrees
+        yield _str_id(doc)
+
+async def get_all_rooms(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("rooms", workspace_id, projection)
+
+async def get_all_buildings(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("buildings", workspace_id, projection)
+
+async def get_all_departments(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("departments", workspace_id, projection)
+
+async def get_all_degrees(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("degrees", workspace_id, projection)
 
 async def create_building(data: dict) -> str:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.buildings.insert_one(data)
+    invalidate_reference_cache("buildings", data.get("workspace_id"))
     return str(result.inserted_id)
 
 async def create_room(data: dict) -> str:
@@ -163,6 +483,7 @@ async def create_room(data: dict) -> str:
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.rooms.insert_one(data)
+    invalidate_reference_cache("rooms", data.get("workspace_id"))
     return str(result.inserted_id)
 
 async def create_department(data: dict) -> str:
@@ -170,6 +491,7 @@ async def create_department(data: dict) -> str:
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.departments.insert_one(data)
+    invalidate_reference_cache("departments", data.get("workspace_id"))
     return str(result.inserted_id)
 
 async def create_degree(data: dict) -> str:
@@ -177,6 +499,7 @@ async def create_degree(data: dict) -> str:
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.degrees.insert_one(data)
+    invalidate_reference_cache("degrees", data.get("workspace_id"))
     return str(result.inserted_id)
 
 async def create_student(data: dict) -> str:
@@ -184,18 +507,88 @@ async def create_student(data: dict) -> str:
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.students.insert_one(data)
+    await _after_student_write(db, data["workspace_id"], [], [data])
     return str(result.inserted_id)
 
+async def bulk_write_students(students: List[dict], upsert: bool = False, chunk_size: int = BULK_WRITE_CHUNK_SIZE) -> dict:
+    """
+    Writes students in chunks with one round trip per chunk.
+
+    Plain mode uses unordered insert_many; upsert mode replaces by
+    (workspace_id, id). A failing document never aborts the rest of its chunk.
+    Returns {"inserted", "updated", "errors": [{"index", "id", "error"}]} with
+    `index` pointing into `students`.
+    """
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    inserted = 0
+    updated = 0
+    errors = []
+    for start in range(0, len(students), chunk_size):
+        chunk = students[start:start + chunk_size]
+        # Imports are per workspace, so one chunk shares a workspace_id
+        workspace_id = chunk[0]["workspace_id"]
+        existing = {}
+        if upsert:
+            cursor = db.students.find(
+                {"workspace_id": workspace_id, "id": {"$in": [s["id"] for s in chunk]}},
+                STUDENT_WRITE_FIELDS
+            )
+            existing = {doc["id"]: doc async for doc in cursor}
+        upserted_ids = {}
+        failed = set()
+        try:
+            if upsert:
+                result = await db.students.bulk_write([
+                    UpdateOne({"workspace_id": s["workspace_id"], "id": s["id"]}, {"$set": s}, upsert=True)
+                    for s in chunk
+                ], ordered=False)
+                inserted += result.upserted_count
+                updated += result.matched_count
+                upserted_ids = result.upserted_ids
+            else:
+                result = await db.students.insert_many(chunk, ordered=False)
+                inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            inserted += details.get("nInserted", 0) + details.get("nUpserted", 0)
+            updated += details.get("nMatched", 0)
+            upserted_ids = {u["index"]: u["_id"] for u in details.get("upserted", [])}
+            for err in details.get("writeErrors", []):
+                failed.add(err["index"])
+                idx = start + err["index"]
+                errors.append({"index": idx, "id": students[idx].get("id"), "error": err.get("errmsg", "Write failed")})
+
+        before, after = [], []
+        for i, s in enumerate(chunk):
+            if i in failed:
+                continue
+            old = existing.get(s["id"])
+            if old:
+                before.append(old)
+                # $set keeps stored fields the sheet left out
+                after.append({**old, **s})
+            elif upsert:
+                after.append({**s, "_id": upserted_ids[i]})
+            else:
+                after.append(s)  # insert_many set `_id` in place
+        await _after_student_write(db, workspace_id, before, after)
+    return {"inserted": inserted, "updated": updated, "errors": errors}
+
 async def get_rooms_by_building(workspace_id: str, building_id: str):
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
     cursor = db.rooms.find({"workspace_id": workspace_id, "building_id": building_id})
-    rooms = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        rooms.append(doc)
-    return rooms
+    return [_str_id(doc) async for doc in cursor]
+
+async def get_rooms_by_ids(workspace_id: str, room_ids: List[str], projection: Optional[dict] = None):
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.rooms.find({"workspace_id": workspace_id, "id": {"$in": list(room_ids)}}, projection)
+    return [_str_id(doc) async for doc in cursor]
 
 async def create_exam_cycle(data: dict) -> str:
     db = get_database()
@@ -204,16 +597,201 @@ async def create_exam_cycle(data: dict) -> str:
     result = await db.exam_cycles.insert_one(data)
     return str(result.inserted_id)
 
-async def get_all_exam_cycles(workspace_id: str):
+async def get_exam_cycle_by_id(workspace_id: str, cycle_id: str, projection: Optional[dict] = None) -> Optional[dict]:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.exam_cycles.find({"workspace_id": workspace_id})
-    cycles = []
+    if not ObjectId.is_valid(cycle_id):
+        return None
+    doc = await db.exam_cycles.find_one({"_id": ObjectId(cycle_id), "workspace_id": workspace_id}, projection)
+    return _str_id(doc)
+
+async def get_all_exam_cycles(workspace_id: str, projection: Optional[dict] = None):
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.exam_cycles.find({"workspace_id": workspace_id}, projection)
+    return [_str_id(doc) async for doc in cursor]
+
+# --- Exam Cycle Membership ---
+# An exam cycle's student_ids/program_ids mirror the students whose semester
+# and batch_year match it. Cycle creation fills them from one indexed query;
+# afterwards every student write patches only the matching cycles with
+# $addToSet/$pull instead of recomputing membership from a full scan.
+
+def _cycle_students_query(workspace_id: str, semester: int, batch_year: int) -> dict:
+    """Students an exam cycle covers, counting unset fields as their _fill_student_defaults value."""
+    query = {"workspace_id": workspace_id}
+    clauses = []
+    defaults = _student_defaults()
+    for field, value in (("batch_year", batch_year), ("semester", semester)):
+        if value == defaults[field]:
+            clauses.append({"$or": [{field: value}, {field: {"$exists": False}}]})
+        else:
+            query[field] = value
+    if clauses:
+        query["$and"] = clauses
+    return query
+
+async def get_cycle_membership(workspace_id: str, semester: int, batch_year: int) -> Tuple[List[str], List[str]]:
+    """Returns (student_ids, program_ids) of the students an exam cycle covers."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.students.find(_cycle_students_query(workspace_id, semester, batch_year), {"_id": 1, "program_id": 1})
+    student_ids = []
+    program_ids = set()
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        cycles.append(doc)
-    return cycles
+        student_ids.append(str(doc["_id"]))
+        if doc.get("program_id"):
+            program_ids.add(str(doc["program_id"]))
+    return student_ids, sorted(program_ids)
+
+def _cycle_key(student: dict) -> Optional[Tuple[Any, Any]]:
+    defaults = _student_defaults()
+    semester = student.get("semester", defaults["semester"])
+    batch_year = student.get("batch_year", defaults["batch_year"])
+    if semester is None or batch_year is None:
+        return None
+    return semester, batch_year
+
+async def _sync_cycle_membership(db, workspace_id: str, before: List[dict], after: List[dict]):
+    """
+    Patches exam cycles after a student write. `before`/`after` hold the raw
+    student documents (with `_id`) as they were and are now; a student
+    missing from `after` was deleted, one missing from `before` is new.
+    """
+    after_by_id = {str(doc["_id"]): doc for doc in after}
+    pulls = defaultdict(set)
+    vacated_programs = set()
+    for old in before:
+        key = _cycle_key(old)
+        if key is None:
+            continue
+        new = after_by_id.get(str(old["_id"]))
+        moved = new is None or _cycle_key(new) != key
+        if moved:
+            pulls[key].add(str(old["_id"]))
+        if old.get("program_id") and (moved or new.get("program_id") != old["program_id"]):
+            vacated_programs.add((key, str(old["program_id"])))
+
+    adds = defaultdict(lambda: (set(), set()))
+    for new in after:
+        key = _cycle_key(new)
+        if key is None:
+            continue
+        student_ids, program_ids = adds[key]
+        student_ids.add(str(new["_id"]))
+        if new.get("program_id"):
+            program_ids.add(str(new["program_id"]))
+
+    def cycles(key):
+        return {"workspace_id": workspace_id, "semester": key[0], "batch_year": key[1]}
+
+    ops = [UpdateMany(cycles(key), {"$pull": {"student_ids": {"$in": sorted(ids)}}}) for key, ids in pulls.items()]
+    ops += [
+        UpdateMany(cycles(key), {"$addToSet": {"student_ids": {"$each": sorted(ids)}, "program_ids": {"$each": sorted(progs)}}})
+        for key, (ids, progs) in adds.items()
+    ]
+    # A program leaves a cycle only once no matching student is left in it
+    for key, program_id in vacated_programs:
+        remaining = await db.students.find_one(
+            {**_cycle_students_query(workspace_id, key[0], key[1]), "program_id": program_id},
+            {"_id": 1}
+        )
+        if remaining is None:
+            ops.append(UpdateMany(cycles(key), {"$pull": {"program_ids": program_id}}))
+    if ops:
+        await db.exam_cycles.bulk_write(ops, ordered=False)
+
+# --- Course Enrollment Index ---
+# `enrollments` holds one document per (workspace_id, course_code) with the
+# document `_id`s (as strings) of the students taking that course. Roll
+# numbers aren't unique, so they can't key it: removing one of two students
+# sharing an id would drop the other's enrollments too. Student writes keep
+# it current, so scheduling and allocation read just the courses they need
+# instead of walking every student's enrolled_courses.
+# Documents carry ENROLLMENT_STUDENT_KEY so indexes built from roll numbers
+# get rebuilt at startup.
+ENROLLMENT_STUDENT_KEY = "_id"
+
+async def _sync_enrollments(db, workspace_id: str, before: List[dict], after: List[dict]):
+    def pairs(docs):
+        return {(course, str(doc["_id"])) for doc in docs for course in doc.get("enrolled_courses") or []}
+
+    old_pairs, new_pairs = pairs(before), pairs(after)
+    pulls = defaultdict(set)
+    adds = defaultdict(set)
+    for course, student_id in old_pairs - new_pairs:
+        pulls[course].add(student_id)
+    for course, student_id in new_pairs - old_pairs:
+        adds[course].add(student_id)
+
+    ops = [
+        UpdateOne({"workspace_id": workspace_id, "course_code": course}, {"$pull": {"student_ids": {"$in": sorted(ids)}}})
+        for course, ids in pulls.items()
+    ]
+    ops += [
+        UpdateOne(
+            {"workspace_id": workspace_id, "course_code": course},
+            {"$addToSet": {"student_ids": {"$each": sorted(ids)}}, "$setOnInsert": {"student_key": ENROLLMENT_STUDENT_KEY}},
+            upsert=True
+        )
+        for course, ids in adds.items()
+    ]
+    if ops:
+        await db.enrollments.bulk_write(ops, ordered=False)
+
+async def _after_student_write(db, workspace_id: str, before: List[dict], after: List[dict]):
+    """Runs every student write hook; see _sync_cycle_membership for the arguments."""
+    await _sync_cycle_membership(db, workspace_id, before, after)
+    await _sync_enrollments(db, workspace_id, before, after)
+
+async def get_course_enrollments(workspace_id: str, course_codes: List[str]) -> dict:
+    """Returns {course_code: [student _ids]} for `course_codes` in one indexed query."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.enrollments.find(
+        {"workspace_id": workspace_id, "course_code": {"$in": list(course_codes)}},
+        {"_id": 0, "course_code": 1, "student_ids": 1}
+    )
+    return {doc["course_code"]: doc["student_ids"] async for doc in cursor}
+
+async def rebuild_enrollment_index(workspace_id: str) -> int:
+    """Recomputes a workspace's enrollment index from its students. Returns the course count."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    rows = await db.students.aggregate([
+        {"$match": {"workspace_id": workspace_id}},
+        {"$unwind": "$enrolled_courses"},
+        {"$group": {"_id": "$enrolled_courses", "student_ids": {"$addToSet": "$_id"}}},
+    ]).to_list(length=None)
+    await db.enrollments.delete_many({"workspace_id": workspace_id})
+    if rows:
+        await db.enrollments.insert_many([
+            {
+                "workspace_id": workspace_id,
+                "course_code": row["_id"],
+                "student_ids": sorted(str(oid) for oid in row["student_ids"]),
+                "student_key": ENROLLMENT_STUDENT_KEY,
+            }
+            for row in rows
+        ])
+    return len(rows)
+
+async def backfill_enrollment_index():
+    """Builds the enrollment index for workspaces that have students but none yet, or one keyed the old way."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    indexed = set(await db.enrollments.distinct("workspace_id"))
+    stale = set(await db.enrollments.distinct("workspace_id", {"student_key": {"$ne": ENROLLMENT_STUDENT_KEY}}))
+    for workspace_id in await db.students.distinct("workspace_id"):
+        if workspace_id not in indexed or workspace_id in stale:
+            count = await rebuild_enrollment_index(workspace_id)
+            print(f"Built enrollment index for workspace {workspace_id} ({count} courses)")
 
 async def create_calendar_event(data: dict) -> str:
     db = get_database()
@@ -222,44 +800,46 @@ async def create_calendar_event(data: dict) -> str:
     result = await db.calendar_events.insert_one(data)
     return str(result.inserted_id)
 
-async def get_calendar_events(workspace_id: str):
+async def get_calendar_events(workspace_id: str, start: Optional[str] = None, end: Optional[str] = None):
+    """Stored calendar events, optionally limited to [start, end] (YYYY-MM-DD).
+
+    Recurring holidays are not stored here; see get_holiday_rules.
+    """
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.calendar_events.find({"workspace_id": workspace_id})
-    events = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        events.append(doc)
-        
-    # Generate dynamic holidays (Sundays and Jan 1st for +/- 3 years)
-    current_year = datetime.now(timezone.utc).year
-    dynamic_events = []
-    
-    for year in range(current_year - 3, current_year + 4):
-        # Add Jan 1st
-        dynamic_events.append({
-            "_id": f"new_year_{year}",
-            "title": "New Year's Day",
-            "date": f"{year}-01-01",
-            "type": "holiday",
-            "workspace_id": workspace_id,
-        })
-        # Add all Sundays
-        from datetime import date, timedelta as td
-        d = date(year, 1, 1)
-        d += td(days=6 - d.weekday()) # First Sunday
-        while d.year == year:
-            dynamic_events.append({
-                "_id": f"sunday_{d.isoformat()}",
-                "title": "Sunday",
-                "date": d.isoformat(),
-                "type": "holiday",
-                "workspace_id": workspace_id,
-            })
-            d += td(days=7)
-            
-    return events + dynamic_events
+    query = {"workspace_id": workspace_id}
+    if start or end:
+        query["date"] = {}
+        if start:
+            query["date"]["$gte"] = start
+        if end:
+            query["date"]["$lte"] = end
+    cursor = db.calendar_events.find(query)
+    return [_str_id(doc) async for doc in cursor]
+
+async def create_holiday_rule(data: dict) -> str:
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    result = await db.holiday_rules.insert_one(data)
+    invalidate_reference_cache("holiday_rules", data.get("workspace_id"))
+    return str(result.inserted_id)
+
+async def get_holiday_rules(workspace_id: str):
+    """Workspace-defined holiday rules (the built-in defaults live in exam_agent.holidays)."""
+    return await _get_reference_docs("holiday_rules", workspace_id)
+
+async def delete_holiday_rule(rule_id: str, workspace_id: str) -> bool:
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    try:
+        result = await db.holiday_rules.delete_one({"_id": ObjectId(rule_id), "workspace_id": workspace_id})
+    except Exception:
+        return False
+    invalidate_reference_cache("holiday_rules", workspace_id)
+    return result.deleted_count > 0
 
 # Course is effectively represented by "exam" data in the current seed but let's separate if needed.
 # For now, "Course" == "Subject" often. Let's assume we manage "Courses" metadata separately.
@@ -268,36 +848,54 @@ async def create_course(data: dict) -> str:
     if db is None:
         raise RuntimeError("Database connection failed")
     result = await db.courses.insert_one(data)
+    invalidate_reference_cache("courses", data.get("workspace_id"))
     return str(result.inserted_id)
 
-async def get_all_courses(workspace_id: str):
+async def iter_courses(workspace_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.courses.find({"workspace_id": workspace_id})
-    courses = []
+    cursor = db.courses.find({"workspace_id": workspace_id}, projection, batch_size=batch_size)
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        courses.append(doc)
-    return courses
+        yield _str_id(doc)
 
-async def create_program(data: dict) -> str:
+async def get_all_courses(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("courses", workspace_id, projection)
+
+async def find_courses(
+    workspace_id: str,
+    codes: Optional[List[str]] = None,
+    semester: Optional[int] = None,
+    batch_year: Optional[int] = None,
+    program_ids: Optional[List[str]] = None,
+    projection: Optional[dict] = None,
+):
+    """Courses matching every given predicate; `program_ids` matches courses sharing any of them."""
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    result = await db.programs.insert_one(data)
-    return str(result.inserted_id)
+    query = {"workspace_id": workspace_id}
+    if codes is not None:
+        query["code"] = {"$in": list(codes)}
+    if semester is not None:
+        query["semester"] = semester
+    if batch_year is not None:
+        query["batch_ids"] = batch_year
+    if program_ids is not None:
+        query["program_ids"] = {"$in": list(program_ids)}
+    cursor = db.courses.find(query, projection)
+    return [_str_id(doc) async for doc in cursor]
 
-async def get_all_programs(workspace_id: str):
+async def create_program(data: dict) -> str:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.programs.find({"workspace_id": workspace_id})
-    programs = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        programs.append(doc)
-    return programs
+    result = await db.programs.insert_one(data)
+    invalidate_reference_cache("programs", data.get("workspace_id"))
+    return str(result.inserted_id)
+
+async def get_all_programs(workspace_id: str, projection: Optional[dict] = None):
+    return await _get_reference_docs("programs", workspace_id, projection)
 
 # --- User & Workspace DB Operations ---
 
@@ -311,16 +909,49 @@ async def create_user(user_data: dict) -> str:
         raise ValueError("User with this email already exists")
         
     result = await db.users.insert_one(user_data)
+    invalidate_user_cache(user_data["email"])
     return str(result.inserted_id)
 
-async def get_user_by_email(email: str) -> Optional[dict]:
+async def get_user_by_email(email: str, projection: Optional[dict] = None) -> Optional[dict]:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    user = await db.users.find_one({"email": email})
-    if user:
-        user["_id"] = str(user["_id"])
-    return user
+    user = await db.users.find_one({"email": email}, projection)
+    return _str_id(user)
+
+# Users resolved from a token subject on every authenticated request, keyed
+# by email. Only found users are cached (so a sign-up is visible at once),
+# and the password hash never enters the cache.
+AUTH_USER_FIELDS = {"password_hash": 0}
+user_cache = TTLCache(
+    "users",
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096")),
+)
+
+def invalidate_user_cache(email: Optional[str] = None):
+    """Drops one cached user, or all of them when the changed email is unknown."""
+    if email is None:
+        user_cache.clear()
+    else:
+        user_cache.invalidate(email)
+
+def _on_user_change(collection_name: str, event: dict):
+    # Deletes carry no fullDocument, so they clear every entry
+    invalidate_user_cache((event.get("fullDocument") or {}).get("email"))
+
+register_invalidation_listener(["users"], _on_user_change)
+
+async def get_cached_user(email: str) -> Optional[dict]:
+    """get_user_by_email without the password hash, served from user_cache when possible."""
+    user = user_cache.get(email)
+    if user is None:
+        version = user_cache.version
+        user = await get_user_by_email(email, projection=AUTH_USER_FIELDS)
+        if user is None:
+            return None
+        user_cache.set(email, user, version=version)
+    return dict(user)
 
 async def create_workspace(workspace_data: dict) -> str:
     db = get_database()
@@ -340,11 +971,7 @@ async def get_workspaces_for_user(user_id: str) -> List[dict]:
             {"members": user_id}
         ]
     })
-    workspaces = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        workspaces.append(doc)
-    return workspaces
+    return [_str_id(doc) async for doc in cursor]
 
 async def get_workspace_by_id(workspace_id: str) -> Optional[dict]:
     db = get_database()
@@ -353,9 +980,7 @@ async def get_workspace_by_id(workspace_id: str) -> Optional[dict]:
         if db is None:
             raise RuntimeError("Database connection failed")
         ws = await db.workspaces.find_one({"_id": ObjectId(workspace_id)})
-        if ws:
-            ws["_id"] = str(ws["_id"])
-        return ws
+        return _str_id(ws)
     except:
         return None
 
@@ -368,6 +993,46 @@ async def add_member_to_workspace(workspace_id: str, user_id: str):
         {"_id": ObjectId(workspace_id)},
         {"$addToSet": {"members": user_id}}
     )
+    invalidate_workspace_members(workspace_id)
+
+# Member sets checked by the workspace access dependency on every workspace
+# route, keyed by workspace_id. A workspace that doesn't exist is cached as
+# an empty set; ObjectIds are never reused, so that entry can't go stale.
+workspace_member_cache = TTLCache(
+    "workspace_members",
+    ttl_seconds=float(os.getenv("WORKSPACE_MEMBER_CACHE_TTL_SECONDS", "60")),
+    max_entries=int(os.getenv("WORKSPACE_MEMBER_CACHE_MAX_ENTRIES", "4096")),
+)
+
+def invalidate_workspace_members(workspace_id: Optional[str] = None):
+    if workspace_id is None:
+        workspace_member_cache.clear()
+    else:
+        workspace_member_cache.invalidate(workspace_id)
+
+def _on_workspace_change(collection_name: str, event: dict):
+    document_id = (event.get("documentKey") or {}).get("_id")
+    invalidate_workspace_members(str(document_id) if document_id is not None else None)
+
+register_invalidation_listener(["workspaces"], _on_workspace_change)
+
+async def get_workspace_members(workspace_id: str) -> frozenset:
+    """User ids of a workspace's members; empty if the workspace doesn't exist."""
+    members = workspace_member_cache.get(workspace_id)
+    if members is None:
+        db = get_database()
+        if db is None:
+            raise RuntimeError("Database connection failed")
+        version = workspace_member_cache.version
+        ws = None
+        if ObjectId.is_valid(workspace_id):
+            ws = await db.workspaces.find_one({"_id": ObjectId(workspace_id)}, {"members": 1})
+        members = frozenset(ws.get("members", [])) if ws else frozenset()
+        workspace_member_cache.set(workspace_id, members, version=version)
+    return members
+
+def cache_stats() -> List[dict]:
+    return [reference_cache.stats(), user_cache.stats(), workspace_member_cache.stats()]
 
 # --- Invitation Operations ---
 
@@ -383,9 +1048,7 @@ async def get_invitation_by_token(token: str) -> Optional[dict]:
     if db is None:
         raise RuntimeError("Database connection failed")
     invite = await db.invitations.find_one({"token": token})
-    if invite:
-        invite["_id"] = str(invite["_id"])
-    return invite
+    return _str_id(invite)
 
 async def update_invitation_status(token: str, status: str):
     db = get_database()
@@ -407,14 +1070,40 @@ async def delete_document(collection_name: str, doc_id: str, workspace_id: str)
     except Exception:
         query = {"id": doc_id, "workspace_id": workspace_id}
 
+    if collection_name == "students":
+        # The write hooks need the deleted student's cycle and courses
+        deleted = await db.students.find_one_and_delete(query, projection=STUDENT_WRITE_FIELDS)
+        if deleted is None:
+            return False
+        await _after_student_write(db, workspace_id, [deleted], [])
+        return True
+
+    if collection_name == "assignments":
+        deleted = await db.assignments.find_one_and_delete(query, projection={"_id": 1})
+        if deleted is None:
+            return False
+        await _delete_assignment_dependents(db, [str(deleted["_id"])])
+        return True
+
     result = await db[collection_name].delete_one(query)
+    invalidate_reference_cache(collection_name, workspace_id)
     return result.deleted_count > 0
 
 async def delete_all_documents(collection_name: str, workspace_id: str) -> bool:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
+    if collection_name == "assignments":
+        assignment_ids = [str(doc["_id"]) async for doc in db.assignments.find({"workspace_id": workspace_id}, {"_id": 1})]
+        await _delete_assignment_dependents(db, assignment_ids)
     result = await db[collection_name].delete_many({"workspace_id": workspace_id})
+    if collection_name == "exam_plans":
+        # The head pointer caches the latest plan; drop it along with the history
+        await db.exam_plan_heads.delete_one({"workspace_id": workspace_id})
+    if collection_name == "students":
+        await db.exam_cycles.update_many({"workspace_id": workspace_id}, {"$set": {"student_ids": [], "program_ids": []}})
+        await db.enrollments.delete_many({"workspace_id": workspace_id})
+    invalidate_reference_cache(collection_name, workspace_id)
     return result.deleted_count > 0
 
 async def update_document(collection_name: str, doc_id: str, data: dict, workspace_id: str) -> bool:
@@ -434,9 +1123,94 @@ async def update_document(collection_name: str, doc_id: str, data: dict, workspa
     except Exception:
         filter_q = {"id": doc_id, "workspace_id": workspace_id}
 
+    if collection_name == "students":
+        # The write hooks diff the student as it was against what was set
+        before = await db.students.find_one_and_update(filter_q, {"$set": data}, projection=STUDENT_WRITE_FIELDS)
+        if before is None:
+            return False
+        after = {**before, **{k: v for k, v in data.items() if k in STUDENT_WRITE_FIELDS}}
+        await _after_student_write(db, workspace_id, [before], [after])
+        return True
+
     result = await db[collection_name].update_one(filter_q, {"$set": data})
+    invalidate_reference_cache(collection_name, workspace_id)
     return result.modified_count > 0 or result.matched_count > 0
 
+async def bulk_write_documents(collection_name: str, workspace_id: str, operations: List[dict]) -> List[dict]:
+    """
+    Applies create/update/delete operations in one unordered bulk_write.
+
+    Each operation is {"index", "op", "id", "data"}. Ids resolve like
+    update_document/delete_document (ObjectId `_id`, else the custom `id`
+    field); targets are looked up first with a single $in query so missing
+    items are reported per operation. Since the batch is unordered, one
+    request shouldn't touch the same item twice.
+    Returns one {"index", "ok", "id"} or {"index", "ok", "error"} per operation.
+    """
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+
+    targeted = [o["id"] for o in operations if o["op"] != "create"]
+    object_ids = [ObjectId(i) for i in targeted if ObjectId.is_valid(i)]
+    custom_ids = [i for i in targeted if not ObjectId.is_valid(i)]
+    by_object_id, by_custom_id = {}, {}
+    if targeted:
+        clauses = []
+        if object_ids:
+            clauses.append({"_id": {"$in": object_ids}})
+        if custom_ids:
+            clauses.append({"id": {"$in": custom_ids}})
+        projection = STUDENT_WRITE_FIELDS if collection_name == "students" else {"id": 1}
+        async for doc in db[collection_name].find({"workspace_id": workspace_id, "$or": clauses}, projection):
+            by_object_id[doc["_id"]] = doc
+            by_custom_id.setdefault(doc.get("id"), doc)
+
+    results = {}
+    requests, sent = [], []
+    for o in operations:
+        if o["op"] == "create":
+            doc = dict(o["data"])
+            requests.append(InsertOne(doc))  # sets doc["_id"]
+        else:
+            doc = by_object_id.get(ObjectId(o["id"])) if ObjectId.is_valid(o["id"]) else by_custom_id.get(o["id"])
+            if doc is None:
+                results[o["index"]] = {"index": o["index"], "ok": False, "error": "Item not found"}
+                continue
+            if o["op"] == "update":
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": {k: v for k, v in o["data"].items() if k != "_id"}}))
+            else:
+                requests.append(DeleteOne({"_id": doc["_id"]}))
+        sent.append((o, doc))
+
+    failed = {}
+    if requests:
+        try:
+            await db[collection_name].bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "Write failed") for err in e.details.get("writeErrors", [])}
+
+    before, after = [], []
+    for i, (o, doc) in enumerate(sent):
+        if i in failed:
+            results[o["index"]] = {"index": o["index"], "ok": False, "error": failed[i]}
+            continue
+        results[o["index"]] = {"index": o["index"], "ok": True, "id": str(doc["_id"])}
+        if o["op"] != "create":
+            before.append(doc)
+        if o["op"] == "create":
+            after.append(doc)
+        elif o["op"] == "update":
+            after.append({**doc, **{k: v for k, v in o["data"].items() if k in STUDENT_WRITE_FIELDS}})
+
+    if collection_name == "students":
+        await _after_student_write(db, workspace_id, before, after)
+    if collection_name == "assignments":
+        deleted_ids = {str(doc["_id"]) for doc in before} - {str(doc["_id"]) for doc in after}
+        await _delete_assignment_dependents(db, sorted(deleted_ids))
+    invalidate_reference_cache(collection_name, workspace_id)
+    return [results[o["index"]] for o in operations]
+
 async def update_workspace(workspace_id: str, data: dict) -> bool:
     db = get_database()
     if db is None:
@@ -444,6 +1218,7 @@ async def update_workspace(workspace_id: str, data: dict) -> bool:
     from bson.objectid import ObjectId
     if "_id" in data: del data["_id"]
     result = await db.workspaces.update_one({"_id": ObjectId(workspace_id)}, {"$set": data})
+    invalidate_workspace_members(workspace_id)
     return result.modified_count > 0 or result.matched_count > 0
 
 async def delete_workspace(workspace_id: str, user_id: str) -> bool:
@@ -453,68 +1228,304 @@ async def delete_workspace(workspace_id: str, user_id: str) -> bool:
     from bson.objectid import ObjectId
     # Only owner can delete
     result = await db.workspaces.delete_one({"_id": ObjectId(workspace_id), "owner_id": user_id})
+    invalidate_workspace_members(workspace_id)
     return result.deleted_count > 0
 
 # --- Exam Plan Persistence ---
+# Saved plans form a version chain in `exam_plans`: a full snapshot every
+# EXAM_PLAN_SNAPSHOT_INTERVAL versions and compact deltas in between.
+# `exam_plan_heads` keeps one document per workspace with the head version
+# and its materialized plan, so reading the latest plan is one indexed lookup.
+# Only the newest EXAM_PLAN_RETENTION versions are kept; older ones are
+# compacted away on save.
+EXAM_PLAN_SNAPSHOT_INTERVAL = int(os.getenv("EXAM_PLAN_SNAPSHOT_INTERVAL", "20"))
+EXAM_PLAN_RETENTION = int(os.getenv("EXAM_PLAN_RETENTION", "50"))
 
-async def save_exam_plan(workspace_id: str, plan_data: dict) -> str:
+async def save_exam_plan(workspace_id: str, plan_data: dict, max_retries: int = 5) -> dict:
+    """Appends a new head version. Returns {"id", "version"}."""
     db = get_database()
     if db is None:
          raise RuntimeError("Database connection failed")
-    
-    document = {
-        **plan_data,
-        "workspace_id": workspace_id,
-        "created_at": datetime.now(timezone.utc)
-    }
-    result = await db.exam_plans.insert_one(document)
-    return str(result.inserted_id)
+
+    plan = {k: v for k, v in plan_data.items() if k not in ("_id", "workspace_id", "created_at", "version")}
+    stored_version = 0
+    for _ in range(max_retries):
+        head = await db.exam_plan_heads.find_one({"workspace_id": workspace_id})
+        head_version = head["version"] if head else 0
+        version = max(head_version, stored_version) + 1
+        delta = None
+        # A delta is only valid against the head's plan, so a head lagging
+        # behind the stored chain gets a snapshot instead
+        if head and version == head_version + 1 and version - head["snapshot_version"] < EXAM_PLAN_SNAPSHOT_INTERVAL:
+            delta = diff_plans(head["plan"], plan)
+
+        now = datetime.now(timezone.utc)
+        document = {"workspace_id": workspace_id, "version": version, "created_at": now}
+        if delta is None:
+            document.update(kind="snapshot", plan=plan)
+        else:
+            document.update(kind="delta", delta=delta)
+        try:
+            result = await db.exam_plans.insert_one(document)
+        except DuplicateKeyError:
+            # Another save claimed this version first, or one died before
+            # publishing its head; rebase past the newest stored version
+            latest = await db.exam_plans.find_one(
+                {"workspace_id": workspace_id, "version": {"$exists": True}},
+                {"version": 1}, sort=[("version", DESCENDING)]
+            )
+            stored_version = latest["version"] if latest else 0
+            await asyncio.sleep(0.05)
+            continue
+
+        base_version = head.get("base_version", 1) if head else version
+        try:
+            await db.exam_plan_heads.update_one(
+                {"workspace_id": workspace_id, "version": {"$lt": version}},
+                {"$set": {
+                    "version": version,
+                    "plan": plan,
+                    "snapshot_version": version if delta is None else head["snapshot_version"],
+                    "base_version": base_version,
+                    "updated_at": now,
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # A newer head was already published
+        if version - base_version + 1 > EXAM_PLAN_RETENTION:
+            await compact_exam_plan_versions(workspace_id)
+        return {"id": str(result.inserted_id), "version": version}
+    raise RuntimeError("Could not save exam plan: too many concurrent saves")
 
 async def get_latest_exam_plan(workspace_id: str) -> Optional[dict]:
     db = get_database()
     if db is None:
          raise RuntimeError("Database connection failed")
-    
-    # Get the most recent plan
+
+    head = await db.exam_plan_heads.find_one({"workspace_id": workspace_id})
+    if head:
+        return {**head["plan"], "version": head["version"]}
+
+    # Workspaces that haven't saved since versioning was introduced
     plan = await db.exam_plans.find_one(
-        {"workspace_id": workspace_id},
+        {"workspace_id": workspace_id, "version": {"$exists": False}},
         sort=[("created_at", -1)] # Descending
     )
-    if plan:
-        plan["_id"] = str(plan["_id"])
-    return plan
+    return _str_id(plan)
+
+async def get_exam_plan_version(workspace_id: str, version: int) -> Optional[dict]:
+    """Rebuilds a past version from its nearest snapshot and the deltas after it."""
+    db = get_database()
+    if db is None:
+         raise RuntimeError("Database connection failed")
+
+    head = await db.exam_plan_heads.find_one({"workspace_id": workspace_id})
+    if head and head["version"] == version:
+        return {**head["plan"], "version": version}
+
+    base = await db.exam_plans.find_one(
+        {"workspace_id": workspace_id, "kind": "snapshot", "version": {"$lte": version}},
+        sort=[("version", -1)]
+    )
+    if not base:
+        return None
+    plan, last = base["plan"], base["version"]
+    cursor = db.exam_plans.find(
+        {"workspace_id": workspace_id, "version": {"$gt": last, "$lte": version}}
+    ).sort("version", ASCENDING)
+    async for doc in cursor:
+        plan = doc["plan"] if doc["kind"] == "snapshot" else apply_plan_delta(plan, doc["delta"])
+        last = doc["version"]
+    if last != version:
+        return None
+    return {**plan, "version": version}
+
+async def list_exam_plan_versions(workspace_id: str) -> List[dict]:
+    """Retained versions, newest first, without their contents."""
+    db = get_database()
+    if db is None:
+         raise RuntimeError("Database connection failed")
+    cursor = db.exam_plans.find(
+        {"workspace_id": workspace_id, "version": {"$exists": True}},
+        {"_id": 0, "version": 1, "kind": 1, "created_at": 1}
+    ).sort("version", DESCENDING)
+    return await cursor.to_list(length=None)
+
+async def compact_exam_plan_versions(workspace_id: str, keep: int = EXAM_PLAN_RETENTION) -> int:
+    """
+    Drops every version older than the newest `keep`, turning the oldest
+    survivor into a snapshot so the chain stays readable. Returns the number
+    of version documents removed.
+    """
+    db = get_database()
+    if db is None:
+         raise RuntimeError("Database connection failed")
+
+    head = await db.exam_plan_heads.find_one({"workspace_id": workspace_id})
+    if not head:
+        return 0
+    oldest = head["version"] - keep + 1
+    if oldest <= head.get("base_version", 1):
+        return 0
+
+    first = await db.exam_plans.find_one({"workspace_id": workspace_id, "version": oldest})
+    if first and first["kind"] != "snapshot":
+        plan = await get_exam_plan_version(workspace_id, oldest)
+        plan.pop("version", None)
+        await db.exam_plans.update_one(
+            {"_id": first["_id"]},
+            {"$set": {"kind": "snapshot", "plan": plan}, "$unset": {"delta": ""}}
+        )
+    result = await db.exam_plans.delete_many({
+        "workspace_id": workspace_id,
+        "$or": [{"version": {"$lt": oldest}}, {"version": {"$exists": False}}]
+    })
+    await db.exam_plan_heads.update_one(
+        {"workspace_id": workspace_id, "base_version": {"$lt": oldest}},
+        {"$set": {"base_version": oldest}}
+    )
+    return result.deleted_count
+
+# --- Seat Allocations ---
+
+# Each allocation run stores its seats in `seat_allocations`, one document per
+# seat tagged with the run's allocation_id, so exports can stream them back
+# in slot/room order. `seat_allocation_slots` points each (exam_date,
+# exam_session) slot at its current run: a save inserts the new seats first,
+# then swaps the pointer and drops the seats it replaced, so readers never
+# see a slot half-written and concurrent saves can't mix their seats.
+SEAT_EXPORT_SORT = [("exam_date", ASCENDING), ("exam_session", ASCENDING), ("room_id", ASCENDING), ("_id", ASCENDING)]
+
+async def save_seat_allocations(workspace_id: str, slots: List[Tuple[str, str]], room_allocations: List[dict]) -> int:
+    """Replaces the stored seats for the given (exam_date, exam_session) slots. Returns the seat count."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    allocation_id = str(ObjectId())
+    rows = [
+        {
+            "workspace_id": workspace_id,
+            "allocation_id": allocation_id,
+            "exam_date": room.get("exam_date", ""),
+            "exam_session": room.get("exam_session", ""),
+            "building_id": room.get("building_id", ""),
+            "room_id": room.get("room_id", ""),
+            "room_name": room.get("room_name", ""),
+            **seat,
+        }
+        for room in room_allocations
+        for seat in room.get("allocations", [])
+    ]
+    for start in range(0, len(rows), BULK_WRITE_CHUNK_SIZE):
+        await db.seat_allocations.insert_many(rows[start:start + BULK_WRITE_CHUNK_SIZE], ordered=False)
+
+    for exam_date, exam_session in sorted(set(slots)):
+        slot = {"workspace_id": workspace_id, "exam_date": exam_date, "exam_session": exam_session}
+        previous = await db.seat_allocation_slots.find_one_and_update(
+            slot, {"$set": {"allocation_id": allocation_id, "updated_at": datetime.now(timezone.utc)}}, upsert=True
+        )
+        # Seats saved before allocation ids existed have none
+        await db.seat_allocations.delete_many({
+            **slot, "allocation_id": previous["allocation_id"] if previous else {"$exists": False}
+        })
+    return len(rows)
+
+async def iter_seat_allocations(workspace_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    current = await db.seat_allocation_slots.distinct("allocation_id", {"workspace_id": workspace_id})
+    cursor = db.seat_allocations.find(
+        {"workspace_id": workspace_id, "allocation_id": {"$in": current}}, projection, batch_size=batch_size
+    ).sort(SEAT_EXPORT_SORT)
+    async for doc in cursor:
+        yield doc
 
 # --- Assignment Agent DB Helpers ---
 
-async def create_assignment(data: dict) -> str:
+# Assignment rosters live in `assignment_rosters`, one document per
+# (assignment_id, roll_number), so the assignment itself stays small and a
+# submission checks its roll number with a single index lookup.
+ASSIGNMENT_PUBLIC_FIELDS = {"title": 1, "description": 1, "subject_name": 1, "deadline": 1, "section": 1, "batch": 1}
+ROSTER_FIELDS = {"_id": 0, "roll_number": 1, "name": 1, "email": 1}
+
+async def _insert_roster(db, assignment_id: str, students: List[dict]):
+    rows = [
+        {"assignment_id": assignment_id, "roll_number": s["roll_number"], "name": s.get("name", ""), "email": s.get("email", "")}
+        for s in students
+    ]
+    for start in range(0, len(rows), BULK_WRITE_CHUNK_SIZE):
+        try:
+            await db.assignment_rosters.insert_many(rows[start:start + BULK_WRITE_CHUNK_SIZE], ordered=False)
+        except BulkWriteError as e:
+            # A roll number listed twice keeps its first entry
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+async def _delete_assignment_dependents(db, assignment_ids: List[str]):
+    if assignment_ids:
+        await db.assignment_submissions.delete_many({"assignment_id": {"$in": assignment_ids}})
+        await db.assignment_rosters.delete_many({"assignment_id": {"$in": assignment_ids}})
+
+async def create_assignment(data: dict, roster: List[dict]) -> str:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
     data["created_at"] = datetime.now(timezone.utc)
     data["reminder_sent"] = False
     result = await db.assignments.insert_one(data)
+    await _insert_roster(db, str(result.inserted_id), roster)
     return str(result.inserted_id)
 
-async def get_all_assignments(workspace_id: str):
+async def get_roster_entry(assignment_id: str, roll_number: str) -> Optional[dict]:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.assignments.find({"workspace_id": workspace_id}).sort("created_at", DESCENDING)
-    assignments = []
+    return await db.assignment_rosters.find_one({"assignment_id": assignment_id, "roll_number": roll_number}, ROSTER_FIELDS)
+
+async def iter_roster(assignment_id: str, batch_size: int = STREAM_BATCH_SIZE):
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.assignment_rosters.find({"assignment_id": assignment_id}, ROSTER_FIELDS, batch_size=batch_size)
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        assignments.append(doc)
-    return assignments
+        yield doc
 
-async def get_assignment_by_id(assignment_id: str) -> Optional[dict]:
+async def migrate_assignment_rosters():
+    """Moves rosters still embedded in assignment documents into assignment_rosters."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    # One-off: matches nothing once every assignment has been migrated
+    cursor = db.assignments.find({"students": {"$exists": True}}, {"students": 1})
+    async for doc in cursor:
+        await _insert_roster(db, str(doc["_id"]), doc.get("students") or [])
+        await db.assignments.update_one({"_id": doc["_id"]}, {"$unset": {"students": ""}})
+        print(f"Migrated roster of assignment {doc['_id']}")
+
+async def iter_assignments(workspace_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    cursor = db.assignments.find({"workspace_id": workspace_id}, projection, batch_size=batch_size).sort("created_at", DESCENDING)
+    async for doc in cursor:
+        yield _str_id(doc)
+
+async def get_all_assignments(workspace_id: str):
+    return [doc async for doc in iter_assignments(workspace_id)]
+
+async def get_assignments_page(workspace_id: str, limit: Optional[int] = None, after: Optional[str] = None):
+    """Keyset-paginated assignments, newest first. Returns (assignments, next_cursor)."""
+    return await find_page("assignments", {"workspace_id": workspace_id}, "created_at", descending=True, limit=limit, after=after)
+
+async def get_assignment_by_id(assignment_id: str, projection: Optional[dict] = None) -> Optional[dict]:
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
     try:
-        doc = await db.assignments.find_one({"_id": ObjectId(assignment_id)})
-        if doc:
-            doc["_id"] = str(doc["_id"])
-        return doc
+        doc = await db.assignments.find_one({"_id": ObjectId(assignment_id)}, projection)
+        return _str_id(doc)
     except Exception:
         return None
 
@@ -524,8 +1535,8 @@ async def delete_assignment(assignment_id: str, workspace_id: str) -> bool:
         raise RuntimeError("Database connection failed")
     result = await db.assignments.delete_one({"_id": ObjectId(assignment_id), "workspace_id": workspace_id})
     if result.deleted_count > 0:
-        # Also delete associated submissions
-        await db.assignment_submissions.delete_many({"assignment_id": assignment_id})
+        # Also delete associated submissions and the roster
+        await _delete_assignment_dependents(db, [assignment_id])
         return True
     return False
 
@@ -537,16 +1548,43 @@ async def create_submission(data: dict) -> str:
     result = await db.assignment_submissions.insert_one(data)
     return str(result.inserted_id)
 
-async def get_assignment_submissions(assignment_id: str):
+async def iter_submissions(assignment_id: str, projection: Optional[dict] = None, batch_size: int = STREAM_BATCH_SIZE):
     db = get_database()
     if db is None:
         raise RuntimeError("Database connection failed")
-    cursor = db.assignment_submissions.find({"assignment_id": assignment_id}).sort("submitted_at", DESCENDING)
-    subs = []
+    cursor = db.assignment_submissions.find({"assignment_id": assignment_id}, projection, batch_size=batch_size).sort("submitted_at", DESCENDING)
     async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        subs.append(doc)
-    return subs
+        yield _str_id(doc)
+
+async def get_assignment_submissions(assignment_id: str):
+    return [doc async for doc in iter_submissions(assignment_id)]
+
+async def get_submissions_page(assignment_id: str, limit: Optional[int] = None, after: Optional[str] = None, is_late: Optional[bool] = None):
+    """Keyset-paginated submissions, latest first. Returns (submissions, next_cursor)."""
+    query = {"assignment_id": assignment_id}
+    if is_late is not None:
+        query["is_late"] = is_late
+    return await find_page("assignment_submissions", query, "submitted_at", descending=True, limit=limit, after=after)
+
+async def get_submission_counts(assignment_ids: List[str]) -> dict:
+    """Returns {assignment_id: {"submitted": n, "late": n}} in a single aggregation."""
+    db = get_database()
+    if db is None:
+        raise RuntimeError("Database connection failed")
+    if not assignment_ids:
+        return {}
+    pipeline = [
+        {"$match": {"assignment_id": {"$in": assignment_ids}}},
+        {"$group": {
+            "_id": "$assignment_id",
+            "submitted": {"$sum": 1},
+            "late": {"$sum": {"$cond": [{"$eq": ["$is_late", True]}, 1, 0]}}
+        }}
+    ]
+    counts = {}
+    async for doc in db.assignment_submissions.aggregate(pipeline):
+        counts[doc["_id"]] = {"submitted": doc["submitted"], "late": doc["late"]}
+    return counts
 
 async def get_submission_by_roll(assignment_id: str, roll_number: str) -> Optional[dict]:
     db = get_database()
@@ -556,9 +1594,7 @@ async def get_submission_by_roll(assignment_id: str, roll_number: str) -> Option
         "assignment_id": assignment_id,
         "roll_number": roll_number
     })
-    if doc:
-        doc["_id"] = str(doc["_id"])
-    return doc
+    return _str_id(doc)
 
 async def update_assignment_reminder_sent(assignment_id: str) -> bool:
     db = get_database()
@@ -581,8 +1617,4 @@ async def get_assignments_needing_reminder():
         "reminder_sent": False,
         "deadline": {"$gte": now.isoformat(), "$lte": tomorrow.isoformat()}
     })
-    assignments = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])
-        assignments.append(doc)
-    return assignments
+    return [_str_id(doc) async for doc in cursor]
@@ -0,0 +1,404 @@
+import heapq
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Courses are colored on dense indices: adjacency[i] lists the neighbours of
+# course i and a coloring is a list of session indices, one per course.
+Adjacency = List[List[int]]
+ColoringStrategy = Callable[[Adjacency], List[int]]
+
+TABU_MAX_ITERATIONS = 20000  # per attempt at removing one session
+# Wall-clock cap on a scheduling run: the most an anytime budget may ask for,
+# and the limit tabu_coloring stops at when picked as a plain strategy
+MAX_SCHEDULING_BUDGET_MS = int(os.getenv("MAX_SCHEDULING_BUDGET_MS", "30000"))
+# anytime_coloring estimates the passes it can't interrupt from the greedy
+# pass: DSATUR measured 2-8x greedy, RLF 1-5x greedy per session used
+ANYTIME_DSATUR_COST = 10
+ANYTIME_RLF_COST = 6  # per session
+ANYTIME_REFINE_SHARE = 0.25  # of the budget kept back from DSATUR/RLF for tabu search and balancing
+ANYTIME_BALANCE_SHARE = 0.2  # of the budget left after the constructive passes
+
+
+def greedy_coloring(adjacency: Adjacency) -> List[int]:
+    """Largest degree first, each course taking the lowest session its neighbours leave free."""
+    colors = [-1] * len(adjacency)
+    for v in sorted(range(len(adjacency)), key=lambda i: len(adjacency[i]), reverse=True):
+        colors[v] = _lowest_free({colors[w] for w in adjacency[v]})
+    return colors
+
+
+def dsatur_coloring(adjacency: Adjacency) -> List[int]:
+    """Brélaz's DSATUR: always color the course whose neighbours already use the most sessions."""
+    colors = [-1] * len(adjacency)
+    neighbour_colors: List[Set[int]] = [set() for _ in adjacency]
+    heap = [(0, -len(neighbours), v) for v, neighbours in enumerate(adjacency)]
+    heapq.heapify(heap)
+    while heap:
+        saturation, _, v = heapq.heappop(heap)
+        # Stale entries are skipped; a fresher one was pushed when saturation rose
+        if colors[v] != -1 or -saturation != len(neighbour_colors[v]):
+            continue
+        color = _lowest_free(neighbour_colors[v])
+        colors[v] = color
+        for w in adjacency[v]:
+            if colors[w] == -1 and color not in neighbour_colors[w]:
+                neighbour_colors[w].add(color)
+                heapq.heappush(heap, (-len(neighbour_colors[w]), -len(adjacency[w]), w))
+    return colors
+
+
+def rlf_coloring(adjacency: Adjacency) -> List[int]:
+    """
+    Leighton's Recursive Largest First: builds one session at a time, each
+    time adding the candidate with the most neighbours already ruled out of
+    the session, so the courses left over stay as unconstrained as possible.
+    """
+    n = len(adjacency)
+    colors = [-1] * n
+    uncolored = set(range(n))
+    degree = [len(neighbours) for neighbours in adjacency]  # within the uncolored subgraph
+    color = 0
+    while uncolored:
+        candidates = set(uncolored)
+        ruled_out_neighbours = dict.fromkeys(candidates, 0)
+        by_degree = sorted(candidates, key=lambda i: (-degree[i], i))
+        fallback = 0
+        heap: List[Tuple[int, int, int]] = []
+        members = []
+        while candidates:
+            v = None
+            while heap:
+                count, _, u = heapq.heappop(heap)
+                if u in candidates and -count == ruled_out_neighbours[u]:
+                    v = u
+                    break
+            if v is None:
+                # Nothing touches the ruled-out set: take the largest remaining degree
+                while by_degree[fallback] not in candidates:
+                    fallback += 1
+                v = by_degree[fallback]
+            members.append(v)
+            candidates.discard(v)
+            for w in adjacency[v]:
+                if w in candidates:
+                    candidates.discard(w)
+                    for x in adjacency[w]:
+                        if x in candidates:
+                            ruled_out_neighbours[x] += 1
+                            heapq.heappush(heap, (-ruled_out_neighbours[x], degree[x], x))
+        for v in members:
+            colors[v] = color
+            uncolored.discard(v)
+            for w in adjacency[v]:
+                degree[w] -= 1
+        color += 1
+    return colors
+
+
+def tabu_coloring(adjacency: Adjacency, time_limit_ms: float = MAX_SCHEDULING_BUDGET_MS) -> List[int]:
+    """
+    DSATUR, then tabu search removing one session at a time for as long as it
+    succeeds or until `time_limit_ms` has passed.
+    """
+    deadline = time.monotonic() + time_limit_ms / 1000
+    return tabu_refine(adjacency, dsatur_coloring(adjacency), deadline=deadline)
+
+
+def tabu_refine(
+    adjacency: Adjacency,
+    colors: List[int],
+    max_iterations: int = TABU_MAX_ITERATIONS,
+    deadline: Optional[float] = None,
+    seed: int = 0,
+    on_improvement: Optional[Callable[[List[int]], None]] = None,
+) -> List[int]:
+    """
+    Repeatedly tries to fold the last session into the others with TabuCol
+    (Hertz & de Werra). Returns the best valid coloring found, stopping at
+    the clique lower bound, after the first attempt that fails within
+    `max_iterations`, or when time.monotonic() passes `deadline`.
+    `on_improvement` sees each new best.
+    """
+    rng = random.Random(seed)
+    best = list(colors)
+    sessions = max(best, default=-1) + 1
+    floor = clique_lower_bound(adjacency, deadline=deadline)
+    while sessions > floor and (deadline is None or time.monotonic() < deadline):
+        attempt = _tabucol(adjacency, best, sessions - 1, max_iterations, deadline, rng)
+        if attempt is None:
+            break
+        best = _compact(attempt)
+        sessions = max(best) + 1
+        if on_improvement is not None:
+            on_improvement(best)
+    return best
+
+
+def clique_lower_bound(adjacency: Adjacency, starts: int = 32, deadline: Optional[float] = None) -> int:
+    """
+    Size of a clique found greedily from the highest-degree courses. No
+    coloring can use fewer sessions, so refinement stops once it gets there.
+    Any clique is a valid bound, so passing `deadline` just stops the search
+    early with the largest one found so far.
+    """
+    neighbour_sets = [set(neighbours) for neighbours in adjacency]
+    best = 1 if adjacency else 0
+    for start in sorted(range(len(adjacency)), key=lambda i: len(adjacency[i]), reverse=True)[:starts]:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        size, candidates = 1, neighbour_sets[start]
+        while candidates:
+            v = max(candidates, key=lambda i: len(neighbour_sets[i] & candidates))
+            size += 1
+            candidates = candidates & neighbour_sets[v]
+        best = max(best, size)
+    return best
+
+
+def _tabucol(adjacency: Adjacency, colors: List[int], k: int, max_iterations: int,
+             deadline: Optional[float], rng: random.Random) -> Optional[List[int]]:
+    n = len(adjacency)
+    colors = list(colors)
+    # gamma[v][c]: neighbours of v currently in session c
+    gamma = [[0] * k for _ in range(n)]
+    for v in range(n):
+        if colors[v] >= k:
+            colors[v] = -1
+    for v in range(n):
+        for w in adjacency[v]:
+            if colors[w] >= 0:
+                gamma[v][colors[w]] += 1
+    # Courses from the dropped session go where they clash least
+    for v in range(n):
+        if colors[v] == -1:
+            row = gamma[v]
+            color = min(range(k), key=row.__getitem__)
+            colors[v] = color
+            for w in adjacency[v]:
+                gamma[w][color] += 1
+
+    clashes = sum(gamma[v][colors[v]] for v in range(n)) // 2
+    conflicting = {v for v in range(n) if gamma[v][colors[v]]}
+    tabu_until: Dict[Tuple[int, int], int] = {}
+
+    for iteration in range(max_iterations):
+        if clashes == 0:
+            return colors
+        if deadline is not None and iteration % 64 == 0 and time.monotonic() > deadline:
+            return None
+
+        best_delta, best_moves = None, []
+        for v in conflicting:
+            row, current = gamma[v], colors[v]
+            own = row[current]
+            for color in range(k):
+                if color == current:
+                    continue
+                delta = row[color] - own
+                if tabu_until.get((v, color), -1) > iteration and clashes + delta > 0:
+                    continue  # tabu, and not good enough to aspirate
+                if best_delta is None or delta < best_delta:
+                    best_delta, best_moves = delta, [(v, color)]
+                elif delta == best_delta:
+                    best_moves.append((v, color))
+        if not best_moves:
+            continue
+
+        v, color = best_moves[rng.randrange(len(best_moves))]
+        old = colors[v]
+        colors[v] = color
+        clashes += best_delta
+        for w in adjacency[v]:
+            gamma[w][old] -= 1
+            gamma[w][color] += 1
+            if gamma[w][colors[w]]:
+                conflicting.add(w)
+            else:
+                conflicting.discard(w)
+        if gamma[v][color]:
+            conflicting.add(v)
+        else:
+            conflicting.discard(v)
+        tabu_until[(v, old)] = iteration + int(0.6 * len(conflicting)) + rng.randrange(10) + 1
+
+    return colors if clashes == 0 else None
+
+
+def balance_sessions(
+    adjacency: Adjacency,
+    colors: List[int],
+    weights: Sequence[int],
+    deadline: Optional[float] = None,
+) -> List[int]:
+    """
+    Evens out session sizes without adding sessions: keeps moving a course
+    out of the heaviest session (by `weights`, e.g. enrolled students) into
+    a session none of its neighbours sit, while that lowers the peak.
+    """
+    colors = list(colors)
+    sessions = max(colors, default=-1) + 1
+    load = [0] * sessions
+    members: List[Set[int]] = [set() for _ in range(sessions)]
+    for v, color in enumerate(colors):
+        load[color] += weights[v]
+        members[color].add(v)
+
+    while sessions > 1 and (deadline is None or time.monotonic() < deadline):
+        heaviest = max(range(sessions), key=load.__getitem__)
+        best_move, best_peak = None, load[heaviest]
+        for v in members[heaviest]:
+            if not weights[v]:
+                continue
+            blocked = {colors[w] for w in adjacency[v]}
+            for color in range(sessions):
+                if color == heaviest or color in blocked:
+                    continue
+                peak = max(load[color] + weights[v], load[heaviest] - weights[v])
+                if peak < best_peak:
+                    best_move, best_peak = (v, color), peak
+        if best_move is None:
+            break
+        v, color = best_move
+        members[heaviest].discard(v)
+        members[color].add(v)
+        load[heaviest] -= weights[v]
+        load[color] += weights[v]
+        colors[v] = color
+    return colors
+
+
+def anytime_coloring(
+    adjacency: Adjacency,
+    time_budget_ms: float,
+    weights: Optional[Sequence[int]] = None,
+) -> Tuple[List[int], List[dict]]:
+    """
+    Greedy first, so a valid coloring exists immediately, then improves it
+    until the budget is spent: DSATUR and RLF passes, tabu search for fewer
+    sessions, and finally balance_sessions to lower the peak session load.
+    Returns the best coloring and a trace of {phase, elapsed_ms, sessions,
+    peak_session_load} recorded at each improvement.
+    """
+    weights = weights if weights is not None else [1] * len(adjacency)
+    started = time.monotonic()
+    deadline = started + time_budget_ms / 1000
+    trace: List[dict] = []
+
+    def record(phase: str, colors: List[int]):
+        trace.append({
+            "phase": phase,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 2),
+            "sessions": max(colors, default=-1) + 1,
+            "peak_session_load": _peak_load(colors, weights),
+        })
+
+    best = greedy_coloring(adjacency)
+    greedy_seconds = time.monotonic() - started
+    record("greedy", best)
+
+    # DSATUR and RLF can't be interrupted, so each only starts when its cost,
+    # estimated from the greedy pass, fits before the share kept for refinement
+    refine_from = deadline - time_budget_ms / 1000 * ANYTIME_REFINE_SHARE
+
+    def improve(phase: str, strategy: ColoringStrategy, estimate: float):
+        nonlocal best
+        if time.monotonic() + estimate > refine_from:
+            return
+        colors = strategy(adjacency)
+        if max(colors, default=-1) < max(best, default=-1):
+            best = colors
+            record(phase, best)
+
+    improve("dsatur", dsatur_coloring, greedy_seconds * ANYTIME_DSATUR_COST)
+    improve("rlf", rlf_coloring, greedy_seconds * ANYTIME_RLF_COST * (max(best, default=-1) + 1))
+
+    # Most of what is left goes to removing sessions; the rest to balancing
+    remaining = deadline - time.monotonic()
+    if remaining > 0:
+        best = tabu_refine(
+            adjacency, best, max_iterations=sys.maxsize, deadline=deadline - remaining * ANYTIME_BALANCE_SHARE,
+            on_improvement=lambda colors: record("tabu", colors),
+        )
+    if time.monotonic() < deadline:
+        # Every move lowers the load of the session it leaves below the old peak
+        balanced = balance_sessions(adjacency, best, weights, deadline=deadline)
+        if balanced != best:
+            best = balanced
+            record("balance", best)
+    return best, trace
+
+
+def _peak_load(colors: List[int], weights: Sequence[int]) -> int:
+    load: Dict[int, int] = {}
+    for v, color in enumerate(colors):
+        load[color] = load.get(color, 0) + weights[v]
+    return max(load.values(), default=0)
+
+
+def _compact(colors: List[int]) -> List[int]:
+    """Renumbers sessions 0..k-1 in their existing order, dropping any left empty."""
+    renumber = {color: i for i, color in enumerate(sorted(set(colors)))}
+    return [renumber[color] for color in colors]
+
+
+def _lowest_free(used: Set[int]) -> int:
+    color = 0
+    while color in used:
+        color += 1
+    return color
+
+
+COLORING_STRATEGIES: Dict[str, ColoringStrategy] = {
+    "greedy": greedy_coloring,
+    "dsatur": dsatur_coloring,
+    "rlf": rlf_coloring,
+    "tabu": tabu_coloring,
+}
+
+
+def to_adjacency(conflicts: Dict[str, Set[str]]) -> Tuple[List[str], Adjacency]:
+    """Dense form of a conflict graph keyed by course code (self-loops dropped)."""
+    codes = list(conflicts)
+    position = {code: i for i, code in enumerate(codes)}
+    adjacency = [
+        [position[other] for other in conflicts[code] if other != code and other in position]
+        for code in codes
+    ]
+    return codes, adjacency
+
+
+def color_conflict_graph(
+    conflicts: Dict[str, Set[str]],
+    strategy: str = "greedy",
+    time_budget_ms: Optional[float] = None,
+    weights: Optional[Dict[str, int]] = None,
+) -> Tuple[Dict[str, int], dict]:
+    """
+    Assigns each course code a session index with the named strategy, or
+    with anytime_coloring when `time_budget_ms` is given (`weights` then
+    sizes each course for balancing). Returns (colors, stats) where stats
+    reports the strategy, the number of sessions used and the wall time
+    spent coloring, plus the budget and quality trace in anytime mode.
+    """
+    if strategy not in COLORING_STRATEGIES:
+        raise ValueError(f"Unknown coloring strategy '{strategy}'; expected one of {', '.join(COLORING_STRATEGIES)}")
+    started = time.perf_counter()
+    codes, adjacency = to_adjacency(conflicts)
+    if time_budget_ms is None:
+        colors = COLORING_STRATEGIES[strategy](adjacency)
+        stats = {"strategy": strategy}
+    else:
+        course_weights = [weights.get(code, 0) for code in codes] if weights is not None else None
+        colors, trace = anytime_coloring(adjacency, time_budget_ms, course_weights)
+        stats = {
+            "strategy": "anytime",
+            "time_budget_ms": time_budget_ms,
+            "peak_session_load": trace[-1]["peak_session_load"],
+            "quality": trace,
+        }
+    stats["sessions"] = max(colors, default=-1) + 1
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return dict(zip(codes, colors)), stats
@@ -0,0 +1,48 @@
+from typing import AbstractSet, Dict, List, Mapping, Sequence, Set
+
+from .models import Course
+
+
+def build_conflict_graph(courses: Sequence[Course], course_students: Mapping[str, AbstractSet[str]]) -> Dict[str, Set[str]]:
+    """
+    Maps each course code to the codes it can't share a session with: two
+    courses conflict when they share a program or an enrolled student.
+
+    Rather than intersecting every pair of courses (O(C² × S)), students and
+    programs get dense ids and index the courses they touch; every course in
+    one index entry conflicts with every other. Students taking exactly the
+    same courses add the same edges, so their entries are collapsed first.
+    """
+    codes = [course.code for course in courses]
+
+    program_ids: Dict[str, int] = {}
+    student_ids: Dict[str, int] = {}
+    program_courses: List[List[int]] = []
+    student_courses: List[List[int]] = []
+    for idx, course in enumerate(courses):
+        for program in set(course.program_ids):
+            pid = program_ids.setdefault(program, len(program_ids))
+            if pid == len(program_courses):
+                program_courses.append([])
+            program_courses[pid].append(idx)
+        for student in course_students.get(course.code, ()):
+            sid = student_ids.setdefault(student, len(student_ids))
+            if sid == len(student_courses):
+                student_courses.append([])
+            student_courses[sid].append(idx)
+
+    # Course indices are appended in ascending order, so equal course sets
+    # produce equal tuples
+    student_groups = {tuple(members) for members in student_courses if len(members) > 1}
+
+    neighbours: List[Set[int]] = [set() for _ in courses]
+    for members in (*student_groups, *program_courses):
+        if len(members) > 1:
+            for idx in members:
+                neighbours[idx].update(members)
+
+    conflicts: Dict[str, Set[str]] = {code: set() for code in codes}
+    for idx, linked in enumerate(neighbours):
+        linked.discard(idx)
+        conflicts[codes[idx]].update(codes[j] for j in linked)
+    return conflicts
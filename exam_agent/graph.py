@@ -8,6 +8,8 @@ from pydantic import BaseModel, Field
 
 from .models import ExamPlan, TimetableEntry, ExamCycle, Student, Course, CalendarEvent
 from .state import SchedulingState
+from .conflict_graph import build_conflict_graph
+from .coloring import color_conflict_graph
 from .utils import get_llm_for_task
 
 # --- SCHEDULING GRAPH NODES ---
@@ -29,8 +31,7 @@ def modify_timetable_llm_node(state: SchedulingState) -> SchedulingState:
     """Use AI Agent to modify the generated parallel timetable based on custom instructions."""
     exam_cycle = state.get("exam_cycle")
     courses = state.get("courses", [])
-    holidays = state.get("holidays", [])
-    students = state.get("students", [])
+    blocked = state.get("blocked_dates", frozenset())
     request_data = state.get("request_data", {})
     algo_timetable = state.get("timetable", [])
     
@@ -50,7 +51,7 @@ def modify_timetable_llm_node(state: SchedulingState) -> SchedulingState:
     afternoon_end = request_data.get('afternoon_slot_end', '17:00')
     custom_inst = request_data.get("custom_instructions", "")
     
-    holiday_dates = [h.date for h in holidays if h.type == 'holiday']
+    holiday_dates = sorted(blocked)
     
     slots = []
     if morning_start and morning_end:
@@ -133,8 +134,8 @@ def generate_timetable_algorithmic_node(state: SchedulingState) -> SchedulingSta
     """Algorithmically generate a parallel timetable using graph coloring."""
     exam_cycle = state.get("exam_cycle")
     courses = state.get("courses", [])
-    holidays = state.get("holidays", [])
-    students = state.get("students", [])
+    holiday_dates = state.get("blocked_dates", frozenset())
+    enrolled = state.get("course_students", {})
     request_data = state.get("request_data", {})
     
     if not courses:
@@ -150,47 +151,23 @@ def generate_timetable_algorithmic_node(state: SchedulingState) -> SchedulingSta
     afternoon_start = request_data.get('afternoon_slot_start', '14:00')
     afternoon_end = request_data.get('afternoon_slot_end', '17:00')
     
-    holiday_dates = set(h.date for h in holidays if h.type == 'holiday')
-    
-    course_codes = [c.code for c in courses]
     course_map = {c.code: c for c in courses}
     
-    course_students = {c.code: set() for c in courses}
-    for student in students:
-        for cc in student.enrolled_courses:
-            if cc in course_students:
-                course_students[cc].add(student.id)
-                
-    conflicts = {c.code: set() for c in courses}
-    for i in range(len(courses)):
-        for j in range(i + 1, len(courses)):
-            c1 = courses[i]
-            c2 = courses[j]
-            shared_programs = set(c1.program_ids).intersection(set(c2.program_ids))
-            shared_students = course_students[c1.code].intersection(course_students[c2.code])
-            
-            if shared_programs or shared_students:
-                conflicts[c1.code].add(c2.code)
-                conflicts[c2.code].add(c1.code)
-                
-    sorted_codes = sorted(course_codes, key=lambda x: len(conflicts[x]), reverse=True)
-    
-    course_colors = {}
-    max_color = -1
-    
-    for code in sorted_codes:
-        neighbor_colors = {course_colors[neighbor] for neighbor in conflicts[code] if neighbor in course_colors}
-        
-        color = 0
-        while color in neighbor_colors:
-            color += 1
-            
-        course_colors[code] = color
-        max_color = max(max_color, color)
+    conflicts = build_conflict_graph(courses, enrolled)
+    strategy = request_data.get("coloring_strategy", "greedy")
+    # With a time budget, sessions are also balanced by enrolled headcount
+    time_budget_ms = request_data.get("time_budget_ms")
+    headcount = {code: len(enrolled.get(code, ())) for code in conflicts}
+    try:
+        course_colors, coloring_stats = color_conflict_graph(conflicts, strategy, time_budget_ms, headcount)
+    except ValueError as e:
+        return {**state, "errors": state.get("errors", []) + [str(e)]}
+    max_color = coloring_stats["sessions"] - 1
         
+    # Within a session, the most-conflicted courses are listed first
     color_groups = [[] for _ in range(max_color + 1)]
-    for code, color in course_colors.items():
-        color_groups[color].append(course_map[code])
+    for code in sorted(course_colors, key=lambda x: len(conflicts[x]), reverse=True):
+        color_groups[course_colors[code]].append(course_map[code])
             
     timetable = []
     
@@ -260,6 +237,7 @@ def generate_timetable_algorithmic_node(state: SchedulingState) -> SchedulingSta
     return {
         **state,
         "timetable": timetable,
+        "scheduling_stats": coloring_stats,
         "status": "complete"
     }
 
@@ -0,0 +1,73 @@
+"""
+Holiday rule engine.
+
+Recurring holidays are stored as compact HolidayRule records and only expanded
+for the date range a caller asks about. Expansions are memoized per
+(rules, range), so repeated calendar reads and scheduling runs over the same
+window cost a dictionary lookup.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Tuple
+
+from .models import HolidayRule
+
+DEFAULT_HOLIDAY_RULES: Tuple[HolidayRule, ...] = (
+    HolidayRule.model_validate({"_id": "sunday", "title": "Sunday", "kind": "weekly", "weekday": 6}),
+    HolidayRule.model_validate({"_id": "new_year", "title": "New Year's Day", "kind": "yearly", "month": 1, "day": 1}),
+)
+
+
+def _expand_rule(rule: HolidayRule, start: date, end: date) -> List[date]:
+    if rule.kind == "weekly":
+        d = start + timedelta(days=(rule.weekday - start.weekday()) % 7)
+        days = []
+        while d <= end:
+            days.append(d)
+            d += timedelta(days=7)
+        return days
+    if rule.kind == "yearly":
+        days = []
+        for year in range(start.year, end.year + 1):
+            try:
+                d = date(year, rule.month, rule.day)
+            except ValueError:
+                continue  # e.g. Feb 29 outside leap years
+            if start <= d <= end:
+                days.append(d)
+        return days
+    return [d for d in (date.fromisoformat(s) for s in rule.dates) if start <= d <= end]
+
+
+@lru_cache(maxsize=1024)
+def expand_holiday_rules(rules: Tuple[HolidayRule, ...], start: date, end: date) -> Tuple[Tuple[date, HolidayRule], ...]:
+    """All (date, rule) occurrences within [start, end], ordered by date."""
+    occurrences = [(d, rule) for rule in rules for d in _expand_rule(rule, start, end)]
+    occurrences.sort(key=lambda o: o[0])
+    return tuple(occurrences)
+
+
+@lru_cache(maxsize=1024)
+def holiday_dates(rules: Tuple[HolidayRule, ...], start: date, end: date) -> FrozenSet[str]:
+    """ISO dates blocked by `rules` within [start, end]."""
+    return frozenset(d.isoformat() for d, _ in expand_holiday_rules(rules, start, end))
+
+
+def holiday_events(rules: Tuple[HolidayRule, ...], start: date, end: date, workspace_id: str) -> List[dict]:
+    """Rule occurrences in [start, end] shaped like calendar_events documents."""
+    return [
+        {
+            "_id": f"{rule.id}_{d.isoformat()}",
+            "title": rule.title,
+            "date": d.isoformat(),
+            "type": "holiday",
+            "workspace_id": workspace_id,
+        }
+        for d, rule in expand_holiday_rules(rules, start, end)
+    ]
+
+
+def blocked_dates(rules: Tuple[HolidayRule, ...], events: Iterable[dict], start: date, end: date) -> FrozenSet[str]:
+    """Rule holidays plus stored holiday events in [start, end]."""
+    stored = {e["date"] for e in events if e.get("type") == "holiday"}
+    return holiday_dates(rules, start, end) | stored
@@ -1,6 +1,6 @@
-from typing import List, Optional, Literal
+from typing import List, Optional, Literal, Tuple
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field, field_validator, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator, EmailStr
 import re
 
 # --- Auth & Workspace Models ---
@@ -86,6 +86,30 @@ class CalendarEvent(BaseModel):
     type: Literal['holiday', 'event'] = "holiday"
     workspace_id: str
 
+class HolidayRule(BaseModel):
+    """Compact recurring/explicit holiday definition, expanded on demand for a date range."""
+    model_config = ConfigDict(frozen=True)
+
+    id: Optional[str] = Field(None, alias="_id")
+    title: str = Field(..., description="Holiday Name")
+    kind: Literal['weekly', 'yearly', 'dates']
+    weekday: Optional[int] = Field(None, ge=0, le=6, description="weekly: 0=Monday ... 6=Sunday")
+    month: Optional[int] = Field(None, ge=1, le=12, description="yearly: month of the holiday")
+    day: Optional[int] = Field(None, ge=1, le=31, description="yearly: day of the month")
+    dates: Tuple[str, ...] = Field(default=(), description="dates: explicit YYYY-MM-DD list")
+    workspace_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_kind_fields(self):
+        if self.kind == "weekly" and self.weekday is None:
+            raise ValueError("weekly rules need a weekday")
+        if self.kind == "yearly" and (self.month is None or self.day is None):
+            raise ValueError("yearly rules need a month and day")
+        if self.kind == "dates":
+            for d in self.dates:
+                datetime.strptime(d, "%Y-%m-%d")
+        return self
+
 class ExamCycle(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     name: str = Field(..., description="E.g. Midterms 2026")
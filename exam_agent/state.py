@@ -1,5 +1,5 @@
-from typing import List, TypedDict, Optional, Any, Dict
-from .models import Student, ExamCycle, TimetableEntry, CalendarEvent, Course, Room, RoomAllocation
+from typing import List, TypedDict, Optional, Any, Dict, AbstractSet
+from .models import Student, ExamCycle, TimetableEntry, Course, Room, RoomAllocation
 
 class SchedulingState(TypedDict):
     # Input
@@ -7,14 +7,15 @@ class SchedulingState(TypedDict):
     request_data: dict # dict representation of ExamRequest
     
     # Context Data
-    students: List[Student]
+    course_students: Dict[str, AbstractSet[str]]  # course_code -> enrolled student ids
     courses: List[Course]  # Courses belonging to this exam cycle
     exam_cycle: ExamCycle
-    holidays: List[CalendarEvent]
+    blocked_dates: AbstractSet[str]  # YYYY-MM-DD holidays within the scheduling window
     
     # Output
     timetable: List[TimetableEntry]
     conflicts: List[str]
+    scheduling_stats: Dict[str, Any]  # coloring strategy, sessions used, elapsed_ms
     
     # Flow Control
     status: str
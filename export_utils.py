@@ -0,0 +1,107 @@
+import asyncio
+import csv
+import io
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+
+from bson.objectid import ObjectId
+from openpyxl import Workbook
+
+from json_utils import dumps
+
+# Encoded rows are buffered up to this size before a chunk is sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _cell(value: Any) -> Any:
+    """Flattens a document value into something a CSV or XLSX cell can hold."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        # Excel has no timezone support; stored datetimes are UTC
+        return value.replace(tzinfo=None)
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(str(_cell(v)) for v in value)
+    return dumps(value).decode()
+
+
+async def ndjson_chunks(rows: AsyncIterator[dict], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for row in rows:
+        buffer += dumps({col: row.get(col) for col in columns})
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def csv_chunks(rows: AsyncIterator[dict], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(columns)
+    async for row in rows:
+        writer.writerow([_csv_value(row.get(col)) for col in columns])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def xlsx_chunks(rows: AsyncIterator[dict], columns: List[str], sheet_title: str = "Export") -> AsyncIterator[bytes]:
+    """
+    Writes rows through openpyxl's write-only mode, which streams each row
+    to a temporary file instead of keeping cells in memory. The zip container
+    can only be assembled once every row is in, so the finished workbook is
+    spooled to disk and then sent in chunks.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    sheet.append(columns)
+    async for row in rows:
+        sheet.append([_cell(row.get(col)) for col in columns])
+
+    with tempfile.TemporaryFile() as output:
+        await asyncio.to_thread(workbook.save, output)
+        output.seek(0)
+        while True:
+            chunk = await asyncio.to_thread(output.read, EXPORT_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _csv_value(value: Any) -> Any:
+    value = _cell(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def encode_export(rows: AsyncIterator[dict], columns: List[str], fmt: str, sheet_title: str = "Export") -> AsyncIterator[bytes]:
+    """Returns the chunk stream for `fmt` (one of EXPORT_FORMATS)."""
+    if fmt == "ndjson":
+        return ndjson_chunks(rows, columns)
+    if fmt == "csv":
+        return csv_chunks(rows, columns)
+    if fmt == "xlsx":
+        return xlsx_chunks(rows, columns, sheet_title)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def content_disposition(filename: str) -> Dict[str, str]:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
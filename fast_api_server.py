@@ -2,19 +2,18 @@ import os
 import uuid
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import timedelta, datetime, timezone
+import time
+from typing import Dict, Any, List, Literal, Optional
+from datetime import date, timedelta, datetime, timezone
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, EmailStr
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, ValidationError
 from fastapi import UploadFile, File, Form, BackgroundTasks
-import pandas as pd
-import io
 
 import uvicorn
 from dotenv import load_dotenv
@@ -24,33 +23,47 @@ from placement_cell_agent.models import InterviewRound, MockTest, Question
 from placement_cell_agent.graph import graph
 from exam_agent.graph import scheduling_graph
 from exam_agent.allocation_graph import allocation_graph
-from exam_agent.models import Building, Room, Department, Student, ExamCycle, Course, Program, Degree, CalendarEvent, TimetableEntry, RoomAllocation
+from exam_agent.models import Building, Room, Department, Student, ExamCycle, Course, Program, Degree, CalendarEvent, HolidayRule, TimetableEntry, RoomAllocation
+from exam_agent.holidays import DEFAULT_HOLIDAY_RULES, holiday_events, blocked_dates
+from exam_agent.coloring import MAX_SCHEDULING_BUDGET_MS
 from db import (
-    save_generation_to_db, get_generation_history,
-    create_user, get_user_by_email,
-    create_workspace, get_workspaces_for_user, get_workspace_by_id, add_member_to_workspace,
+    save_generation_to_db, get_generation_history_page,
+    create_user, get_user_by_email, get_cached_user, cache_stats,
+    create_workspace, get_workspaces_for_user, get_workspace_by_id, get_workspace_members, add_member_to_workspace,
     update_workspace, delete_workspace,
     create_invitation, get_invitation_by_token, update_invitation_status,
     create_building, create_room, create_department, create_student,
-    get_all_buildings, get_all_rooms, get_all_departments, get_all_students,
-    create_exam_cycle, get_all_exam_cycles, create_course, get_all_courses,
-    create_program, get_all_programs, create_degree, get_all_degrees,
-    get_database, get_latest_exam_plan, save_exam_plan,
-    create_calendar_event, get_calendar_events,
-    delete_document, update_document,
-    create_assignment, get_all_assignments, get_assignment_by_id, delete_assignment as db_delete_assignment,
-    create_submission, get_assignment_submissions, get_submission_by_roll,
-    update_assignment_reminder_sent, get_assignments_needing_reminder, get_filtered_students
+    get_students_page,
+    create_exam_cycle, get_all_exam_cycles, create_course,
+    create_program, create_degree,
+    get_database, get_reference_json, ensure_indexes, watch_cache_invalidations, get_latest_exam_plan, save_exam_plan,
+    get_exam_plan_version, list_exam_plan_versions,
+    STUDENT_ALLOCATION_FIELDS,
+    COURSE_SCHEDULING_FIELDS, ROOM_ALLOCATION_FIELDS, EXAM_CYCLE_SCHEDULING_FIELDS,
+    get_exam_cycle_by_id, find_courses, get_rooms_by_ids,
+    create_calendar_event, get_calendar_events, create_holiday_rule, get_holiday_rules, delete_holiday_rule,
+    delete_document, update_document, bulk_write_documents,
+    create_assignment, get_assignments_page, get_assignment_by_id, delete_assignment as db_delete_assignment,
+    get_roster_entry, iter_roster, migrate_assignment_rosters, ASSIGNMENT_PUBLIC_FIELDS,
+    create_submission, get_assignment_submissions, get_submissions_page, get_submission_by_roll, get_submission_counts,
+    update_assignment_reminder_sent, get_assignments_needing_reminder, get_filtered_students,
+    get_student_batch_years, get_cycle_membership,
+    get_course_enrollments, get_students_by_ids, backfill_enrollment_index, iter_submissions, bulk_write_students,
+    iter_students, save_seat_allocations, iter_seat_allocations
 )
 # ... imports ...
 
 # ... existing routes ...
 
 from auth_utils import (
-    get_password_hash, verify_password, create_access_token, decode_access_token,
+    get_password_hash_async, verify_password_async, create_access_token, decode_access_token,
+    password_hash_pool, token_cache,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from email_utils import send_invitation_email, send_assignment_notification, send_deadline_reminder
+from import_utils import read_student_sheet, parse_student_frame, REQUIRED_STUDENT_COLUMNS
+from json_utils import FastJSONResponse, ResponseView, encoded_response
+from export_utils import EXPORT_FORMATS, encode_export, content_disposition
 
 load_dotenv()
 
@@ -76,7 +89,7 @@ class AssignmentCreateRequest(BaseModel):
     deadline: str
     students: List[AssignmentStudentParams]
 
-app = FastAPI(title="Campus Agent API")
+app = FastAPI(title="Campus Agent API", default_response_class=FastJSONResponse)
 
 # Allow CORS
 app.add_middleware(
@@ -85,8 +98,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# --- Pagination ---
+# List endpoints take an optional `limit` and the opaque `after` cursor. The
+# body stays a plain list; when more rows exist the cursor for the next page
+# is returned in the X-Next-Cursor header. Omitting `limit` returns everything.
+MAX_PAGE_SIZE = 1000
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+# --- Response Views ---
+# Hot list endpoints encode trusted DB documents straight to JSON bytes with
+# these instead of re-validating them through `response_model` (which is kept
+# on the routes for the OpenAPI schema). Reference lists are also cached
+# pre-encoded next to the documents themselves.
+BUILDING_VIEW = ResponseView(Building)
+DEPARTMENT_VIEW = ResponseView(Department)
+DEGREE_VIEW = ResponseView(Degree)
+PROGRAM_VIEW = ResponseView(Program)
+COURSE_VIEW = ResponseView(Course)
+STUDENT_VIEW = ResponseView(Student)
+RAW_VIEW = ResponseView()
+ID_VIEW = ResponseView(renames={"_id": "id"})
+
+async def reference_response(collection_name: str, workspace_id: str, view: ResponseView, tag: str) -> Response:
+    return encoded_response(await get_reference_json(collection_name, workspace_id, view.encode, tag))
+
 # --- Auth Configuration ---
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -103,11 +145,21 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if email is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     
-    user = await get_user_by_email(email)
+    user = await get_cached_user(email)
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
+# --- Dependency: Workspace Membership ---
+async def ensure_workspace_member(workspace_id: str, user: dict):
+    if user["_id"] not in await get_workspace_members(workspace_id):
+        raise HTTPException(status_code=403, detail="Access to workspace denied")
+
+async def require_workspace_member(workspace_id: str, current_user: dict = Depends(get_current_user)) -> dict:
+    """The current user, for routes under /workspaces/{workspace_id}; 403 unless they are a member."""
+    await ensure_workspace_member(workspace_id, current_user)
+    return current_user
+
 # --- Pydantic Models ---
 
 class UserCreate(BaseModel):
@@ -145,6 +197,8 @@ class AgentResponse(BaseModel):
     errors: List[str]
     created_at: Optional[str] = None
 
+HISTORY_VIEW = ResponseView(AgentResponse, renames={"_id": "id"})
+
 class ExamRequest(BaseModel):
     workspace_id: str
     exam_cycle_id: str
@@ -170,12 +224,16 @@ class ExamRequest(BaseModel):
     avoid_weekends: bool = True
     specific_course_dates: Optional[Dict[str, str]] = None # e.g., {"CS101": "2024-05-10"}
     specific_course_slots: Optional[Dict[str, str]] = None # e.g., {"CS101": "morning"}
+    coloring_strategy: Literal["greedy", "dsatur", "rlf", "tabu"] = "greedy"  # see exam_agent.coloring
+    # Anytime mode: start from greedy and keep improving for this long (overrides coloring_strategy)
+    time_budget_ms: Optional[int] = Field(None, ge=0, le=MAX_SCHEDULING_BUDGET_MS)
 
 class ExamResponse(BaseModel):
     timetable: List[Dict[str, Any]]
     conflicts: List[str]
     status: str
     errors: List[str]
+    scheduling: Optional[Dict[str, Any]] = None  # strategy, sessions and elapsed_ms of the coloring run; anytime runs add a quality trace
 
 class ExamSelection(BaseModel):
     course_code: str
@@ -215,7 +273,7 @@ async def register(user: UserCreate):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_pw = get_password_hash(user.password)
+    hashed_pw = await get_password_hash_async(user.password)
     user_data = {
         "email": user.email,
         "full_name": user.full_name,
@@ -230,7 +288,7 @@ async def register(user: UserCreate):
 @app.post("/auth/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await get_user_by_email(form_data.username)
-    if not user or not verify_password(form_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(form_data.password, user["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -299,16 +357,14 @@ async def delete_workspace_endpoint(workspace_id: str, current_user: dict = Depe
 async def invite_member(
     workspace_id: str, 
     invite: InviteRequest, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_workspace_member)
 ):
+    # Any member can invite (checked by require_workspace_member); the
+    # workspace itself is only needed for its name
     ws = await get_workspace_by_id(workspace_id)
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
         
-    # Check permission (only members can invite? usually owner/admin, let's say any member for now)
-    if current_user["_id"] not in ws["members"]:
-        raise HTTPException(status_code=403, detail="Not authorized")
-        
     # Check if user already exists in workspace logic? For now assume adding new email.
     
     token = str(uuid.uuid4())
@@ -345,11 +401,11 @@ async def join_workspace(token: str, current_user: dict = Depends(get_current_us
 # --- Data Management Routes ---
 
 @app.get("/workspaces/{workspace_id}/buildings", response_model=List[Building])
-async def list_buildings(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_buildings(workspace_id)
+async def list_buildings(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("buildings", workspace_id, BUILDING_VIEW, "Building")
 
 @app.post("/workspaces/{workspace_id}/buildings", response_model=Dict[str, Any])
-async def add_building(workspace_id: str, building: Building, current_user: dict = Depends(get_current_user)):
+async def add_building(workspace_id: str, building: Building, current_user: dict = Depends(require_workspace_member)):
     if building.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     # Validate non-empty id/name
@@ -359,11 +415,11 @@ async def add_building(workspace_id: str, building: Building, current_user: dict
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/rooms", response_model=List[Dict[str, Any]])
-async def list_rooms(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_rooms(workspace_id)
+async def list_rooms(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("rooms", workspace_id, RAW_VIEW, "raw")
 
 @app.post("/workspaces/{workspace_id}/rooms", response_model=Dict[str, Any])
-async def add_room(workspace_id: str, room: Room, current_user: dict = Depends(get_current_user)):
+async def add_room(workspace_id: str, room: Room, current_user: dict = Depends(require_workspace_member)):
     if room.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     # Validate non-empty id/name
@@ -373,36 +429,60 @@ async def add_room(workspace_id: str, room: Room, current_user: dict = Depends(g
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/departments", response_model=List[Department])
-async def list_departments(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_departments(workspace_id)
+async def list_departments(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("departments", workspace_id, DEPARTMENT_VIEW, "Department")
 
 @app.post("/workspaces/{workspace_id}/departments", response_model=Dict[str, Any])
-async def add_department(workspace_id: str, dept: Department, current_user: dict = Depends(get_current_user)):
+async def add_department(workspace_id: str, dept: Department, current_user: dict = Depends(require_workspace_member)):
     if dept.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     id = await create_department(dept.model_dump())
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/degrees", response_model=List[Degree])
-async def list_degrees(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_degrees(workspace_id)
+async def list_degrees(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("degrees", workspace_id, DEGREE_VIEW, "Degree")
 
 @app.post("/workspaces/{workspace_id}/degrees", response_model=Dict[str, Any])
-async def add_degree(workspace_id: str, degree: Degree, current_user: dict = Depends(get_current_user)):
+async def add_degree(workspace_id: str, degree: Degree, current_user: dict = Depends(require_workspace_member)):
     if degree.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     id = await create_degree(degree.model_dump())
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/buildings/{building_id}/rooms", response_model=List[Dict[str, Any]])
-async def list_rooms_in_building(workspace_id: str, building_id: str, current_user: dict = Depends(get_current_user)):
+async def list_rooms_in_building(workspace_id: str, building_id: str, current_user: dict = Depends(require_workspace_member)):
     from db import get_rooms_by_building
-    return await get_rooms_by_building(workspace_id, building_id)
+    return RAW_VIEW.response(await get_rooms_by_building(workspace_id, building_id))
 
 # --- Calendar API ---
 
+# Widest window a single calendar read may expand
+MAX_CALENDAR_RANGE_DAYS = 366 * 10
+# Blocked dates are precomputed at least this far past the start date; the
+# scheduler keeps placing exams after end_date when they don't fit before it
+SCHEDULING_HORIZON_DAYS = 366
+
+def parse_calendar_range(from_date: Optional[str], to_date: Optional[str]):
+    """Resolves optional YYYY-MM-DD bounds; defaults to the legacy +/- 3 year window."""
+    current_year = datetime.now(timezone.utc).year
+    try:
+        start = date.fromisoformat(from_date) if from_date else date(current_year - 3, 1, 1)
+        end = date.fromisoformat(to_date) if to_date else date(current_year + 3, 12, 31)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from/to must be YYYY-MM-DD dates")
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days > MAX_CALENDAR_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Calendar range cannot exceed {MAX_CALENDAR_RANGE_DAYS} days")
+    return start, end
+
+async def get_workspace_holiday_rules(workspace_id: str):
+    custom_rules = tuple(HolidayRule(**r) for r in await get_holiday_rules(workspace_id))
+    return DEFAULT_HOLIDAY_RULES + custom_rules
+
 @app.post("/workspaces/{workspace_id}/calendar/events", response_model=Dict[str, Any])
-async def add_calendar_event(workspace_id: str, event: CalendarEvent, current_user: dict = Depends(get_current_user)):
+async def add_calendar_event(workspace_id: str, event: CalendarEvent, current_user: dict = Depends(require_workspace_member)):
     try:
         event_dict = event.model_dump()
         event_dict["workspace_id"] = workspace_id
@@ -412,25 +492,52 @@ async def add_calendar_event(workspace_id: str, event: CalendarEvent, current_us
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/workspaces/{workspace_id}/calendar", response_model=List[Dict[str, Any]])
-async def list_calendar_events(workspace_id: str, current_user: dict = Depends(get_current_user)):
+async def list_calendar_events(
+    workspace_id: str,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    current_user: dict = Depends(require_workspace_member)
+):
+    """Stored events plus recurring holidays expanded inside [from, to] only."""
+    start, end = parse_calendar_range(from_date, to_date)
     try:
-        events = await get_calendar_events(workspace_id)
-        # Dynamic Public Holidays could be injected here
-        # Return merged events
+        events = await get_calendar_events(workspace_id, start.isoformat(), end.isoformat())
+        rules = await get_workspace_holiday_rules(workspace_id)
+        events += holiday_events(rules, start, end, workspace_id)
         for e in events:
              e["id"] = e.pop("_id", None)
         return events
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/workspaces/{workspace_id}/calendar/rules", response_model=List[Dict[str, Any]])
+async def list_holiday_rules(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    rules = await get_workspace_holiday_rules(workspace_id)
+    return [{**r.model_dump(), "system": r.workspace_id is None} for r in rules]
+
+@app.post("/workspaces/{workspace_id}/calendar/rules", response_model=Dict[str, Any])
+async def add_holiday_rule(workspace_id: str, rule: HolidayRule, current_user: dict = Depends(require_workspace_member)):
+    rule_dict = rule.model_dump(exclude={"id"})
+    rule_dict["dates"] = list(rule_dict["dates"])
+    rule_dict["workspace_id"] = workspace_id
+    rule_id = await create_holiday_rule(rule_dict)
+    return {"id": rule_id, "message": "Holiday rule added"}
+
+@app.delete("/workspaces/{workspace_id}/calendar/rules/{rule_id}", response_model=Dict[str, Any])
+async def remove_holiday_rule(workspace_id: str, rule_id: str, current_user: dict = Depends(require_workspace_member)):
+    if not await delete_holiday_rule(rule_id, workspace_id):
+        raise HTTPException(status_code=404, detail="Holiday rule not found")
+    return {"message": "Holiday rule deleted"}
+
 @app.delete("/workspaces/{workspace_id}/calendar/{event_id}", response_model=Dict[str, Any])
-async def delete_calendar_event(workspace_id: str, event_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_calendar_event(workspace_id: str, event_id: str, current_user: dict = Depends(require_workspace_member)):
     try:
-        if event_id.startswith("sunday_") or event_id.startswith("new_year_"):
-            raise HTTPException(status_code=400, detail="Cannot delete default system holidays")
+        from bson import ObjectId
+        # Rule-generated holidays (e.g. "sunday_2026-01-04") have no document to delete
+        if not ObjectId.is_valid(event_id):
+            raise HTTPException(status_code=400, detail="Cannot delete recurring holidays; delete the holiday rule instead")
         
         db = get_database()
-        from bson import ObjectId
         await db.calendar_events.delete_one({"_id": ObjectId(event_id), "workspace_id": workspace_id})
         return {"message": "Event deleted"}
     except Exception as e:
@@ -442,23 +549,37 @@ async def delete_calendar_event(workspace_id: str, event_id: str, current_user:
 
 async def compute_cycle_data(workspace_id: str, semester: int, batch_year: int):
     """Helper to auto-compute students and programs for an exam cycle."""
-    students_in_workspace = await get_all_students(workspace_id)
-    
-    # Filter students by semester and batch_year
-    matching_students = [s for s in students_in_workspace if s.get("semester") == semester and s.get("batch_year") == batch_year]
-    
-    # Extract unique program_ids from matching students, ensuring they are strings
-    detected_program_ids = sorted(list(set([str(s.get("program_id")) for s in matching_students if s.get("program_id")])))
+    # Student writes keep existing cycles in sync; this is only needed when a
+    # cycle is created or its semester/batch_year change.
+    student_ids, detected_program_ids = await get_cycle_membership(workspace_id, semester, batch_year)
     
     return {
-        "student_ids": [str(s["_id"]) for s in matching_students],
+        "student_ids": student_ids,
         "program_ids": detected_program_ids,
-        "matching_students_count": len(matching_students),
+        "matching_students_count": len(student_ids),
         "detected_programs_count": len(detected_program_ids)
     }
 
+async def refresh_cycle_membership(workspace_id: str, cycle_id: str, data: dict):
+    """
+    Recomputes student_ids/program_ids for an exam cycle update, but only when
+    it moves the cycle to another semester or batch_year. Otherwise the
+    stored membership, which student writes keep current, is left alone.
+    """
+    semester, batch_year = data.get("semester"), data.get("batch_year")
+    if semester is None or batch_year is None:
+        return
+    stored = await get_exam_cycle_by_id(workspace_id, cycle_id, {"semester": 1, "batch_year": 1})
+    if stored and (stored.get("semester"), stored.get("batch_year")) == (semester, batch_year):
+        data.pop("student_ids", None)
+        data.pop("program_ids", None)
+        return
+    computed = await compute_cycle_data(workspace_id, semester, batch_year)
+    data["student_ids"] = computed["student_ids"]
+    data["program_ids"] = computed["program_ids"]
+
 @app.post("/workspaces/{workspace_id}/exam_cycles", response_model=Dict[str, Any])
-async def add_exam_cycle(workspace_id: str, cycle: ExamCycle, current_user: dict = Depends(get_current_user)):
+async def add_exam_cycle(workspace_id: str, cycle: ExamCycle, current_user: dict = Depends(require_workspace_member)):
     try:
         cycle_dict = cycle.model_dump()
         cycle_dict["workspace_id"] = workspace_id
@@ -479,96 +600,198 @@ async def add_exam_cycle(workspace_id: str, cycle: ExamCycle, current_user: dict
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/workspaces/{workspace_id}/exam_cycles", response_model=List[Dict[str, Any]])
-async def list_exam_cycles(workspace_id: str, current_user: dict = Depends(get_current_user)):
+async def list_exam_cycles(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
     try:
-        cycles = await get_all_exam_cycles(workspace_id)
-        for c in cycles:
-             c["id"] = c.pop("_id", None)
-        return cycles
+        return ID_VIEW.response(await get_all_exam_cycles(workspace_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/workspaces/{workspace_id}/programs", response_model=List[Program])
-async def list_programs(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_programs(workspace_id)
+async def list_programs(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("programs", workspace_id, PROGRAM_VIEW, "Program")
 
 @app.post("/workspaces/{workspace_id}/programs", response_model=Dict[str, Any])
-async def add_program(workspace_id: str, program: Program, current_user: dict = Depends(get_current_user)):
+async def add_program(workspace_id: str, program: Program, current_user: dict = Depends(require_workspace_member)):
     if program.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     id = await create_program(program.model_dump())
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/courses", response_model=List[Course])
-async def list_courses(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_courses(workspace_id)
+async def list_courses(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    return await reference_response("courses", workspace_id, COURSE_VIEW, "Course")
 
 @app.post("/workspaces/{workspace_id}/courses", response_model=Dict[str, Any])
-async def add_course(workspace_id: str, course: Course, current_user: dict = Depends(get_current_user)):
+async def add_course(workspace_id: str, course: Course, current_user: dict = Depends(require_workspace_member)):
     if course.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     id = await create_course(course.model_dump())
     return {"id": id}
 
 @app.post("/workspaces/{workspace_id}/students", response_model=Dict[str, Any])
-async def add_student(workspace_id: str, student: Student, current_user: dict = Depends(get_current_user)):
+async def add_student(workspace_id: str, student: Student, current_user: dict = Depends(require_workspace_member)):
     if student.workspace_id != workspace_id:
         raise HTTPException(status_code=400, detail="Workspace ID mismatch")
     id = await create_student(student.model_dump())
     return {"id": id}
 
 @app.get("/workspaces/{workspace_id}/students", response_model=List[Student])
-async def list_students(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    return await get_all_students(workspace_id)
+async def list_students(
+    workspace_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: str = "id",
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    semester: Optional[int] = None,
+    program_id: Optional[str] = None,
+    batch_year: Optional[int] = None,
+    current_user: dict = Depends(require_workspace_member)
+):
+    try:
+        students, next_cursor = await get_students_page(
+            workspace_id, limit=limit, after=after, sort=sort, descending=order == "desc",
+            batch_year=batch_year, program_id=program_id, semester=semester
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_next_cursor(STUDENT_VIEW.response(students), next_cursor)
 
 @app.get("/workspaces/{workspace_id}/batches", response_model=List[int])
-async def list_batches(workspace_id: str, current_user: dict = Depends(get_current_user)):
+async def list_batches(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
     try:
-        db = get_database()
-        if db is None:
-            raise RuntimeError("Database connection failed")
-        batches = await db.students.distinct("batch_year", {"workspace_id": workspace_id})
-        return sorted([b for b in batches if isinstance(b, int)])
+        return await get_student_batch_years(workspace_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/workspaces/{workspace_id}/students/import")
-async def import_students(workspace_id: str, file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
+async def import_students(
+    workspace_id: str,
+    file: UploadFile = File(...),
+    mode: str = "insert",
+    current_user: dict = Depends(require_workspace_member)
+):
+    """Bulk import students from CSV/XLSX. `mode=upsert` updates existing ids instead of duplicating them."""
+    if mode not in ("insert", "upsert"):
+        raise HTTPException(status_code=400, detail="mode must be 'insert' or 'upsert'")
     try:
+        started = time.perf_counter()
         contents = await file.read()
-        df = pd.read_excel(io.BytesIO(contents))
+        df = read_student_sheet(contents, file.filename)
         
         # Validate required columns
-        required_cols = ['id', 'name', 'semester']
-        if not all(col in df.columns for col in required_cols):
-            raise HTTPException(status_code=400, detail=f"Excel must have columns: {', '.join(required_cols)}")
+        missing_cols = [col for col in REQUIRED_STUDENT_COLUMNS if col not in df.columns]
+        if missing_cols:
+            raise HTTPException(status_code=400, detail=f"File must have columns: {', '.join(REQUIRED_STUDENT_COLUMNS)}")
         
-        students_created = 0
-        for _, row in df.iterrows():
-            student_data = {
-                "id": str(row['id']),
-                "name": str(row['name']),
-                "semester": int(row['semester']) if pd.notna(row['semester']) else 1,
-                "program_id": str(row.get('program_id', 'Unknown')),
-                "enrolled_courses": str(row.get('enrolled_courses', '')).split(',') if pd.notna(row.get('enrolled_courses')) else [],
-                "workspace_id": workspace_id
-            }
-            await create_student(student_data)
-            students_created += 1
+        students, rows, errors = parse_student_frame(df, workspace_id)
+        written = await bulk_write_students(students, upsert=(mode == "upsert"))
+        for err in written["errors"]:
+            errors.append({"row": rows[err["index"]], "id": err["id"], "error": err["error"]})
+        errors.sort(key=lambda e: e["row"])
         
-        return {"message": f"Successfully imported {students_created} students"}
+        imported = written["inserted"] + written["updated"]
+        elapsed = time.perf_counter() - started
+        return {
+            "message": f"Successfully imported {imported} students" + (f" ({len(errors)} rows failed)" if errors else ""),
+            "total_rows": len(df),
+            "inserted": written["inserted"],
+            "updated": written["updated"],
+            "failed": len(errors),
+            "errors": errors,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "rows_per_sec": round(len(df) / elapsed, 1) if elapsed > 0 else None
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
 
 # --- Generic CRUD Endpoints for Refinements ---
 
+GENERIC_RESOURCE_TYPES = ["courses", "exams", "exam_cycles", "buildings", "rooms", "departments", "students", "programs", "degrees", "assignments"]
+
+# Models used to validate bulk creates; types without one (exams, assignments)
+# have dedicated create flows and only accept bulk update/delete.
+RESOURCE_MODELS = {
+    "courses": Course, "exam_cycles": ExamCycle, "buildings": Building, "rooms": Room,
+    "departments": Department, "students": Student, "programs": Program, "degrees": Degree,
+}
+
+MAX_BULK_OPERATIONS = 1000
+
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None
+    data: Dict[str, Any] = Field(default_factory=dict)
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+
+@app.post("/workspaces/{workspace_id}/{resource_type}/bulk")
+async def bulk_items(workspace_id: str, resource_type: str, request: BulkRequest, current_user: dict = Depends(require_workspace_member)):
+    """
+    Applies a batch of create/update/delete operations in one unordered write.
+
+    Every operation gets its own result ({"index", "ok", "id"} or
+    {"index", "ok", "error"}); one bad item doesn't fail the rest.
+    """
+    if resource_type not in GENERIC_RESOURCE_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid resource type")
+    if len(request.operations) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPERATIONS} operations per request")
+
+    results: List[Optional[dict]] = [None] * len(request.operations)
+    operations = []
+    for index, item in enumerate(request.operations):
+        def reject(error: str):
+            results[index] = {"index": index, "ok": False, "error": error}
+
+        data = dict(item.data)
+        if item.op == "create":
+            model = RESOURCE_MODELS.get(resource_type)
+            if model is None:
+                reject(f"Bulk create is not supported for {resource_type}")
+                continue
+            if data.setdefault("workspace_id", workspace_id) != workspace_id:
+                reject("Workspace ID mismatch")
+                continue
+            try:
+                validated = model(**data)
+            except ValidationError as e:
+                reject(str(e))
+                continue
+            if resource_type in ("buildings", "rooms") and (not validated.id.strip() or not validated.name.strip()):
+                reject("id and name must be non-empty")
+                continue
+            data = validated.model_dump()
+            if resource_type == "exam_cycles":
+                computed = await compute_cycle_data(workspace_id, validated.semester, validated.batch_year)
+                data["student_ids"] = computed["student_ids"]
+                data["program_ids"] = computed["program_ids"]
+        elif not item.id:
+            reject("Missing id")
+            continue
+        elif item.op == "update":
+            data["workspace_id"] = workspace_id
+            if resource_type == "exam_cycles":
+                await refresh_cycle_membership(workspace_id, item.id, data)
+        operations.append({"index": index, "op": item.op, "id": item.id, "data": data})
+
+    try:
+        for result in await bulk_write_documents(resource_type, workspace_id, operations):
+            results[result["index"]] = result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    succeeded = sum(1 for r in results if r["ok"])
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
 @app.delete("/workspaces/{workspace_id}/{resource_type}/{item_id}")
-async def delete_item(workspace_id: str, resource_type: str, item_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_item(workspace_id: str, resource_type: str, item_id: str, current_user: dict = Depends(require_workspace_member)):
     # Simple mapping for resource_type to collection name
     # "courses" -> "courses", "exams" -> "exams", "buildings" -> "buildings", etc.
     # Validate resource type
-    valid_types = ["courses", "exams", "exam_cycles", "buildings", "rooms", "departments", "students", "programs", "degrees", "assignments"]
-    if resource_type not in valid_types:
+    if resource_type not in GENERIC_RESOURCE_TYPES:
         raise HTTPException(status_code=400, detail="Invalid resource type")
         
     success = await delete_document(resource_type, item_id, workspace_id)
@@ -578,10 +801,9 @@ async def delete_item(workspace_id: str, resource_type: str, item_id: str, curre
 
 
 @app.delete("/workspaces/{workspace_id}/{resource_type}")
-async def delete_item_by_query(workspace_id: str, resource_type: str, id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def delete_item_by_query(workspace_id: str, resource_type: str, id: Optional[str] = None, current_user: dict = Depends(require_workspace_member)):
     # Allow deletion by query parameter `id` when path item_id is not convenient (e.g., empty string ids)
-    valid_types = ["courses", "exams", "exam_cycles", "buildings", "rooms", "departments", "students", "programs", "degrees", "exam_plans", "assignments"]
-    if resource_type not in valid_types:
+    if resource_type not in GENERIC_RESOURCE_TYPES + ["exam_plans"]:
         raise HTTPException(status_code=400, detail="Invalid resource type")
 
     if id == "all":
@@ -598,9 +820,8 @@ async def delete_item_by_query(workspace_id: str, resource_type: str, id: Option
     return {"message": "Deleted successfully"}
 
 @app.put("/workspaces/{workspace_id}/{resource_type}/{item_id}")
-async def update_item(workspace_id: str, resource_type: str, item_id: str, data: Dict[str, Any], current_user: dict = Depends(get_current_user)):
-    valid_types = ["courses", "exams", "exam_cycles", "buildings", "rooms", "departments", "students", "programs", "degrees", "assignments"]
-    if resource_type not in valid_types:
+async def update_item(workspace_id: str, resource_type: str, item_id: str, data: Dict[str, Any], current_user: dict = Depends(require_workspace_member)):
+    if resource_type not in GENERIC_RESOURCE_TYPES:
         raise HTTPException(status_code=400, detail="Invalid resource type")
     
     # Ensure workspace_id in data matches
@@ -608,12 +829,7 @@ async def update_item(workspace_id: str, resource_type: str, item_id: str, data:
 
     # If updating an exam cycle, re-compute student and program lists
     if resource_type == "exam_cycles":
-        semester = data.get("semester")
-        batch_year = data.get("batch_year")
-        if semester is not None and batch_year is not None:
-            computed = await compute_cycle_data(workspace_id, semester, batch_year)
-            data["student_ids"] = computed["student_ids"]
-            data["program_ids"] = computed["program_ids"]
+        await refresh_cycle_membership(workspace_id, item_id, data)
     
     try:
         success = await update_document(resource_type, item_id, data, workspace_id)
@@ -667,80 +883,103 @@ async def generate_interview_plan(request: JDRequest, current_user: dict = Depen
         print(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Saved plans are whatever the client posted, so any ExamResponse field may be missing
+EXAM_PLAN_DEFAULTS = {
+    "timetable": [],
+    "conflicts": [],
+    "status": "start",
+    "errors": []
+}
+
 @app.get("/workspaces/{workspace_id}/exam_plan", response_model=ExamResponse)
-async def get_exam_plan(workspace_id: str, current_user: dict = Depends(get_current_user)):
+async def get_exam_plan(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
     try:
         plan = await get_latest_exam_plan(workspace_id)
         if not plan:
-            return {
-                "timetable": [],
-                "conflicts": [],
-                "status": "start",
-                "errors": []
-            }
+            return dict(EXAM_PLAN_DEFAULTS)
         
         # Clean up
         plan.pop("_id", None)
         plan.pop("workspace_id", None)
         plan.pop("created_at", None)
         
-        return plan
+        return {**EXAM_PLAN_DEFAULTS, **plan}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/workspaces/{workspace_id}/exam_plan/versions", response_model=List[Dict[str, Any]])
+async def list_exam_plan_history(workspace_id: str, current_user: dict = Depends(require_workspace_member)):
+    versions = await list_exam_plan_versions(workspace_id)
+    for v in versions:
+        if hasattr(v.get("created_at"), "isoformat"):
+            v["created_at"] = v["created_at"].isoformat()
+    return versions
+
+@app.get("/workspaces/{workspace_id}/exam_plan/versions/{version}", response_model=ExamResponse)
+async def get_exam_plan_at_version(workspace_id: str, version: int, current_user: dict = Depends(require_workspace_member)):
+    plan = await get_exam_plan_version(workspace_id, version)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Exam plan version not found")
+    return {**EXAM_PLAN_DEFAULTS, **plan}
+
 @app.post("/workspaces/{workspace_id}/exam_plan", response_model=Dict[str, Any])
-async def save_exam_plan_endpoint(workspace_id: str, plan: Dict[str, Any], current_user: dict = Depends(get_current_user)):
+async def save_exam_plan_endpoint(workspace_id: str, plan: Dict[str, Any], current_user: dict = Depends(require_workspace_member)):
     try:
-        from db import save_exam_plan
-        saved_id = await save_exam_plan(workspace_id, plan)
-        return {"id": saved_id, "message": "Exam plan saved successfully"}
+        saved = await save_exam_plan(workspace_id, plan)
+        return {**saved, "message": "Exam plan saved successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/exam/schedule", response_model=ExamResponse)
 async def schedule_exams(request: ExamRequest, current_user: dict = Depends(get_current_user)):
-    ws = await get_workspace_by_id(request.workspace_id)
-    if not ws or current_user["_id"] not in ws.get("members", []):
-         raise HTTPException(status_code=403, detail="Access to workspace denied")
+    await ensure_workspace_member(request.workspace_id, current_user)
 
     try:
-        # Fetch exam cycle
-        cycles = await get_all_exam_cycles(request.workspace_id)
-        cycle_dict = next((c for c in cycles if str(c.get("_id", c.get("id"))) == request.exam_cycle_id), None)
+        # Fetch exam cycle (its student list isn't needed for scheduling)
+        cycle_dict = await get_exam_cycle_by_id(request.workspace_id, request.exam_cycle_id, projection=EXAM_CYCLE_SCHEDULING_FIELDS)
         if not cycle_dict:
             raise HTTPException(status_code=404, detail="Exam cycle not found")
         exam_cycle = ExamCycle(**cycle_dict)
         
-        # Fetch all courses for this workspace, then filter by exam cycle's semester & batch_year
-        all_courses_data = await get_all_courses(request.workspace_id)
-        cycle_courses = []
-        cycle_program_ids = set(exam_cycle.program_ids)
-        
-        for c_data in all_courses_data:
-            course = Course(**c_data)
-            # Course belongs to this exam cycle if it matches the semester AND batch_year
-            if course.semester == exam_cycle.semester and exam_cycle.batch_year in course.batch_ids:
-                # Include course if any of its program_ids match the cycle's program_ids
-                if any(pid in cycle_program_ids for pid in course.program_ids):
-                    cycle_courses.append(course)
+        # Courses of this cycle: same semester, offered to its batch, and shared with any of its programs
+        courses_data = await find_courses(
+            request.workspace_id,
+            semester=exam_cycle.semester,
+            batch_year=exam_cycle.batch_year,
+            program_ids=exam_cycle.program_ids,
+            projection=COURSE_SCHEDULING_FIELDS
+        )
+        cycle_courses = [Course(**c_data) for c_data in courses_data]
         
         if not cycle_courses:
             raise HTTPException(status_code=400, detail="No courses found matching this exam cycle's semester, batch year, and programs.")
         
-        # Fetch students and holidays
-        students_data = await get_all_students(request.workspace_id)
-        students = [Student(**s) for s in students_data]
+        # Only the enrollment rows of this cycle's courses are needed for conflicts
+        enrollments = await get_course_enrollments(request.workspace_id, [c.code for c in cycle_courses])
+        course_students = {code: frozenset(ids) for code, ids in enrollments.items()}
         
-        events_data = await get_calendar_events(request.workspace_id)
-        holidays = [CalendarEvent(**e) for e in events_data if e.get("type") == "holiday"]
+        # Precompute blocked dates for the scheduling window only
+        try:
+            window_start = date.fromisoformat(request.start_date)
+            window_end = window_start + timedelta(days=SCHEDULING_HORIZON_DAYS)
+            try:
+                if request.end_date:
+                    window_end = max(window_end, date.fromisoformat(request.end_date))
+            except ValueError:
+                pass  # the scheduler doesn't read end_date
+            events_data = await get_calendar_events(request.workspace_id, window_start.isoformat(), window_end.isoformat())
+            rules = await get_workspace_holiday_rules(request.workspace_id)
+            holidays = blocked_dates(rules, events_data, window_start, window_end)
+        except ValueError:
+            holidays = frozenset()  # the scheduling node reports the bad date
         
         initial_state = {
             "workspace_id": request.workspace_id,
             "request_data": pydantic_to_dict(request),
-            "students": students,
+            "course_students": course_students,
             "courses": cycle_courses,
             "exam_cycle": exam_cycle,
-            "holidays": holidays,
+            "blocked_dates": holidays,
             "timetable": [],
             "status": "start",
             "errors": [],
@@ -755,7 +994,8 @@ async def schedule_exams(request: ExamRequest, current_user: dict = Depends(get_
             "timetable": timetable,
             "conflicts": result.get("conflicts", []),
             "status": result.get("status", "unknown"),
-            "errors": result.get("errors", [])
+            "errors": result.get("errors", []),
+            "scheduling": result.get("scheduling_stats")
         }
         return response_payload
     except Exception as e:
@@ -767,27 +1007,25 @@ async def schedule_exams(request: ExamRequest, current_user: dict = Depends(get_
 
 @app.post("/exam/allocate", response_model=AllocationResponse)
 async def allocate_seats(request: AllocationRequest, current_user: dict = Depends(get_current_user)):
-    ws = await get_workspace_by_id(request.workspace_id)
-    if not ws or current_user["_id"] not in ws.get("members", []):
-        raise HTTPException(status_code=403, detail="Access to workspace denied")
+    """
+    Allocates seats for the selected exams and persists the result, replacing
+    the stored seats of each requested (date, session) slot. The latest
+    allocation is exported by /workspaces/{workspace_id}/export/seat_allocations.
+    """
+    await ensure_workspace_member(request.workspace_id, current_user)
     
     try:
-        # Fetch exam cycle
-        cycles = await get_all_exam_cycles(request.workspace_id)
-        cycle_dict = next((c for c in cycles if str(c.get("_id", c.get("id"))) == request.exam_cycle_id), None)
-        if not cycle_dict:
+        # Check the exam cycle exists
+        if not await get_exam_cycle_by_id(request.workspace_id, request.exam_cycle_id, projection={"_id": 1}):
             raise HTTPException(status_code=404, detail="Exam cycle not found")
-        exam_cycle = ExamCycle(**cycle_dict)
         
         # Fetch rooms by their IDs
-        all_rooms_data = await get_all_rooms(request.workspace_id)
         requested_room_ids = {ra.room_id for ra in request.room_assignments}
+        rooms_data = await get_rooms_by_ids(request.workspace_id, sorted(requested_room_ids), projection=ROOM_ALLOCATION_FIELDS)
         rooms = []
-        for r_data in all_rooms_data:
-            r_copy = dict(r_data)
-            r_copy.pop("_id", None)
-            if r_copy.get("id") in requested_room_ids:
-                rooms.append(Room(**r_copy))
+        for r_data in rooms_data:
+            r_data.pop("_id", None)
+            rooms.append(Room(**r_data))
         
         if not rooms:
             raise HTTPException(status_code=400, detail="None of the requested rooms were found.")
@@ -810,12 +1048,14 @@ async def allocate_seats(request: AllocationRequest, current_user: dict = Depend
         ]
         
         # Fetch courses
-        all_courses_data = await get_all_courses(request.workspace_id)
         selected_codes = {ex.course_code for ex in request.exams}
-        courses = [Course(**c) for c in all_courses_data if c.get("code") in selected_codes]
+        courses_data = await find_courses(request.workspace_id, codes=sorted(selected_codes), projection=COURSE_SCHEDULING_FIELDS)
+        courses = [Course(**c) for c in courses_data]
         
-        # Fetch students
-        students_data = await get_all_students(request.workspace_id)
+        # Fetch only the students enrolled in the selected exams
+        enrollments = await get_course_enrollments(request.workspace_id, list(selected_codes))
+        enrolled_ids = sorted({sid for ids in enrollments.values() for sid in ids})
+        students_data = await get_students_by_ids(request.workspace_id, enrolled_ids, projection=STUDENT_ALLOCATION_FIELDS)
         students = [Student(**s) for s in students_data]
         
         initial_state = {
@@ -835,6 +1075,9 @@ async def allocate_seats(request: AllocationRequest, current_user: dict = Depend
         result = await allocation_graph.ainvoke(initial_state)
         
         room_allocations = [ra.model_dump() for ra in result.get("room_allocations", [])]
+        await save_seat_allocations(
+            request.workspace_id, [(ex.date, ex.session) for ex in request.exams], room_allocations
+        )
         
         return {
             "room_allocations": room_allocations,
@@ -850,18 +1093,76 @@ async def allocate_seats(request: AllocationRequest, current_user: dict = Depend
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Streaming Exports ---
+# Exports are encoded row by row as the cursor yields them, so a 100k-row
+# roster is sent without ever being held in memory.
+
+ExportFormat = Literal["ndjson", "csv", "xlsx"]
+
+STUDENT_EXPORT_COLUMNS = ["id", "name", "program_id", "batch_year", "semester", "enrolled_courses"]
+TIMETABLE_EXPORT_COLUMNS = ["date", "session", "start_time", "end_time", "course_code", "course_name", "program_ids", "batch_year"]
+SEAT_EXPORT_COLUMNS = [
+    "exam_date", "exam_session", "building_id", "room_id", "room_name", "seat_label", "bench_index", "seat_position",
+    "student_id", "student_name", "course_code", "program_id", "batch_year"
+]
+SUBMISSION_EXPORT_COLUMNS = ["roll_number", "student_name", "student_email", "file_name", "is_late", "submitted_at"]
+
+def export_response(rows, columns: List[str], fmt: str, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        encode_export(rows, columns, fmt, sheet_title=name),
+        media_type=EXPORT_FORMATS[fmt],
+        headers=content_disposition(f"{name}.{fmt}")
+    )
+
+def _projection(columns: List[str]) -> dict:
+    return {col: 1 for col in columns}
+
+@app.get("/workspaces/{workspace_id}/export/students")
+async def export_students(
+    workspace_id: str,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    current_user: dict = Depends(require_workspace_member)
+):
+    rows = iter_students(workspace_id, projection=_projection(STUDENT_EXPORT_COLUMNS))
+    return export_response(rows, STUDENT_EXPORT_COLUMNS, fmt, "students")
+
+@app.get("/workspaces/{workspace_id}/export/timetable")
+async def export_timetable(
+    workspace_id: str,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    current_user: dict = Depends(require_workspace_member)
+):
+    plan = await get_latest_exam_plan(workspace_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="No exam plan saved for this workspace")
+
+    async def rows():
+        for entry in plan.get("timetable", []):
+            yield entry
+
+    return export_response(rows(), TIMETABLE_EXPORT_COLUMNS, fmt, "timetable")
+
+@app.get("/workspaces/{workspace_id}/export/seat_allocations")
+async def export_seat_allocations(
+    workspace_id: str,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    current_user: dict = Depends(require_workspace_member)
+):
+    rows = iter_seat_allocations(workspace_id, projection=_projection(SEAT_EXPORT_COLUMNS))
+    return export_response(rows, SEAT_EXPORT_COLUMNS, fmt, "seat_allocations")
+
 @app.get("/history", response_model=List[AgentResponse])
-async def get_history(current_user: dict = Depends(get_current_user)):
+async def get_history(
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     # Filtering history by user? Or global? Keeping global for now as per minimal changes, but require auth.
     try:
-        history = await get_generation_history(limit=20)
-        results = []
-        for item in history:
-            item["id"] = item.pop("_id")
-            if "created_at" in item:
-                item["created_at"] = item["created_at"].isoformat()
-            results.append(AgentResponse(**item))
-        return results
+        history, next_cursor = await get_generation_history_page(limit=limit, after=after)
+        return set_next_cursor(HISTORY_VIEW.response(history), next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -873,7 +1174,7 @@ async def get_students_filtered(
     batch_year: Optional[int] = None,
     program_id: Optional[str] = None,
     semester: Optional[int] = None,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_workspace_member)
 ):
     """Get students filtered by batch, program, and semester for assignment creation."""
     try:
@@ -893,7 +1194,7 @@ async def create_new_assignment(
     workspace_id: str,
     request: AssignmentCreateRequest,
     background_tasks: BackgroundTasks,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_workspace_member)
 ):
     """Create an assignment with a specific list of students and send notification emails."""
     try:
@@ -912,12 +1213,11 @@ async def create_new_assignment(
             "deadline": request.deadline,
             "workspace_id": workspace_id,
             "created_by": current_user["_id"],
-            "students": students_list,
             "total_students": len(students_list),
             "student_list_file": None  # No longer using file upload
         }
         
-        assignment_id = await create_assignment(assignment_data)
+        assignment_id = await create_assignment(assignment_data, roster=students_list)
         
         # Send emails in background
         frontend_url = os.getenv("FRONTEND_URL", "http://localhost:8000")
@@ -953,24 +1253,30 @@ async def create_new_assignment(
 
 
 @app.get("/workspaces/{workspace_id}/assignments")
-async def list_assignments(workspace_id: str, current_user: dict = Depends(get_current_user)):
-    """List all assignments for a workspace."""
+async def list_assignments(
+    workspace_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(require_workspace_member)
+):
+    """List assignments for a workspace, newest first."""
     try:
-        assignments = await get_all_assignments(workspace_id)
-        # Add submission count for each assignment
+        assignments, next_cursor = await get_assignments_page(workspace_id, limit=limit, after=after)
+        # Add submission counts for every assignment from one aggregation
+        counts = await get_submission_counts([str(a["_id"]) for a in assignments])
         for a in assignments:
-            subs = await get_assignment_submissions(a["_id"])
-            a["submitted_count"] = len(subs)
-            a["id"] = a.pop("_id")
-            if "created_at" in a and hasattr(a["created_at"], "isoformat"):
-                a["created_at"] = a["created_at"].isoformat()
-        return assignments
+            a_counts = counts.get(str(a["_id"]), {})
+            a["submitted_count"] = a_counts.get("submitted", 0)
+            a["late_count"] = a_counts.get("late", 0)
+        return set_next_cursor(ID_VIEW.response(assignments), next_cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/workspaces/{workspace_id}/assignments/{assignment_id}")
-async def get_assignment_detail(workspace_id: str, assignment_id: str, current_user: dict = Depends(get_current_user)):
+async def get_assignment_detail(workspace_id: str, assignment_id: str, current_user: dict = Depends(require_workspace_member)):
     """Get detailed assignment info with submission analytics."""
     try:
         assignment = await get_assignment_by_id(assignment_id)
@@ -985,18 +1291,8 @@ async def get_assignment_detail(workspace_id: str, assignment_id: str, current_u
         on_time = sum(1 for s in submissions if not s.get("is_late", False))
         late = submitted - on_time
         
-        # Enrich submissions with download URLs
-        for sub in submissions:
-            if "submitted_at" in sub and hasattr(sub["submitted_at"], "isoformat"):
-                sub["submitted_at"] = sub["submitted_at"].isoformat()
-            sub["id"] = sub.pop("_id")
-        
-        assignment["id"] = assignment.pop("_id")
-        if "created_at" in assignment and hasattr(assignment["created_at"], "isoformat"):
-            assignment["created_at"] = assignment["created_at"].isoformat()
-        
         return {
-            **assignment,
+            **ID_VIEW.shape(assignment),
             "analytics": {
                 "total_students": total,
                 "submitted": submitted,
@@ -1005,7 +1301,7 @@ async def get_assignment_detail(workspace_id: str, assignment_id: str, current_u
                 "late": late,
                 "submission_rate": round((submitted / total * 100), 1) if total > 0 else 0
             },
-            "submissions": submissions
+            "submissions": [ID_VIEW.shape(sub) for sub in submissions]
         }
     except HTTPException:
         raise
@@ -1014,7 +1310,7 @@ async def get_assignment_detail(workspace_id: str, assignment_id: str, current_u
 
 
 @app.delete("/workspaces/{workspace_id}/assignments/{assignment_id}")
-async def delete_assignment_endpoint(workspace_id: str, assignment_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_assignment_endpoint(workspace_id: str, assignment_id: str, current_user: dict = Depends(require_workspace_member)):
     """Delete an assignment and its submissions."""
     success = await db_delete_assignment(assignment_id, workspace_id)
     if not success:
@@ -1023,18 +1319,40 @@ async def delete_assignment_endpoint(workspace_id: str, assignment_id: str, curr
 
 
 @app.get("/workspaces/{workspace_id}/assignments/{assignment_id}/submissions")
-async def list_submissions(workspace_id: str, assignment_id: str, current_user: dict = Depends(get_current_user)):
-    """Get all submissions for an assignment."""
-    assignment = await get_assignment_by_id(assignment_id)
+async def list_submissions(
+    workspace_id: str,
+    assignment_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    is_late: Optional[bool] = None,
+    current_user: dict = Depends(require_workspace_member)
+):
+    """Get submissions for an assignment, latest first."""
+    assignment = await get_assignment_by_id(assignment_id, projection={"workspace_id": 1})
     if not assignment or assignment.get("workspace_id") != workspace_id:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
-    submissions = await get_assignment_submissions(assignment_id)
-    for sub in submissions:
-        if "submitted_at" in sub and hasattr(sub["submitted_at"], "isoformat"):
-            sub["submitted_at"] = sub["submitted_at"].isoformat()
-        sub["id"] = sub.pop("_id")
-    return submissions
+    try:
+        submissions, next_cursor = await get_submissions_page(assignment_id, limit=limit, after=after, is_late=is_late)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_next_cursor(ID_VIEW.response(submissions), next_cursor)
+
+
+@app.get("/workspaces/{workspace_id}/assignments/{assignment_id}/submissions/export")
+async def export_submissions(
+    workspace_id: str,
+    assignment_id: str,
+    fmt: ExportFormat = Query("csv", alias="format"),
+    current_user: dict = Depends(require_workspace_member)
+):
+    """Stream every submission for an assignment, latest first."""
+    assignment = await get_assignment_by_id(assignment_id, projection={"workspace_id": 1})
+    if not assignment or assignment.get("workspace_id") != workspace_id:
+        raise HTTPException(status_code=404, detail="Assignment not found")
+
+    rows = iter_submissions(assignment_id, projection=_projection(SUBMISSION_EXPORT_COLUMNS))
+    return export_response(rows, SUBMISSION_EXPORT_COLUMNS, fmt, "submissions")
 
 
 # --- Public Assignment Submission Routes (No Auth) ---
@@ -1042,7 +1360,7 @@ async def list_submissions(workspace_id: str, assignment_id: str, current_user:
 @app.get("/submit/{assignment_id}/info")
 async def get_submission_info(assignment_id: str):
     """Public endpoint — get assignment info for submission page."""
-    assignment = await get_assignment_by_id(assignment_id)
+    assignment = await get_assignment_by_id(assignment_id, projection=ASSIGNMENT_PUBLIC_FIELDS)
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
     
@@ -1066,13 +1384,12 @@ async def submit_assignment(
 ):
     """Public endpoint — student submits assignment by roll number + file upload."""
     try:
-        assignment = await get_assignment_by_id(assignment_id)
+        assignment = await get_assignment_by_id(assignment_id, projection={"deadline": 1})
         if not assignment:
             raise HTTPException(status_code=404, detail="Assignment not found")
         
         # Check if this roll number is in the student list
-        students = assignment.get("students", [])
-        student = next((s for s in students if s["roll_number"] == roll_number.strip()), None)
+        student = await get_roster_entry(assignment_id, roll_number.strip())
         if not student:
             raise HTTPException(status_code=400, detail="Roll number not found in the student list for this assignment.")
         
@@ -1145,14 +1462,14 @@ async def check_deadline_reminders():
             
             for assignment in assignments:
                 submission_link = f"{frontend_url}/submit/{assignment['_id']}"
-                students = assignment.get("students", [])
-                
                 # Get already-submitted roll numbers
-                submissions = await get_assignment_submissions(assignment["_id"])
-                submitted_rolls = {s["roll_number"] for s in submissions}
+                submitted_rolls = {
+                    s["roll_number"]
+                    async for s in iter_submissions(assignment["_id"], projection={"roll_number": 1})
+                }
                 
                 # Only remind students who haven't submitted
-                for student in students:
+                async for student in iter_roster(assignment["_id"]):
                     if student["roll_number"] not in submitted_rolls:
                         try:
                             send_deadline_reminder(
@@ -1175,6 +1492,14 @@ async def check_deadline_reminders():
 
 @app.on_event("startup")
 async def startup_event():
+    try:
+        await ensure_indexes()
+        logger.info("Database indexes ensured.")
+        await backfill_enrollment_index()
+        await migrate_assignment_rosters()
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+    asyncio.create_task(watch_cache_invalidations())
     asyncio.create_task(check_deadline_reminders())
     logger.info("Deadline reminder background task started.")
 
@@ -1183,6 +1508,16 @@ async def startup_event():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/health/auth")
+async def auth_health():
+    """Load on the password hashing pool and hit rate of the verified-token cache."""
+    return {"password_hashing": password_hash_pool.stats(), "token_cache": token_cache.stats()}
+
+@app.get("/health/caches")
+async def cache_health():
+    """Size and hit/miss counters of the in-process caches."""
+    return {"caches": cache_stats()}
+
 # Static Files + SPA Fallback
 frontend_dist = "dist" if os.path.exists("dist") else "frontend/dist"
 if os.path.exists(frontend_dist):
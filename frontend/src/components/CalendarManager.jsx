@@ -26,7 +26,10 @@ const CalendarManager = () => {
     const fetchEvents = async () => {
         setLoading(true);
         try {
-            const res = await axios.get(`${API_URL}/workspaces/${workspace.id}/calendar`);
+            // Only ask for the month being viewed; the server expands recurring holidays for that range
+            const from = _formatDate(new Date(viewDate.getFullYear(), viewDate.getMonth(), 1));
+            const to = _formatDate(new Date(viewDate.getFullYear(), viewDate.getMonth() + 1, 0));
+            const res = await axios.get(`${API_URL}/workspaces/${workspace.id}/calendar`, { params: { from, to } });
 
             // Generate implicit public holidays based on currently viewed month/year
             const implicitEvents = generateImplicitHolidays(viewDate.getFullYear(), viewDate.getMonth());
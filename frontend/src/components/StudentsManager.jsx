@@ -143,7 +143,7 @@ const StudentsManager = () => {
     };
 
     const downloadTemplate = () => {
-        const template = "id,name,semester,program_id,batch_year,enrolled_courses\nS001,John Doe,1,prog_id_1,2024,CS101,CS102\nS002,Jane Smith,2,prog_id_2,2023,EC101";
+        const template = "id,name,semester,program_id,batch_year,enrolled_courses\nS001,John Doe,1,prog_id_1,2024,\"CS101,CS102\"\nS002,Jane Smith,2,prog_id_2,2023,EC101";
         const blob = new Blob([template], { type: 'text/csv' });
         const url = window.URL.createObjectURL(blob);
         const a = document.createElement('a');
@@ -165,7 +165,7 @@ const StudentsManager = () => {
                     <label className="bg-green-600 hover:bg-green-500 text-white px-4 py-2 rounded-lg text-sm flex items-center gap-2 cursor-pointer">
                         {importing ? <Loader2 className="w-4 h-4 animate-spin" /> : <Upload className="w-4 h-4" />}
                         Import Excel
-                        <input type="file" accept=".xlsx,.xls" onChange={handleFileUpload} className="hidden" disabled={importing} />
+                        <input type="file" accept=".xlsx,.xls,.csv" onChange={handleFileUpload} className="hidden" disabled={importing} />
                     </label>
                 </div>
             </div>
@@ -0,0 +1,127 @@
+import csv
+import io
+from typing import List, Tuple
+
+import pandas as pd
+
+REQUIRED_STUDENT_COLUMNS = ["id", "name", "semester"]
+
+
+def read_student_sheet(contents: bytes, filename: str) -> pd.DataFrame:
+    """Reads an uploaded CSV or Excel roster into a DataFrame of raw strings."""
+    if (filename or "").lower().endswith(".csv"):
+        rows = list(csv.reader(io.StringIO(contents.decode("utf-8-sig"))))
+        if not rows:
+            return pd.DataFrame()
+        header = [h.strip() for h in rows[0]]
+        width = len(header)
+        fold_courses = header[-1] == "enrolled_courses"
+        records = []
+        for row in rows[1:]:
+            if not any(cell.strip() for cell in row):
+                continue
+            # Unquoted "CS101,CS102" spills into extra cells; fold them back.
+            if len(row) > width and fold_courses:
+                row = row[:width - 1] + [",".join(row[width - 1:])]
+            records.append((row + [None] * width)[:width])
+        df = pd.DataFrame(records, columns=header, dtype=object)
+        return df.replace("", None)
+
+    df = pd.read_excel(io.BytesIO(contents), dtype=object)
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+def parse_student_frame(df: pd.DataFrame, workspace_id: str) -> Tuple[List[dict], List[int], List[dict]]:
+    """
+    Validates a roster DataFrame column-wise and builds student documents.
+
+    Returns (students, rows, errors). `rows[i]` is the spreadsheet row
+    students[i] came from, so later write errors can point back to it. Each
+    error is {"row", "id", "error"} where `row` is the 1-based spreadsheet
+    row (header is row 1).
+    """
+    if df.empty:
+        return [], [], []
+
+    n = len(df)
+    row_numbers = pd.Series(range(2, n + 2), index=df.index)
+
+    def text(col: str, default=None) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series([default] * n, index=df.index, dtype=object)
+        values = df[col].where(df[col].notna(), None)
+        values = values.map(lambda v: _cell_to_text(v) if v is not None else None)
+        return values.where(values.notna() & (values != ""), default)
+
+    ids = text("id")
+    names = text("name")
+    program_ids = text("program_id", "Unknown")
+    courses_raw = text("enrolled_courses", "")
+
+    semester_raw = df["semester"] if "semester" in df.columns else pd.Series([None] * n, index=df.index)
+    semesters = pd.to_numeric(semester_raw, errors="coerce")
+    bad_semester = semester_raw.notna() & semesters.isna()
+    semesters = semesters.fillna(1)
+
+    has_batch = "batch_year" in df.columns
+    if has_batch:
+        batch_raw = df["batch_year"]
+        batch_years = pd.to_numeric(batch_raw, errors="coerce")
+        bad_batch = batch_raw.notna() & batch_years.isna()
+    else:
+        bad_batch = pd.Series(False, index=df.index)
+
+    missing_id = ids.isna()
+    missing_name = names.isna()
+    duplicate_id = ids.notna() & ids.duplicated(keep="first")
+
+    checks = [
+        (missing_id, "Missing id"),
+        (missing_name, "Missing name"),
+        (bad_semester, "Invalid semester"),
+        (bad_batch, "Invalid batch_year"),
+        (duplicate_id, "Duplicate id in file"),
+    ]
+    invalid = pd.Series(False, index=df.index)
+    errors = []
+    for mask, message in checks:
+        # Report only the first problem per row
+        hit = mask & ~invalid
+        for row, sid in zip(row_numbers[hit], ids[hit]):
+            errors.append({"row": int(row), "id": sid if isinstance(sid, str) else None, "error": message})
+        invalid |= mask
+    errors.sort(key=lambda e: e["row"])
+
+    valid = ~invalid
+    frame = pd.DataFrame({
+        "id": ids[valid],
+        "name": names[valid],
+        "semester": semesters[valid].astype(int),
+        "program_id": program_ids[valid],
+        "enrolled_courses": courses_raw[valid].map(_split_courses),
+        "workspace_id": workspace_id,
+    })
+    if has_batch:
+        frame["batch_year"] = batch_years[valid]
+
+    students = frame.to_dict("records")
+    if has_batch:
+        for s in students:
+            # Blank batch_year cells fall back to the Student model default at read time
+            if pd.isna(s["batch_year"]):
+                del s["batch_year"]
+            else:
+                s["batch_year"] = int(s["batch_year"])
+    return students, [int(row) for row in row_numbers[valid]], errors
+
+
+def _cell_to_text(value) -> str:
+    # Excel hands back whole numbers as floats (101 -> 101.0)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def _split_courses(value: str) -> List[str]:
+    return [c.strip() for c in value.split(",") if c.strip()] if value else []
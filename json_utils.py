@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import orjson
+from bson.objectid import ObjectId
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+def _default(value: Any) -> Any:
+    # orjson handles datetime/date/UUID natively; BSON and container types land here
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(by_alias=True)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encodes API output, ObjectIds and datetimes included, in a single orjson pass."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: same output as JSONResponse, rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class ResponseView:
+    """
+    Declarative output shape for documents read from MongoDB.
+
+    `renames` maps stored keys to response keys (e.g. {"_id": "id"}). Given a
+    `model`, each document is cut down to the keys the model's response schema
+    has (aliases included, defaults filled in for missing optional fields),
+    matching what `response_model` would return without re-validating
+    documents this API wrote itself.
+    """
+
+    def __init__(self, model: Optional[Type[BaseModel]] = None, renames: Optional[Dict[str, str]] = None):
+        self.renames = renames or {}
+        self.fields: Optional[List[Tuple[str, Optional[Callable[[], Any]]]]] = None
+        if model is not None:
+            self.fields = [(field.alias or name, _default_factory(field)) for name, field in model.model_fields.items()]
+
+    def shape(self, doc: dict) -> dict:
+        for stored, public in self.renames.items():
+            if stored in doc:
+                doc[public] = doc.pop(stored)
+        if self.fields is None:
+            return doc
+        shaped = {}
+        for key, default in self.fields:
+            if key in doc:
+                shaped[key] = doc[key]
+            elif default is not None:
+                shaped[key] = default()
+        return shaped
+
+    def encode(self, docs: Iterable[dict]) -> bytes:
+        return dumps([self.shape(doc) for doc in docs])
+
+    def response(self, docs: Iterable[dict]) -> Response:
+        return encoded_response(self.encode(docs))
+
+
+def encoded_response(body: bytes) -> Response:
+    """Wraps already-encoded JSON; FastAPI skips response_model validation for it."""
+    return Response(content=body, media_type="application/json")
+
+
+def _default_factory(field) -> Optional[Callable[[], Any]]:
+    if field.default_factory is not None:
+        return field.default_factory
+    if field.default is PydanticUndefined:
+        return None  # required; left out when a stored document lacks it
+    default = field.default
+    return lambda: default
@@ -0,0 +1,1080 @@
+"""
+In-process stand-in for MongoDB, selected with DB_BACKEND=memory.
+
+MemoryClient / MemoryDatabase / MemoryCollection implement the slice of
+Motor's async API that db.py talks to: CRUD, bulk_write, find cursors with
+sort/skip/limit, distinct, count_documents and the common aggregation stages.
+Query, update and projection operators follow MongoDB semantics (implicit
+array matching, type-bracketed comparisons, null matching missing fields).
+Indexes passed to create_indexes are honoured: unique ones (including
+partialFilterExpression) raise DuplicateKeyError like the server does, and the
+leading key of every index is kept as a hash index so equality and $in lookups
+don't scan the collection.
+
+Data lives for the life of the process. Change streams and explain() are not
+available; watch() fails the same way it does on a standalone mongod.
+
+scripts/check_memory_backend.py runs every db.py helper against this backend
+and mongomock side by side; run it after touching either file.
+"""
+import functools
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument, InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+CHANGE_STREAMS_NOT_SUPPORTED = 40573
+BAD_VALUE = 2
+IMMUTABLE_FIELD = 66
+DUPLICATE_KEY = 11000
+
+# --- Values ---
+
+# Types whose Python equality already matches BSON equality within the type
+_PLAIN_TYPES = {str, int, float, bool, ObjectId, datetime}
+
+def _store(value):
+    """Copies `value` the way a BSON round trip would (naive UTC datetimes, ms precision)."""
+    if isinstance(value, dict):
+        return {k: _store(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_store(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+def _copy(value):
+    if isinstance(value, dict):
+        return {k: _copy(v) if isinstance(v, (dict, list)) else v for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) if isinstance(v, (dict, list)) else v for v in value]
+    return value
+
+def _plain_key(value):
+    # Ints and floats compare equal across types in BSON; bools don't equal numbers
+    return ("number" if value.__class__ in (int, float) else value.__class__, value)
+
+def _freeze(value):
+    """Hashable form of a stored value, for index keys."""
+    if value.__class__ in _PLAIN_TYPES:
+        return value
+    if isinstance(value, dict):
+        return ("__doc__",) + tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return ("__array__",) + tuple(_freeze(v) for v in value)
+    return value
+
+def _type_rank(value) -> int:
+    # BSON comparison order
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def _compare(a, b) -> int:
+    ra, rb = _type_rank(a), _type_rank(b)
+    if ra != rb:
+        return -1 if ra < rb else 1
+    if ra == 1:
+        return 0
+    if ra == 4:
+        return _compare(list(a.items()), list(b.items()))
+    if ra == 5 or isinstance(a, tuple):
+        for x, y in zip(a, b):
+            c = _compare(x, y)
+            if c:
+                return c
+        return (len(a) > len(b)) - (len(a) < len(b))
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return 0
+
+_COMPARE_KEY = functools.cmp_to_key(_compare)
+# Ranks whose values Python already orders the way BSON does
+_NATIVE_ORDER_RANKS = {2, 3, 6, 7, 8, 9}
+
+def _equal(a, b) -> bool:
+    return _compare(a, b) == 0
+
+def _truthy(value) -> bool:
+    # Aggregation truthiness: only false, null, missing and zero are false
+    return not (value is None or value is False or (isinstance(value, (int, float)) and not isinstance(value, bool) and value == 0))
+
+# --- Paths ---
+
+def _values(doc, parts: List[str]) -> list:
+    """Every value at a dotted path, descending into arrays of subdocuments."""
+    if not parts:
+        return [doc]
+    if isinstance(doc, dict):
+        if parts[0] not in doc:
+            return []
+        return _values(doc[parts[0]], parts[1:])
+    if isinstance(doc, list):
+        found = []
+        if parts[0].isdigit() and int(parts[0]) < len(doc):
+            found.extend(_values(doc[int(parts[0])], parts[1:]))
+        for item in doc:
+            if isinstance(item, dict):
+                found.extend(_values(item, parts))
+        return found
+    return []
+
+def _field_values(doc, path: str) -> list:
+    if "." not in path:
+        return [doc[path]] if path in doc else []
+    return _values(doc, path.split("."))
+
+def _get_path(doc, path: str, default=None):
+    current = doc
+    for part in path.split("."):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        elif isinstance(current, list):
+            current = [_get_path(item, part) for item in current if isinstance(item, dict) and part in item]
+        else:
+            return default
+    return current
+
+def _set_path(doc: dict, path: str, value):
+    parts = path.split(".")
+    current = doc
+    for part in parts[:-1]:
+        if isinstance(current, list) and part.isdigit():
+            current = current[int(part)]
+            continue
+        if not isinstance(current.get(part), (dict, list)):
+            current[part] = {}
+        current = current[part]
+    last = parts[-1]
+    if isinstance(current, list) and last.isdigit():
+        index = int(last)
+        current.extend([None] * (index + 1 - len(current)))
+        current[index] = value
+    else:
+        current[last] = value
+
+def _unset_path(doc: dict, path: str):
+    parts = path.split(".")
+    current = doc
+    for part in parts[:-1]:
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        elif isinstance(current, list) and part.isdigit() and int(part) < len(current):
+            current = current[int(part)]
+        else:
+            return
+    if isinstance(current, dict):
+        current.pop(parts[-1], None)
+    elif isinstance(current, list) and parts[-1].isdigit() and int(parts[-1]) < len(current):
+        current[int(parts[-1])] = None
+
+# --- Queries ---
+
+def _expand(values: list) -> list:
+    """Values plus the elements of array values, as implicit array matching sees them."""
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+def _is_operator_doc(value) -> bool:
+    return isinstance(value, dict) and bool(value) and all(k.startswith("$") for k in value)
+
+def _match_eq(values: list, target) -> bool:
+    if isinstance(target, re.Pattern):
+        return any(isinstance(v, str) and target.search(v) for v in _expand(values))
+    if not values:
+        return target is None
+    for value in values:
+        if value.__class__ is target.__class__ and value.__class__ in _PLAIN_TYPES:
+            if value == target:
+                return True
+        elif _equal(value, target) or (isinstance(value, list) and any(_equal(e, target) for e in value)):
+            return True
+    return False
+
+def _match_operators(values: list, condition: dict) -> bool:
+    for op, arg in condition.items():
+        if op == "$eq":
+            ok = _match_eq(values, arg)
+        elif op == "$ne":
+            ok = not _match_eq(values, arg)
+        elif op == "$in":
+            ok = any(_match_eq(values, target) for target in arg)
+        elif op == "$nin":
+            ok = not any(_match_eq(values, target) for target in arg)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            rank = _type_rank(arg)
+            ok = any(
+                _type_rank(v) == rank and _COMPARISONS[op](_compare(v, arg))
+                for v in _expand(values)
+            )
+        elif op == "$exists":
+            ok = bool(values) == bool(arg)
+        elif op == "$all":
+            ok = bool(arg) and all(_match_eq(values, target) for target in arg)
+        elif op == "$size":
+            ok = any(isinstance(v, list) and len(v) == arg for v in values)
+        elif op == "$regex":
+            flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+            pattern = arg if isinstance(arg, re.Pattern) else re.compile(arg, flags)
+            ok = any(isinstance(v, str) and pattern.search(v) for v in _expand(values))
+        elif op == "$options":
+            ok = True
+        elif op == "$not":
+            ok = not (_match_operators(values, arg) if isinstance(arg, dict) else _match_eq(values, arg))
+        elif op == "$elemMatch":
+            ok = any(
+                isinstance(v, list) and any(_match_element(e, arg) for e in v)
+                for v in values
+            )
+        else:
+            raise OperationFailure(f"unknown operator: {op}", code=BAD_VALUE)
+        if not ok:
+            return False
+    return True
+
+_COMPARISONS = {
+    "$gt": lambda c: c > 0,
+    "$gte": lambda c: c >= 0,
+    "$lt": lambda c: c < 0,
+    "$lte": lambda c: c <= 0,
+}
+
+def _match_element(element, condition) -> bool:
+    if _is_operator_doc(condition):
+        return _match_operators([element], condition)
+    return isinstance(element, dict) and _matches(element, condition)
+
+def _matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            ok = all(_matches(doc, q) for q in condition)
+        elif key == "$or":
+            ok = any(_matches(doc, q) for q in condition)
+        elif key == "$nor":
+            ok = not any(_matches(doc, q) for q in condition)
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}", code=BAD_VALUE)
+        else:
+            values = _field_values(doc, key)
+            ok = _match_operators(values, condition) if _is_operator_doc(condition) else _match_eq(values, condition)
+        if not ok:
+            return False
+    return True
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return _copy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    # {"_id": 1} on its own is an inclusion projection of just the _id
+    if any(fields.values()) or (not fields and include_id):
+        projected = {"_id": doc["_id"]} if include_id and "_id" in doc else {}
+        for path in fields:
+            _include_path(doc, projected, path.split("."))
+        return projected
+    projected = _copy(doc)
+    for path in fields:
+        _unset_path(projected, path)
+    if not include_id:
+        projected.pop("_id", None)
+    return projected
+
+def _include_path(source, target: dict, parts: List[str]):
+    if not isinstance(source, dict) or parts[0] not in source:
+        return
+    value = source[parts[0]]
+    if len(parts) == 1:
+        target[parts[0]] = _copy(value)
+    elif isinstance(value, dict):
+        _include_path(value, target.setdefault(parts[0], {}), parts[1:])
+    elif isinstance(value, list):
+        items = []
+        for item in value:
+            if isinstance(item, dict):
+                sub = {}
+                _include_path(item, sub, parts[1:])
+                items.append(sub)
+        target[parts[0]] = items
+
+def _sort_docs(docs: List[dict], spec) -> List[dict]:
+    spec = _normalize_sort(spec)
+    if not spec:
+        return docs
+
+    def sort_key(doc, field, direction):
+        value = _get_path(doc, field)
+        if isinstance(value, list):
+            if not value:
+                return (0, 0)  # empty arrays sort before null
+            # Arrays sort by their smallest (ascending) or largest (descending) element
+            pick = min if direction > 0 else max
+            value = pick(value, key=_COMPARE_KEY)
+        rank = _type_rank(value)
+        return (rank, value) if rank in _NATIVE_ORDER_RANKS else (rank, _COMPARE_KEY(value))
+
+    # One stable pass per key, least significant first
+    for field, direction in reversed(spec):
+        docs = sorted(docs, key=lambda d: sort_key(d, field, direction), reverse=direction < 0)
+    return docs
+
+def _normalize_sort(key_or_list, direction=None) -> list:
+    if key_or_list is None:
+        return []
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(k, d) for k, d in key_or_list]
+
+def _upsert_seed(query: dict) -> dict:
+    """The equality fields of a filter, which an upsert copies into the new document."""
+    seed = {}
+    for key, condition in query.items():
+        if key == "$and":
+            for sub in condition:
+                for k, v in _upsert_seed(sub).items():
+                    _set_path(seed, k, v)
+        elif key.startswith("$"):
+            continue
+        elif _is_operator_doc(condition):
+            if "$eq" in condition:
+                _set_path(seed, key, _copy(condition["$eq"]))
+        else:
+            _set_path(seed, key, _copy(condition))
+    return seed
+
+# --- Updates ---
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        if not op.startswith("$"):
+            raise ValueError("update only works with $ operators")
+        for path, arg in fields.items():
+            if op == "$set":
+                _set_path(doc, path, _copy(arg))
+            elif op == "$setOnInsert":
+                if inserting:
+                    _set_path(doc, path, _copy(arg))
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                _set_path(doc, path, _get_path(doc, path, 0) + arg)
+            elif op in ("$min", "$max"):
+                current = _get_path(doc, path)
+                c = _compare(arg, current) if current is not None else (-1 if op == "$min" else 1)
+                if (op == "$min" and c < 0) or (op == "$max" and c > 0):
+                    _set_path(doc, path, _copy(arg))
+            elif op == "$currentDate":
+                _set_path(doc, path, _store(datetime.now(timezone.utc)))
+            elif op in ("$push", "$addToSet"):
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                current = _get_path(doc, path)
+                if current is None:
+                    current = []
+                    _set_path(doc, path, current)
+                elif not isinstance(current, list):
+                    raise OperationFailure(f"The field '{path}' must be an array", code=BAD_VALUE)
+                seen = {_freeze(e) for e in current} if op == "$addToSet" else None
+                for item in items:
+                    if seen is not None:
+                        frozen = _freeze(item)
+                        if frozen in seen:
+                            continue
+                        seen.add(frozen)
+                    current.append(_copy(item))
+            elif op == "$pull":
+                current = _get_path(doc, path)
+                if isinstance(current, list):
+                    if isinstance(arg, dict) and list(arg) == ["$in"] and all(t.__class__ in _PLAIN_TYPES for t in arg["$in"]):
+                        # {"$pull": {field: {"$in": [...]}}} over scalars: one set lookup per element
+                        targets = {_plain_key(t) for t in arg["$in"]}
+                        current[:] = [e for e in current if e.__class__ not in _PLAIN_TYPES or _plain_key(e) not in targets]
+                    else:
+                        current[:] = [e for e in current if not _match_element_or_value(e, arg)]
+            else:
+                raise OperationFailure(f"Unknown modifier: {op}", code=BAD_VALUE)
+
+def _match_element_or_value(element, condition) -> bool:
+    if isinstance(condition, dict):
+        return _match_element(element, condition)
+    return _equal(element, condition)
+
+# --- Aggregation ---
+
+def _evaluate(doc: dict, expr):
+    if isinstance(expr, str) and expr.startswith("$"):
+        if expr == "$$ROOT":
+            return doc
+        return _get_path(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_evaluate(doc, e) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        return {k: _evaluate(doc, v) for k, v in expr.items()}
+    op, arg = next(iter(expr.items()))
+    if op == "$literal":
+        return arg
+    if op == "$cond":
+        if isinstance(arg, dict):
+            arg = [arg["if"], arg["then"], arg["else"]]
+        return _evaluate(doc, arg[1] if _truthy(_evaluate(doc, arg[0])) else arg[2])
+    args = [_evaluate(doc, a) for a in arg] if isinstance(arg, list) else [_evaluate(doc, arg)]
+    if op in _EXPRESSION_COMPARISONS:
+        return _EXPRESSION_COMPARISONS[op](_compare(args[0], args[1]))
+    if op == "$and":
+        return all(_truthy(a) for a in args)
+    if op == "$or":
+        return any(_truthy(a) for a in args)
+    if op == "$not":
+        return not _truthy(args[0])
+    if op == "$ifNull":
+        return next((a for a in args if a is not None), None)
+    if op == "$size":
+        return len(args[0])
+    if op == "$in":
+        return any(_equal(args[0], item) for item in args[1])
+    if op == "$add":
+        return sum(args)
+    if op == "$subtract":
+        return args[0] - args[1]
+    if op == "$multiply":
+        product = 1
+        for a in args:
+            product *= a
+        return product
+    if op == "$divide":
+        return args[0] / args[1]
+    if op == "$toString":
+        return None if args[0] is None else str(args[0])
+    raise OperationFailure(f"Unrecognized expression '{op}'", code=BAD_VALUE)
+
+_EXPRESSION_COMPARISONS = {
+    "$eq": lambda c: c == 0,
+    "$ne": lambda c: c != 0,
+    "$gt": lambda c: c > 0,
+    "$gte": lambda c: c >= 0,
+    "$lt": lambda c: c < 0,
+    "$lte": lambda c: c <= 0,
+}
+
+def _group(docs: List[dict], spec: dict) -> List[dict]:
+    groups: Dict[Any, dict] = {}
+    for doc in docs:
+        key = _evaluate(doc, spec["_id"])
+        frozen = _freeze(key)
+        if frozen not in groups:
+            groups[frozen] = {"_id": key, **{field: _GroupAccumulator(acc) for field, acc in spec.items() if field != "_id"}}
+        for field, acc in groups[frozen].items():
+            if field != "_id":
+                acc.add(doc)
+    return [{k: v if k == "_id" else v.result() for k, v in group.items()} for group in groups.values()]
+
+class _GroupAccumulator:
+    def __init__(self, spec: dict):
+        (self.op, self.expr), = spec.items()
+        self.values = []
+
+    def add(self, doc: dict):
+        self.values.append(1 if self.op == "$count" else _evaluate(doc, self.expr))
+
+    def result(self):
+        numbers = [v for v in self.values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        present = [v for v in self.values if v is not None]
+        if self.op in ("$sum", "$count"):
+            return sum(numbers)
+        if self.op == "$avg":
+            return sum(numbers) / len(numbers) if numbers else None
+        if self.op == "$min":
+            return min(present, key=_COMPARE_KEY) if present else None
+        if self.op == "$max":
+            return max(present, key=_COMPARE_KEY) if present else None
+        if self.op == "$first":
+            return self.values[0] if self.values else None
+        if self.op == "$last":
+            return self.values[-1] if self.values else None
+        if self.op == "$push":
+            return list(self.values)
+        if self.op == "$addToSet":
+            unique = []
+            for v in self.values:
+                if not any(_equal(v, u) for u in unique):
+                    unique.append(v)
+            return unique
+        raise OperationFailure(f"unknown group operator '{self.op}'", code=BAD_VALUE)
+
+def _unwind(docs: List[dict], spec) -> List[dict]:
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    keep_empty = spec.get("preserveNullAndEmptyArrays", False)
+    unwound = []
+    for doc in docs:
+        value = _get_path(doc, path)
+        if isinstance(value, list) and value:
+            for item in value:
+                copy = _copy(doc)
+                _set_path(copy, path, _copy(item))
+                unwound.append(copy)
+        elif value is not None and not isinstance(value, list):
+            unwound.append(doc)
+        elif keep_empty:
+            unwound.append(doc)
+    return unwound
+
+def _run_pipeline(docs: List[dict], pipeline: List[dict]) -> List[dict]:
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if _matches(d, _store(spec))]
+        elif name == "$project":
+            computed = {k: v for k, v in spec.items() if not (v in (0, 1, True, False))}
+            plain = {k: v for k, v in spec.items() if k not in computed}
+            projected = []
+            for d in docs:
+                out = _project(d, plain) if plain else ({"_id": d.get("_id")} if computed else _copy(d))
+                for field, expr in computed.items():
+                    _set_path(out, field, _evaluate(d, expr))
+                projected.append(out)
+            docs = projected
+        elif name in ("$addFields", "$set"):
+            docs = [{**d, **{k: _evaluate(d, v) for k, v in spec.items()}} for d in docs]
+        elif name == "$unwind":
+            docs = _unwind(docs, spec)
+        elif name == "$group":
+            docs = _group(docs, spec)
+        elif name == "$sort":
+            docs = _sort_docs(docs, spec)
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        else:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", code=BAD_VALUE)
+    return docs
+
+# --- Cursors ---
+
+class MemoryCursor:
+    """Lazily evaluated like Motor's cursor; sort/skip/limit must be set before iterating."""
+
+    def __init__(self, collection: "MemoryCollection", query=None, projection=None, sort=None, skip: int = 0, limit: int = 0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort = _normalize_sort(sort)
+        self._skip = skip
+        self._limit = limit
+        self._results: Optional[List[dict]] = None
+        self._position = 0
+
+    def sort(self, key_or_list, direction=None) -> "MemoryCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            docs = _sort_docs(self._collection._select(self._query), self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:abs(self._limit)]
+            self._results = docs
+        return self._results
+
+    def _shape(self, doc: dict) -> dict:
+        # Copied as each document is fetched, so streaming a large result
+        # holds one document at a time rather than a copy of every match
+        return _project(doc, self._projection)
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._evaluate()
+        end = len(results) if length is None else self._position + length
+        batch = [self._shape(d) for d in results[self._position:end]]
+        self._position += len(batch)
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        self._position += 1
+        return self._shape(results[self._position - 1])
+
+class MemoryCommandCursor(MemoryCursor):
+    def __init__(self, results: List[dict]):
+        super().__init__(None)
+        self._results = results
+
+    def _shape(self, doc: dict) -> dict:
+        return doc
+
+# --- Collections ---
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+        self._order: Dict[Any, int] = {}
+        self._next_order = 0
+        # field -> frozen value -> doc keys, for every field of every index
+        self._hashed: Dict[str, Dict[Any, set]] = {}
+        # index name -> (fields, partialFilterExpression, frozen key -> doc key)
+        self._unique: Dict[str, tuple] = {}
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    # --- Index maintenance ---
+
+    def _hash_keys(self, doc: dict, field: str) -> set:
+        return {_freeze(v) for v in (_expand(_field_values(doc, field)) or [None])}
+
+    def _unique_key(self, doc: dict, index: tuple):
+        fields, partial, _ = index
+        if partial is not None and not _matches(doc, partial):
+            return None
+        return tuple(_freeze(_get_path(doc, f)) for f in fields)
+
+    def _index(self, key, doc: dict):
+        for field, table in self._hashed.items():
+            for value in self._hash_keys(doc, field):
+                table.setdefault(value, set()).add(key)
+        for index in self._unique.values():
+            unique_key = self._unique_key(doc, index)
+            if unique_key is not None:
+                index[2][unique_key] = key
+
+    def _unindex(self, key, doc: dict):
+        for field, table in self._hashed.items():
+            for value in self._hash_keys(doc, field):
+                bucket = table.get(value)
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del table[value]
+        for index in self._unique.values():
+            unique_key = self._unique_key(doc, index)
+            if unique_key is not None and index[2].get(unique_key) == key:
+                del index[2][unique_key]
+
+    def _check_unique(self, key, doc: dict):
+        for name, index in self._unique.items():
+            unique_key = self._unique_key(doc, index)
+            if unique_key is None:
+                continue
+            holder = index[2].get(unique_key)
+            if holder is not None and holder != key:
+                dup = {f: _get_path(doc, f) for f in index[0]}
+                raise DuplicateKeyError(
+                    f"E11000 duplicate key error collection: {self.full_name} index: {name} dup key: {dup}",
+                    DUPLICATE_KEY, {"index": 0, "code": DUPLICATE_KEY, "keyValue": dup}
+                )
+
+    async def create_indexes(self, indexes: list, **kwargs) -> List[str]:
+        names = []
+        for model in indexes:
+            spec = model.document
+            fields = list(spec["key"].keys())
+            for field in fields:
+                if field == "_id" or field in self._hashed:
+                    continue
+                table = self._hashed[field] = {}
+                for key, doc in self._docs.items():
+                    for value in self._hash_keys(doc, field):
+                        table.setdefault(value, set()).add(key)
+            if spec.get("unique") and spec["name"] not in self._unique:
+                index = (fields, spec.get("partialFilterExpression"), {})
+                for key, doc in self._docs.items():
+                    unique_key = self._unique_key(doc, index)
+                    if unique_key is None:
+                        continue
+                    if unique_key in index[2]:
+                        raise OperationFailure(
+                            f"E11000 duplicate key error collection: {self.full_name} index: {spec['name']}",
+                            code=DUPLICATE_KEY
+                        )
+                    index[2][unique_key] = key
+                self._unique[spec["name"]] = index
+            names.append(spec["name"])
+        return names
+
+    # --- Reads ---
+
+    def _candidates(self, query: dict):
+        """
+        Doc keys that can match `query`: the intersection of the _id / hash
+        index lookups for its equality and $in conditions, or None to scan.
+        """
+        found = []
+        self._collect_candidates(query, found)
+        if not found:
+            return None
+        found.sort(key=len)
+        keys = found[0]
+        for other in found[1:]:
+            if not keys:
+                break
+            keys = keys & other
+        return keys
+
+    def _collect_candidates(self, query: dict, found: list):
+        for field, condition in query.items():
+            if field == "$and":
+                for sub in condition:
+                    self._collect_candidates(sub, found)
+                continue
+            if field.startswith("$") or (field != "_id" and field not in self._hashed):
+                continue
+            if _is_operator_doc(condition):
+                if "$eq" in condition:
+                    targets = [condition["$eq"]]
+                elif "$in" in condition and not any(isinstance(t, re.Pattern) for t in condition["$in"]):
+                    targets = condition["$in"]
+                else:
+                    continue
+            elif isinstance(condition, re.Pattern):
+                continue
+            else:
+                targets = [condition]
+            if field == "_id":
+                keys = {_freeze(t) for t in targets if _freeze(t) in self._docs}
+            else:
+                table = self._hashed[field]
+                if len(targets) == 1:
+                    # The live bucket; _select materializes it before anything can write
+                    keys = table.get(_freeze(targets[0]), set())
+                else:
+                    keys = set()
+                    for t in targets:
+                        keys |= table.get(_freeze(t), set())
+            found.append(keys)
+
+    def _select(self, query: dict) -> List[dict]:
+        keys = self._candidates(query)
+        if keys is None:
+            docs = self._docs.values()
+        else:
+            docs = [self._docs[k] for k in sorted(keys, key=self._order.__getitem__)]
+        return [d for d in docs if _matches(d, query)]
+
+    def find(self, filter: Optional[dict] = None, projection=None, *, sort=None, skip: int = 0, limit: int = 0, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, _store(filter or {}), projection, sort, skip, limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection=None, *args, sort=None, **kwargs) -> Optional[dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        results = await self.find(filter, projection, sort=sort, limit=1).to_list(length=1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        return len(self._select(_store(filter)))
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+
+    async def distinct(self, key: str, filter: Optional[dict] = None, **kwargs) -> list:
+        found = []
+        for doc in self._select(_store(filter or {})):
+            for value in _expand(_field_values(doc, key)):
+                if isinstance(value, list):
+                    continue
+                if not any(_equal(value, f) and _type_rank(value) == _type_rank(f) for f in found):
+                    found.append(value)
+        return [_copy(v) for v in found]
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> MemoryCommandCursor:
+        if pipeline and "$match" in pipeline[0]:
+            docs, pipeline = self._select(_store(pipeline[0]["$match"])), pipeline[1:]
+        else:
+            docs = list(self._docs.values())
+        return MemoryCommandCursor([_copy(d) for d in _run_pipeline(docs, pipeline)])
+
+    def watch(self, *args, **kwargs):
+        self.database.watch()
+
+    # --- Writes ---
+
+    def _insert(self, document: dict):
+        # Like pymongo, a generated _id is written back into the caller's dict
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = _store(document)
+        doc = {"_id": doc.pop("_id"), **doc}
+        key = _freeze(doc["_id"])
+        if key in self._docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_ dup key: {{_id: {doc['_id']!r}}}",
+                DUPLICATE_KEY, {"index": 0, "code": DUPLICATE_KEY, "keyValue": {"_id": doc["_id"]}}
+            )
+        self._check_unique(key, doc)
+        self._docs[key] = doc
+        self._order[key] = self._next_order
+        self._next_order += 1
+        self._index(key, doc)
+        return doc["_id"]
+
+    def _replace(self, key, new: dict):
+        old = self._docs[key]
+        if not _equal(old["_id"], new.get("_id", old["_id"])):
+            raise OperationFailure(
+                "Performing an update on the path '_id' would modify the immutable field '_id'",
+                code=IMMUTABLE_FIELD
+            )
+        new["_id"] = old["_id"]
+        self._unindex(key, old)
+        try:
+            self._check_unique(key, new)
+        except DuplicateKeyError:
+            self._index(key, old)
+            raise
+        self._docs[key] = new
+        self._index(key, new)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key)
+        del self._order[key]
+        self._unindex(key, doc)
+        return doc
+
+    def _update(self, query: dict, update, upsert: bool = False, multi: bool = False, sort=None, replace: bool = False) -> dict:
+        """Returns {"n", "nModified", "upserted", "before", "after"} for one update."""
+        query = _store(query)
+        update = _store(update)
+        matched = self._select(query)
+        if sort:
+            matched = _sort_docs(matched, sort)
+        if not multi:
+            matched = matched[:1]
+        result = {"n": 0, "nModified": 0, "before": None, "after": None}
+        for doc in matched:
+            if replace:
+                updated = _copy(update)
+            else:
+                updated = _copy(doc)
+                _apply_update(updated, update)
+            result["n"] += 1
+            result["before"] = result["before"] or doc
+            if doc != updated or list(doc) != list(updated):
+                self._replace(_freeze(doc["_id"]), updated)
+                result["nModified"] += 1
+                result["after"] = updated
+            else:
+                result["after"] = doc
+        if not matched and upsert:
+            seed = _upsert_seed(query)
+            if replace:
+                seed = {**({"_id": seed["_id"]} if "_id" in seed else {}), **_copy(update)}
+            else:
+                _apply_update(seed, update, inserting=True)
+            result["upserted"] = self._insert(seed)
+            result["after"] = self._docs[_freeze(seed["_id"])]
+        return result
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._insert(document), True)
+
+    async def insert_many(self, documents: list, ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        if not documents:
+            raise TypeError("documents must be a non-empty list")
+        self._bulk([InsertOne(d) for d in documents], ordered)
+        return InsertManyResult([d["_id"] for d in documents], True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, sort=None, **kwargs) -> UpdateResult:
+        outcome = self._update(filter, update, upsert=upsert, sort=sort)
+        return UpdateResult(_raw_update(outcome), True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        outcome = self._update(filter, update, upsert=upsert, multi=True)
+        return UpdateResult(_raw_update(outcome), True)
+
+    async def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        outcome = self._update(filter, replacement, upsert=upsert, replace=True)
+        return UpdateResult(_raw_update(outcome), True)
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        matched = self._select(_store(filter))[:1]
+        for doc in matched:
+            self._remove(_freeze(doc["_id"]))
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        matched = self._select(_store(filter))
+        for doc in matched:
+            self._remove(_freeze(doc["_id"]))
+        return DeleteResult({"n": len(matched)}, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection=None, sort=None, upsert: bool = False,
+                                  return_document=ReturnDocument.BEFORE, **kwargs) -> Optional[dict]:
+        outcome = self._update(filter, update, upsert=upsert, sort=sort)
+        doc = outcome["after"] if return_document == ReturnDocument.AFTER else outcome["before"]
+        return _project(doc, projection) if doc is not None else None
+
+    async def find_one_and_replace(self, filter: dict, replacement: dict, projection=None, sort=None, upsert: bool = False,
+                                   return_document=ReturnDocument.BEFORE, **kwargs) -> Optional[dict]:
+        outcome = self._update(filter, replacement, upsert=upsert, sort=sort, replace=True)
+        doc = outcome["after"] if return_document == ReturnDocument.AFTER else outcome["before"]
+        return _project(doc, projection) if doc is not None else None
+
+    async def find_one_and_delete(self, filter: dict, projection=None, sort=None, **kwargs) -> Optional[dict]:
+        matched = _sort_docs(self._select(_store(filter)), sort)[:1]
+        if not matched:
+            return None
+        return _project(self._remove(_freeze(matched[0]["_id"])), projection)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        return self._bulk(requests, ordered)
+
+    def _bulk(self, requests: list, ordered: bool) -> BulkWriteResult:
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    outcome = self._update(
+                        request._filter, request._doc, upsert=bool(request._upsert),
+                        multi=isinstance(request, UpdateMany), sort=getattr(request, "_sort", None),
+                        replace=isinstance(request, ReplaceOne)
+                    )
+                    if "upserted" in outcome:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": outcome["upserted"]})
+                    result["nMatched"] += outcome["n"]
+                    result["nModified"] += outcome["nModified"]
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    matched = self._select(_store(request._filter))
+                    if isinstance(request, DeleteOne):
+                        matched = matched[:1]
+                    for doc in matched:
+                        self._remove(_freeze(doc["_id"]))
+                    result["nRemoved"] += len(matched)
+                else:
+                    raise TypeError(f"{request!r} is not a valid request")
+            except OperationFailure as e:
+                result["writeErrors"].append({"index": index, "code": e.code, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    async def drop(self, **kwargs):
+        self.database._collections.pop(self.name, None)
+
+def _raw_update(outcome: dict) -> dict:
+    raw = {"n": outcome["n"], "nModified": outcome["nModified"]}
+    if "upserted" in outcome:
+        raw["n"] = 1
+        raw["upserted"] = outcome["upserted"]
+    return raw
+
+# --- Databases ---
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def get_collection(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        return self.get_collection(name)
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.get_collection(name)
+
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._docs]
+
+    async def drop_collection(self, name: str, **kwargs):
+        self._collections.pop(name, None)
+
+    async def command(self, command, *args, **kwargs) -> dict:
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"no such command: '{name}' (in-memory backend)", code=59)
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure(
+            "The $changeStream stage is only supported on replica sets",
+            code=CHANGE_STREAMS_NOT_SUPPORTED
+        )
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        return self.get_database(name)
+
+    async def drop_database(self, name: str):
+        self._databases.pop(name if isinstance(name, str) else name.name, None)
+
+    def close(self):
+        pass
@@ -0,0 +1,80 @@
+"""
+Exam plan version diffs.
+
+Saved exam plans form a version chain: a full snapshot followed by deltas
+that only carry what changed. Timetable rows are matched by course code, so
+moving one exam stores that one row instead of the whole timetable.
+"""
+import copy
+from typing import Any, Dict, List, Optional
+
+TIMETABLE_KEY = "course_code"
+
+
+def _keyed_rows(rows: Any) -> Optional[Dict[str, dict]]:
+    """Maps course_code -> row, or None if the rows can't be keyed uniquely."""
+    if not isinstance(rows, list):
+        return None
+    keyed = {}
+    for row in rows:
+        if not isinstance(row, dict) or not isinstance(row.get(TIMETABLE_KEY), str):
+            return None
+        if row[TIMETABLE_KEY] in keyed:
+            return None
+        keyed[row[TIMETABLE_KEY]] = row
+    return keyed
+
+
+def diff_plans(old: dict, new: dict) -> Optional[dict]:
+    """
+    Returns the delta that turns `old` into `new`, or None when the plans
+    can't be diffed row-wise (the caller should store a snapshot instead).
+    """
+    old_rows = _keyed_rows(old.get("timetable", []))
+    new_rows = _keyed_rows(new.get("timetable", []))
+    if old_rows is None or new_rows is None:
+        return None
+
+    delta: Dict[str, Any] = {}
+    changed = {k: v for k, v in new.items() if k != "timetable" and old.get(k) != v}
+    removed = [k for k in old if k != "timetable" and k not in new]
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+
+    upsert = [row for code, row in new_rows.items() if old_rows.get(code) != row]
+    remove = [code for code in old_rows if code not in new_rows]
+    timetable: Dict[str, Any] = {}
+    if upsert:
+        timetable["upsert"] = upsert
+    if remove:
+        timetable["remove"] = remove
+    # Only record the row order when applying upserts/removals wouldn't reproduce it
+    if _apply_rows(list(old_rows.values()), timetable) != list(new_rows.values()):
+        timetable["order"] = list(new_rows)
+    if timetable:
+        delta["timetable"] = timetable
+    return delta
+
+
+def _apply_rows(rows: List[dict], changes: dict) -> List[dict]:
+    keyed = {row[TIMETABLE_KEY]: row for row in rows}
+    for code in changes.get("remove", []):
+        keyed.pop(code, None)
+    for row in changes.get("upsert", []):
+        keyed[row[TIMETABLE_KEY]] = row
+    if "order" in changes:
+        return [keyed[code] for code in changes["order"]]
+    return list(keyed.values())
+
+
+def apply_plan_delta(plan: dict, delta: dict) -> dict:
+    """Returns a new plan with `delta` applied; `plan` is left untouched."""
+    result = copy.deepcopy(plan)
+    for key in delta.get("unset", []):
+        result.pop(key, None)
+    result.update(copy.deepcopy(delta.get("set", {})))
+    if "timetable" in delta:
+        result["timetable"] = _apply_rows(result.get("timetable", []), copy.deepcopy(delta["timetable"]))
+    return result
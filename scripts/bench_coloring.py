@@ -0,0 +1,98 @@
+"""
+Coloring strategy benchmark.
+
+Runs every strategy in exam_agent.coloring on the same generated instances
+(synthetic workspaces from bench_conflict_graph and random G(n, p) graphs),
+checks each coloring is valid and reports sessions used and wall time.
+Each --budgets entry adds an anytime_coloring column, which also fails when
+the run overshoots its budget (or the greedy pass, if slower) by more than
+--budget-margin-ms:
+
+    python scripts/bench_coloring.py
+    python scripts/bench_coloring.py --workspaces 1000:20000 --random 500:0.1 --strategies greedy dsatur
+    python scripts/bench_coloring.py --strategies greedy --budgets 50 500 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exam_agent.coloring import COLORING_STRATEGIES, anytime_coloring, to_adjacency
+from exam_agent.conflict_graph import build_conflict_graph
+from bench_conflict_graph import generate_workspace
+
+
+def random_graph(n: int, p: float, seed: int = 11):
+    rng = random.Random(seed)
+    adjacency = [[] for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            if rng.random() < p:
+                adjacency[i].append(j)
+                adjacency[j].append(i)
+    return adjacency
+
+
+def is_valid(adjacency, colors) -> bool:
+    return all(colors[v] >= 0 for v in range(len(adjacency))) and all(
+        colors[v] != colors[w] for v, neighbours in enumerate(adjacency) for w in neighbours
+    )
+
+
+def main(args):
+    instances = []
+    for size in args.workspaces:
+        n_courses, n_students = (int(x) for x in size.split(":"))
+        courses, course_students = generate_workspace(n_courses, n_students, electives=args.electives)
+        _, adjacency = to_adjacency(build_conflict_graph(courses, course_students))
+        instances.append((f"workspace {n_courses}c/{n_students}s", adjacency))
+    for spec in args.random:
+        n, p = spec.split(":")
+        instances.append((f"G({n}, {p})", random_graph(int(n), float(p))))
+
+    failed = False
+    columns = list(args.strategies) + [f"anytime {budget:g} ms" for budget in args.budgets]
+    header = f"{'instance':<28}" + "".join(f"{name:>22}" for name in columns)
+    print(header)
+    print("-" * len(header))
+    for label, adjacency in instances:
+        cells = []
+        for name in args.strategies:
+            started = time.perf_counter()
+            colors = COLORING_STRATEGIES[name](adjacency)
+            elapsed = (time.perf_counter() - started) * 1000
+            if not is_valid(adjacency, colors):
+                failed = True
+                cells.append("INVALID")
+                continue
+            cells.append(f"{max(colors, default=-1) + 1} ({elapsed:,.0f} ms)")
+        for budget in args.budgets:
+            started = time.perf_counter()
+            colors, trace = anytime_coloring(adjacency, budget)
+            elapsed = (time.perf_counter() - started) * 1000
+            if not is_valid(adjacency, colors):
+                failed = True
+                cells.append("INVALID")
+                continue
+            # The greedy coloring always runs, whatever the budget
+            over = elapsed > max(budget, trace[0]["elapsed_ms"]) + args.budget_margin_ms
+            failed = failed or over
+            cells.append(f"{'OVER ' if over else ''}{max(colors, default=-1) + 1} ({elapsed:,.0f} ms)")
+        print(f"{label:<28}" + "".join(f"{cell:>22}" for cell in cells))
+    print("\ncells: sessions used (wall time)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workspaces", nargs="*", default=["200:4000", "1000:20000", "2000:40000"], help="COURSES:STUDENTS pairs")
+    parser.add_argument("--electives", type=int, default=1, help="electives per generated student")
+    parser.add_argument("--random", nargs="*", default=["250:0.1", "250:0.5", "1000:0.05"], help="N:P random graphs")
+    parser.add_argument("--strategies", nargs="*", default=list(COLORING_STRATEGIES), choices=list(COLORING_STRATEGIES))
+    parser.add_argument("--budgets", nargs="*", type=float, default=[], help="anytime_coloring budgets in ms")
+    parser.add_argument("--budget-margin-ms", type=float, default=25.0, help="allowed overshoot of an anytime budget")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""
+Conflict-graph benchmark.
+
+Generates synthetic workspaces (programs with core courses, students taking
+their program's core plus a few electives from anywhere) and times
+build_conflict_graph on each. Up to --legacy-max-courses it also times the
+previous pairwise builder and checks both produce the same adjacency:
+
+    python scripts/bench_conflict_graph.py
+    python scripts/bench_conflict_graph.py --sizes 5000:100000 --legacy-max-courses 0
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exam_agent.models import Course
+from exam_agent.conflict_graph import build_conflict_graph
+
+DEFAULT_SIZES = ["500:10000", "1000:20000", "2000:40000", "5000:100000"]
+
+
+def generate_workspace(n_courses: int, n_students: int, core_per_program: int = 6, electives: int = 2, seed: int = 7):
+    """Returns (courses, course_students) shaped like a real exam cycle."""
+    rng = random.Random(seed)
+    n_programs = max(1, n_courses // (core_per_program * 2))
+    courses = []
+    for i in range(n_courses):
+        # Half the catalogue is program core, the rest are shared electives
+        programs = [f"P{i // core_per_program}"] if i < n_programs * core_per_program else []
+        courses.append(Course(code=f"C{i:05d}", name=f"Course {i}", semester=1, program_ids=programs,
+                              batch_ids=[2024], workspace_id="bench"))
+    elective_codes = [c.code for c in courses if not c.program_ids] or [c.code for c in courses]
+
+    course_students = {c.code: set() for c in courses}
+    for s in range(n_students):
+        program = rng.randrange(n_programs)
+        taken = [f"C{program * core_per_program + k:05d}" for k in range(core_per_program)]
+        taken += rng.sample(elective_codes, min(electives, len(elective_codes)))
+        for code in taken:
+            if code in course_students:
+                course_students[code].add(f"S{s:06d}")
+    return courses, {code: frozenset(ids) for code, ids in course_students.items()}
+
+
+def legacy_conflict_graph(courses, course_students):
+    """The pairwise builder generate_timetable_algorithmic_node used before build_conflict_graph."""
+    students = {c.code: course_students.get(c.code, frozenset()) for c in courses}
+    conflicts = {c.code: set() for c in courses}
+    for i in range(len(courses)):
+        for j in range(i + 1, len(courses)):
+            c1, c2 = courses[i], courses[j]
+            if set(c1.program_ids).intersection(c2.program_ids) or students[c1.code].intersection(students[c2.code]):
+                conflicts[c1.code].add(c2.code)
+                conflicts[c2.code].add(c1.code)
+    return conflicts
+
+
+def main(args):
+    for size in args.sizes:
+        n_courses, n_students = (int(x) for x in size.split(":"))
+        courses, course_students = generate_workspace(n_courses, n_students)
+
+        started = time.perf_counter()
+        graph = build_conflict_graph(courses, course_students)
+        elapsed = time.perf_counter() - started
+        edges = sum(len(v) for v in graph.values()) // 2
+        line = f"{n_courses:>6} courses {n_students:>7} students {edges:>9} edges: inverted index {elapsed * 1000:8.1f} ms"
+
+        if n_courses <= args.legacy_max_courses:
+            started = time.perf_counter()
+            legacy = legacy_conflict_graph(courses, course_students)
+            legacy_elapsed = time.perf_counter() - started
+            if legacy != graph:
+                print(line)
+                print("  MISMATCH against the pairwise builder")
+                return 1
+            line += f" | pairwise {legacy_elapsed * 1000:9.1f} ms ({legacy_elapsed / elapsed:.0f}x), identical"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="COURSES:STUDENTS pairs")
+    parser.add_argument("--legacy-max-courses", type=int, default=1000,
+                        help="also run the pairwise builder up to this many courses")
+    sys.exit(main(parser.parse_args()))
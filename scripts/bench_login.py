@@ -0,0 +1,108 @@
+"""
+Login storm benchmark.
+
+Fires concurrent /auth/login requests at the API in-process while a probe
+keeps hitting an unrelated endpoint, then reports login throughput and the
+probe's latency percentiles with and without logins in flight. Runs on the
+in-memory backend unless DB_BACKEND is set:
+
+    GROQ_API_KEY=x TAVILY_API_KEY=x python scripts/bench_login.py --logins 64 --concurrency 16
+    PASSWORD_HASH_WORKERS=2 GROQ_API_KEY=x TAVILY_API_KEY=x python scripts/bench_login.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DB_BACKEND", "memory")
+
+import httpx
+
+import fast_api_server
+from auth_utils import create_access_token, get_password_hash, password_hash_pool
+from db import create_user, create_workspace, create_building
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] * 1000 if ordered else 0.0
+
+
+async def probe(client: httpx.AsyncClient, url: str, headers: dict, stop: asyncio.Event, interval: float) -> list:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def seed(users: int):
+    password_hash = get_password_hash(PASSWORD)
+    for i in range(users):
+        await create_user({"email": f"bench{i}@campus.test", "full_name": f"Bench {i}", "password_hash": password_hash})
+    owner = await fast_api_server.get_user_by_email("bench0@campus.test")
+    ws_id = await create_workspace({"name": "Bench", "owner_id": owner["_id"], "members": [owner["_id"]]})
+    await create_building({"id": "B1", "name": "Main", "workspace_id": ws_id})
+    return ws_id
+
+
+async def run(args):
+    ws_id = await seed(args.users)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench0@campus.test'})}"}
+    probe_url = f"/workspaces/{ws_id}/buildings"
+    transport = httpx.ASGITransport(app=fast_api_server.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Baseline: probe latency with nothing else running
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, probe_url, headers, stop, args.probe_interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await task
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        login_latencies = []
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", data={
+                    "username": f"bench{i % args.users}@campus.test", "password": PASSWORD
+                })
+                response.raise_for_status()
+                login_latencies.append(time.perf_counter() - started)
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(probe(client, probe_url, headers, stop, args.probe_interval))
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        under_load = await task
+
+    print(f"password hash workers: {password_hash_pool.workers}")
+    print(f"logins: {args.logins} at concurrency {args.concurrency} in {elapsed:.2f}s "
+          f"({args.logins / elapsed:.1f}/s), p50 {percentile(login_latencies, 50):.0f} ms, "
+          f"p99 {percentile(login_latencies, 99):.0f} ms")
+    for label, samples in (("idle", baseline), ("during logins", under_load)):
+        print(f"probe {label}: {len(samples)} requests, p50 {percentile(samples, 50):.1f} ms, "
+              f"p99 {percentile(samples, 99):.1f} ms, max {max(samples) * 1000 if samples else 0:.1f} ms")
+    print(f"pool: {password_hash_pool.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--probe-interval", type=float, default=0.005, help="seconds between probe requests")
+    parser.add_argument("--baseline-seconds", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
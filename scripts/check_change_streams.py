@@ -0,0 +1,76 @@
+"""
+Cross-worker cache coherence check.
+
+Warms this process's reference cache, then writes through a *separate*
+MongoDB client (standing in for another uvicorn worker) and waits for the
+change-stream watcher to invalidate the cached entry. Needs a replica set;
+a local single-node one is enough:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 &
+    mongosh --eval "rs.initiate()"
+    MONGODB_URI=mongodb://localhost:27017/?replicaSet=rs0 python scripts/check_change_streams.py
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from db import (
+    MONGODB_URI, DB_NAME, get_all_rooms, reference_cache, watch_cache_invalidations
+)
+
+TIMEOUT_SECONDS = 10
+
+
+async def wait_for(predicate, timeout: float) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def check():
+    workspace_id = f"change-stream-check-{uuid.uuid4()}"
+    other_worker = AsyncIOMotorClient(MONGODB_URI)[DB_NAME]
+
+    watcher = asyncio.create_task(watch_cache_invalidations(retry_seconds=0.5))
+    try:
+        # Give the stream time to open; its initial reset would wipe the warm-up
+        await asyncio.sleep(1)
+        if watcher.done():
+            print("Watcher exited early; is MongoDB running as a replica set?")
+            return 1
+
+        await get_all_rooms(workspace_id)
+        cache_key = ("rooms", workspace_id, None)
+        if reference_cache.get(cache_key) is None:
+            print("Reference cache was not populated")
+            return 1
+
+        await other_worker.rooms.insert_one({
+            "id": "999", "name": "Change stream probe", "capacity": 1,
+            "building_id": "X", "workspace_id": workspace_id
+        })
+
+        invalidated = await wait_for(lambda: reference_cache.get(cache_key) is None, TIMEOUT_SECONDS)
+        rooms = await get_all_rooms(workspace_id)
+        if not invalidated or len(rooms) != 1:
+            print(f"Cache was not invalidated within {TIMEOUT_SECONDS}s")
+            return 1
+
+        print("Write from another client invalidated this process's cache.")
+        return 0
+    finally:
+        watcher.cancel()
+        await other_worker.rooms.delete_many({"workspace_id": workspace_id})
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check()))
@@ -0,0 +1,583 @@
+"""
+Differential check of the in-memory backend (memory_db.py) against mongomock.
+
+Points db.py at a mirror database that forwards every collection call to a
+MemoryClient and to a mongomock-motor client, then drives every db.py
+helper through a workload with seeded data. Each call's result (documents,
+write results, raised errors) and the final contents of every collection
+must match between the two, or the script exits non-zero listing the
+diverging query shapes. It also fails when db.py uses a query/update/stage
+operator memory_db.py doesn't implement, or when a db.py helper isn't
+exercised by the workload, so new helpers can't bypass the check:
+
+    python scripts/check_memory_backend.py
+
+Change streams aren't covered: neither backend supports them.
+"""
+import asyncio
+import copy
+import functools
+import inspect
+import os
+import re
+import sys
+import types
+from datetime import datetime, timedelta, timezone
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson.objectid
+import mongomock.collection
+from bson.objectid import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+import db
+from memory_db import MemoryClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Helpers the workload can't drive on either backend
+UNCHECKED_HELPERS = {"watch_cache_invalidations"}
+# Collection methods whose results are cursors rather than awaitables
+CURSOR_METHODS = ("find", "aggregate")
+MAX_REPORTED = 20
+
+WS = str(ObjectId())
+OTHER_WS = str(ObjectId())
+
+
+def _without_sort(add):
+    # pymongo 4.11+ passes `sort` to the bulk builder; mongomock predates it
+    @functools.wraps(add)
+    def wrapper(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock bulk writes can't sort")
+        return add(self, *args, **kwargs)
+    return wrapper
+
+mongomock.collection.BulkOperationBuilder.add_update = _without_sort(mongomock.collection.BulkOperationBuilder.add_update)
+mongomock.collection.BulkOperationBuilder.add_replace = _without_sort(mongomock.collection.BulkOperationBuilder.add_replace)
+
+
+# --- Normalisation ---
+
+def normalize(value):
+    """Backend-neutral form of a result: plain containers, ms-precision naive UTC datetimes."""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, InsertOneResult):
+        return {"inserted_id": value.inserted_id}
+    if isinstance(value, InsertManyResult):
+        return {"inserted_ids": list(value.inserted_ids)}
+    if isinstance(value, UpdateResult):
+        return {"matched": value.matched_count, "modified": value.modified_count, "upserted_id": value.upserted_id}
+    if isinstance(value, DeleteResult):
+        return {"deleted": value.deleted_count}
+    if isinstance(value, BulkWriteResult):
+        return {
+            "inserted": value.inserted_count, "matched": value.matched_count, "modified": value.modified_count,
+            # mongomock numbers upserts among themselves rather than by request
+            # index (the server and memory_db use the request index), so only
+            # the upserted ids are compared
+            "deleted": value.deleted_count, "upserted": sorted(value.upserted_ids.values()),
+        }
+    return value
+
+def normalize_error(error: Exception):
+    details = getattr(error, "details", None)
+    if type(error).__name__ == "BulkWriteError" and details:
+        return {
+            "error": "BulkWriteError",
+            **{k: details.get(k, 0) for k in ("nInserted", "nUpserted", "nMatched", "nModified", "nRemoved")},
+            "writeErrors": sorted((e["index"], e.get("code")) for e in details.get("writeErrors", [])),
+        }
+    # mongomock raises its own subclasses of the pymongo errors
+    for cls in type(error).__mro__:
+        if cls.__module__.startswith("pymongo"):
+            return {"error": cls.__name__, "code": getattr(error, "code", None)}
+    return {"error": type(error).__name__}
+
+def canonical(value):
+    # Field order isn't part of a document's identity when sorting unordered results
+    if isinstance(value, dict):
+        return sorted((k, canonical(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [canonical(v) for v in value]
+    return repr(value)
+
+def unordered(docs: list) -> list:
+    return sorted(docs, key=lambda doc: repr(canonical(doc)))
+
+def shape(value):
+    """A call's arguments with values replaced by their type, for reporting."""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [shape(v) for v in value[:1]]
+    if hasattr(value, "_filter") or hasattr(value, "_doc"):
+        # pymongo bulk requests (InsertOne, UpdateMany, ...)
+        return f"{type(value).__name__}({shape(getattr(value, '_filter', None) or value._doc)!r})"
+    return type(value).__name__
+
+
+# --- Mirror ---
+
+class SameObjectIds:
+    """
+    Replays the ObjectId counter (and freezes its clock) so both backends
+    generate identical ids for inserted and upserted documents.
+    """
+
+    def __enter__(self):
+        self.start = bson.objectid.ObjectId._inc
+        self.clock = bson.objectid.time
+        now = int(self.clock.time())
+        bson.objectid.time = types.SimpleNamespace(time=lambda: now)
+        return self
+
+    def rewind(self):
+        self.after_first = bson.objectid.ObjectId._inc
+        bson.objectid.ObjectId._inc = self.start
+
+    def __exit__(self, *exc):
+        bson.objectid.time = self.clock
+        bson.objectid.ObjectId._inc = max(self.after_first, bson.objectid.ObjectId._inc)
+
+
+class Mirror:
+    def __init__(self, memory, reference):
+        self.memory = memory
+        self.reference = reference
+        self.calls = 0
+        self.mismatches = []
+
+    def compare(self, label: str, memory_result, reference_result):
+        self.calls += 1
+        if memory_result != reference_result:
+            self.mismatches.append((label, memory_result, reference_result))
+
+
+class MirrorCursor:
+    def __init__(self, collection: "MirrorCollection", method: str, args, kwargs):
+        self.collection = collection
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.chain = []
+        self.results = None
+
+    def __getattr__(self, name):
+        if name not in ("sort", "skip", "limit", "batch_size"):
+            raise AttributeError(name)
+        def chained(*args):
+            self.chain.append((name, args))
+            return self
+        return chained
+
+    def ordered(self) -> bool:
+        if self.method == "aggregate":
+            return any("$sort" in stage for stage in self.args[0])
+        return any(name == "sort" for name, _ in self.chain) or "sort" in self.kwargs
+
+    async def run(self, target, args, kwargs) -> list:
+        cursor = getattr(target, self.method)(*args, **kwargs)
+        for name, chain_args in self.chain:
+            cursor = getattr(cursor, name)(*chain_args)
+        return await cursor.to_list(length=None)
+
+    async def materialize(self) -> list:
+        if self.results is None:
+            mirror, name = self.collection.mirror, self.collection.name
+            reference_args = copy.deepcopy((self.args, self.kwargs))
+            memory_docs = await self.run(self.collection.memory, self.args, self.kwargs)
+            reference_docs = await self.run(self.collection.reference, *reference_args)
+            mine, theirs = normalize(memory_docs), normalize(reference_docs)
+            if not self.ordered():
+                mine, theirs = unordered(mine), unordered(theirs)
+            label = f"{name}.{self.method}({shape(self.args)}) {[(n, shape(a)) for n, a in self.chain]}"
+            mirror.compare(label, mine, theirs)
+            self.results = memory_docs
+        return self.results
+
+    async def to_list(self, length=None) -> list:
+        docs = await self.materialize()
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.materialize():
+            yield doc
+
+
+class MirrorCollection:
+    def __init__(self, mirror: Mirror, name: str):
+        self.mirror = mirror
+        self.name = name
+        self.memory = mirror.memory[name]
+        self.reference = mirror.reference[name]
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        if method in CURSOR_METHODS:
+            return lambda *args, **kwargs: MirrorCursor(self, method, args, kwargs)
+
+        async def call(*args, **kwargs):
+            reference_args, reference_kwargs = copy.deepcopy((args, kwargs))
+            outcomes = []
+            with SameObjectIds() as ids:
+                for target, call_args, call_kwargs in (
+                    (self.memory, args, kwargs), (self.reference, reference_args, reference_kwargs)
+                ):
+                    try:
+                        result = await getattr(target, method)(*call_args, **call_kwargs)
+                        outcomes.append((result, normalize(result), None))
+                    except Exception as e:
+                        outcomes.append((None, normalize_error(e), e))
+                    if target is self.memory:
+                        ids.rewind()
+            (result, mine, error), (_, theirs, _) = outcomes
+            if method == "distinct" and error is None:
+                mine, theirs = unordered(mine), unordered(theirs)
+            self.mirror.compare(f"{self.name}.{method}({shape(args)}, {shape(kwargs)})", mine, theirs)
+            if error is not None:
+                raise error
+            return result
+        return call
+
+
+class MirrorDatabase:
+    def __init__(self, mirror: Mirror):
+        self.mirror = mirror
+
+    def __getitem__(self, name: str) -> MirrorCollection:
+        return MirrorCollection(self.mirror, name)
+
+    def __getattr__(self, name: str) -> MirrorCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class MirrorClient:
+    def close(self):
+        pass
+
+
+# --- Static Checks ---
+
+def missing_operators() -> list:
+    """Operators db.py spells as dict keys that memory_db.py never mentions."""
+    with open(os.path.join(ROOT, "db.py")) as f:
+        used = set(re.findall(r"""["'](\$[A-Za-z]+)["']\s*:""", f.read()))
+    with open(os.path.join(ROOT, "memory_db.py")) as f:
+        known = set(re.findall(r"""["'](\$[A-Za-z]+)["']""", f.read()))
+    return sorted(used - known)
+
+def track_helpers() -> set:
+    """Wraps every db.py coroutine and async generator to record which ones ran."""
+    called = set()
+    for name, fn in list(vars(db).items()):
+        if getattr(fn, "__module__", None) != db.__name__:
+            continue
+        if inspect.iscoroutinefunction(fn):
+            async def wrapper(*args, __fn=fn, __name=name, **kwargs):
+                called.add(__name)
+                return await __fn(*args, **kwargs)
+        elif inspect.isasyncgenfunction(fn):
+            async def wrapper(*args, __fn=fn, __name=name, **kwargs):
+                called.add(__name)
+                async for item in __fn(*args, **kwargs):
+                    yield item
+        else:
+            continue
+        setattr(db, name, wrapper)
+    return called
+
+def async_helpers() -> set:
+    return {
+        name for name, fn in vars(db).items()
+        if inspect.iscoroutinefunction(fn) or inspect.isasyncgenfunction(fn)
+    }
+
+
+# --- Workload ---
+
+async def collect(agen) -> list:
+    return [item async for item in agen]
+
+async def workload():
+    """Calls every db.py helper with data shaped like real workspaces."""
+    await db.ensure_indexes()
+    year = datetime.now(timezone.utc).year
+
+    # Users, workspaces, invitations
+    owner_id = await db.create_user({"email": "owner@campus.test", "name": "Owner", "password_hash": "x"})
+    try:
+        await db.create_user({"email": "owner@campus.test", "name": "Again"})
+    except ValueError:
+        pass
+    await db.get_user_by_email("owner@campus.test")
+    await db.get_cached_user("owner@campus.test")
+    await db.get_cached_user("nobody@campus.test")
+    workspace_id = await db.create_workspace({"name": "Check", "owner_id": owner_id, "members": [owner_id]})
+    await db.add_member_to_workspace(workspace_id, "member-1")
+    await db.add_member_to_workspace(workspace_id, "member-1")
+    await db.get_workspaces_for_user("member-1")
+    await db.get_workspace_by_id(workspace_id)
+    await db.get_workspace_by_id("not-an-id")
+    await db.get_workspace_members(workspace_id)
+    await db.get_workspace_members(str(ObjectId()))
+    await db.update_workspace(workspace_id, {"_id": workspace_id, "name": "Renamed"})
+    await db.create_invitation({"token": "t1", "workspace_id": workspace_id, "status": "pending"})
+    await db.update_invitation_status("t1", "accepted")
+    await db.get_invitation_by_token("t1")
+    await db.get_invitation_by_token("missing")
+
+    # Reference data
+    await db.create_building({"id": "B1", "name": "Main", "workspace_id": WS})
+    await db.create_department({"id": "D1", "name": "CS", "workspace_id": WS})
+    await db.create_degree({"id": "G1", "name": "B.Tech", "workspace_id": WS})
+    await db.create_program({"id": "P1", "name": "CSE", "workspace_id": WS})
+    await db.create_program({"id": "P2", "name": "ECE", "workspace_id": WS})
+    for i in range(6):
+        await db.create_room({
+            "id": f"R{i}", "name": f"Room {i}", "capacity": 20 + i, "rows": 4, "columns": 5,
+            "building_id": "B1" if i % 2 else "B2", "workspace_id": WS
+        })
+    for code, semester, programs, batches in (
+        ("CS101", 1, ["P1"], [year]), ("MA101", 1, ["P1", "P2"], [year]),
+        ("EC201", 3, ["P2"], [year - 1]), ("HS100", 1, [], [year, year - 1]),
+    ):
+        await db.create_course({
+            "code": code, "name": code, "semester": semester, "program_ids": programs,
+            "batch_ids": batches, "workspace_id": WS
+        })
+    await db.get_all_buildings(WS)
+    await db.get_all_departments(WS)
+    await db.get_all_degrees(WS)
+    await db.get_all_programs(WS)
+    await db.get_all_rooms(WS, db.ROOM_ALLOCATION_FIELDS)
+    await collect(db.iter_rooms(WS))
+    await db.get_rooms_by_building(WS, "B1")
+    await db.get_rooms_by_ids(WS, ["R1", "R4", "R9"], db.ROOM_ALLOCATION_FIELDS)
+    await db.get_all_courses(WS, db.COURSE_SCHEDULING_FIELDS)
+    await collect(db.iter_courses(WS))
+    await db.find_courses(WS, codes=["CS101", "EC201", "XX000"])
+    await db.find_courses(WS, semester=1, batch_year=year, program_ids=["P1"], projection=db.COURSE_SCHEDULING_FIELDS)
+    await db.get_reference_json("rooms", WS, lambda docs: repr(docs).encode(), "repr")
+
+    # Exam cycles, before and after students arrive
+    cycle_id = await db.create_exam_cycle({
+        "name": "Sem 1", "semester": 1, "batch_year": year, "workspace_id": WS, "student_ids": [], "program_ids": []
+    })
+    await db.create_exam_cycle({
+        "name": "Sem 3", "semester": 3, "batch_year": year - 1, "workspace_id": WS, "student_ids": [], "program_ids": []
+    })
+
+    # Students: inserts, defaults left unset, duplicate roll numbers, upserts
+    students = [
+        {"id": f"S{i:03}", "name": f"Student {i}", "workspace_id": WS,
+         "program_id": "P1" if i % 3 else "P2", "semester": 1 if i % 4 else 3,
+         "batch_year": year if i % 4 else year - 1,
+         "enrolled_courses": ["CS101", "MA101"] if i % 4 else ["EC201"]}
+        for i in range(40)
+    ]
+    for s in students[30:]:
+        del s["semester"], s["batch_year"]
+    await db.bulk_write_students(students[:35], chunk_size=16)
+    await db.create_student({"id": "S000", "name": "Same roll", "workspace_id": WS, "program_id": "P2", "enrolled_courses": ["HS100"]})
+    await db.bulk_write_students(
+        [{**s, "name": s["name"].upper()} for s in students[20:]] + [{"id": "S999", "workspace_id": WS, "enrolled_courses": ["CS101"]}],
+        upsert=True, chunk_size=8
+    )
+    await db.create_student({"id": "X1", "name": "Other", "workspace_id": OTHER_WS, "enrolled_courses": ["CS101"]})
+
+    await db.get_all_students(WS, db.STUDENT_ALLOCATION_FIELDS)
+    await db.get_filtered_students(WS, batch_year=year, program_id="P1", semester=1)
+    await db.get_filtered_students(WS, semester=3)
+    page, cursor = await db.get_students_page(WS, limit=7, sort="name", descending=True)
+    while cursor:
+        page, cursor = await db.get_students_page(WS, limit=7, after=cursor, sort="name", descending=True)
+    await db.get_students_page(WS, limit=5, semester=1, batch_year=year, program_id="P1")
+    await db.get_student_batch_years(WS)
+    await db.get_cycle_membership(WS, 1, year)
+    await db.get_cycle_membership(WS, 3, year - 1)
+    enrollments = await db.get_course_enrollments(WS, ["CS101", "EC201", "HS100", "XX000"])
+    await db.get_students_by_ids(WS, enrollments.get("CS101", [])[:5] + ["bad-id"], db.STUDENT_ALLOCATION_FIELDS)
+    await db.get_exam_cycle_by_id(WS, cycle_id, db.EXAM_CYCLE_SCHEDULING_FIELDS)
+    await db.get_exam_cycle_by_id(WS, "bad-id")
+    await db.get_all_exam_cycles(WS)
+
+    # Generic CRUD on students and reference collections
+    first = (await db.get_students_page(WS, limit=3))[0]
+    await db.update_document("students", first[0]["_id"], {"semester": 3, "batch_year": year - 1, "enrolled_courses": ["EC201"]}, WS)
+    await db.update_document("students", "S005", {"program_id": "P2"}, WS)
+    await db.update_document("students", str(ObjectId()), {"name": "Ghost"}, WS)
+    await db.update_document("rooms", "R1", {"capacity": 99}, WS)
+    await db.delete_document("students", first[1]["_id"], WS)
+    await db.delete_document("students", "S999", WS)
+    await db.delete_document("rooms", "R5", WS)
+    await db.bulk_write_documents("students", WS, [
+        {"index": 0, "op": "create", "id": None, "data": {"id": "S500", "workspace_id": WS, "semester": 1, "batch_year": year, "enrolled_courses": ["MA101"]}},
+        {"index": 1, "op": "update", "id": first[2]["_id"], "data": {"_id": "ignored", "program_id": "P2", "enrolled_courses": []}},
+        {"index": 2, "op": "update", "id": "S010", "data": {"semester": 3}},
+        {"index": 3, "op": "delete", "id": "S011", "data": None},
+        {"index": 4, "op": "delete", "id": str(ObjectId()), "data": None},
+    ])
+    await db.bulk_write_documents("rooms", WS, [
+        {"index": 0, "op": "create", "id": None, "data": {"id": "R7", "capacity": 10, "workspace_id": WS}},
+        {"index": 1, "op": "update", "id": "R2", "data": {"capacity": 1}},
+    ])
+    await db.rebuild_enrollment_index(OTHER_WS)
+    await db.backfill_enrollment_index()
+    await db.get_course_enrollments(WS, ["CS101", "MA101", "EC201", "HS100"])
+    await db.get_cycle_membership(WS, 1, year)
+
+    # Calendar and holidays
+    for day in ("2026-01-05", "2026-01-20", "2026-02-14"):
+        await db.create_calendar_event({"date": day, "title": day, "workspace_id": WS})
+    await db.get_calendar_events(WS)
+    await db.get_calendar_events(WS, start="2026-01-10")
+    await db.get_calendar_events(WS, start="2026-01-01", end="2026-01-31")
+    rule_id = await db.create_holiday_rule({"name": "Founders", "month": 3, "day": 1, "workspace_id": WS})
+    await db.get_holiday_rules(WS)
+    await db.delete_holiday_rule(rule_id, WS)
+    await db.delete_holiday_rule("bad-id", WS)
+
+    # Exam plans: legacy document, version chain, snapshots, compaction
+    await db.get_latest_exam_plan(WS)
+    database = db.get_database()
+    await database.exam_plans.insert_one({"workspace_id": WS, "timetable": [], "created_at": datetime.now(timezone.utc)})
+    await db.get_latest_exam_plan(WS)
+    for i in range(db.EXAM_PLAN_SNAPSHOT_INTERVAL + 5):
+        await db.save_exam_plan(WS, {
+            "_id": "ignored", "status": "ok", "errors": [],
+            "timetable": [{"course": f"C{j}", "date": f"2026-03-{j + 1:02}", "session": "FN"} for j in range(i % 4 + 1)],
+            "conflicts": [{"course": "C0"}] if i % 5 == 0 else [],
+        })
+    await db.get_latest_exam_plan(WS)
+    await db.get_exam_plan_version(WS, 3)
+    await db.get_exam_plan_version(WS, db.EXAM_PLAN_SNAPSHOT_INTERVAL + 2)
+    await db.get_exam_plan_version(WS, 999)
+    await db.list_exam_plan_versions(WS)
+    await db.compact_exam_plan_versions(WS, keep=10)
+    await db.compact_exam_plan_versions(WS, keep=10)
+    await db.get_exam_plan_version(WS, 3)
+    await db.list_exam_plan_versions(WS)
+
+    # Seat allocations: first save, replacement of one slot, export
+    def rooms_for(date, session, seats):
+        return [{
+            "exam_date": date, "exam_session": session, "building_id": "B1", "room_id": room, "room_name": room,
+            "allocations": [{"seat": f"{room}-{n}", "student_id": f"S{n:03}", "course_code": "CS101"} for n in range(seats)],
+        } for room in ("R1", "R3")]
+    await database.seat_allocations.insert_one({"workspace_id": WS, "exam_date": "2026-03-01", "exam_session": "AN", "room_id": "R1"})
+    await db.save_seat_allocations(WS, [("2026-03-01", "FN"), ("2026-03-01", "AN")],
+                                   rooms_for("2026-03-01", "FN", 4) + rooms_for("2026-03-01", "AN", 3))
+    await db.save_seat_allocations(WS, [("2026-03-01", "FN")], rooms_for("2026-03-01", "FN", 2))
+    await collect(db.iter_seat_allocations(WS, {"_id": 0, "allocation_id": 0}))
+
+    # Assignments, rosters, submissions
+    assignment_ids = []
+    for i in range(4):
+        roster = [{"roll_number": f"R{n}", "name": f"Roll {n}"} for n in range(5)] + [{"roll_number": "R0", "name": "Dup"}]
+        assignment_ids.append(await db.create_assignment({
+            "title": f"A{i}", "workspace_id": WS,
+            "deadline": (datetime.now(timezone.utc) + timedelta(hours=6 if i % 2 else 72)).isoformat(),
+        }, roster))
+    await database.assignments.insert_one({"title": "Legacy", "workspace_id": WS, "students": [{"roll_number": "L1"}]})
+    await db.migrate_assignment_rosters()
+    await db.get_roster_entry(assignment_ids[0], "R3")
+    await db.get_roster_entry(assignment_ids[0], "R9")
+    await collect(db.iter_roster(assignment_ids[0]))
+    for i, assignment_id in enumerate(assignment_ids[:3]):
+        for n in range(i + 2):
+            await db.create_submission({"assignment_id": assignment_id, "roll_number": f"R{n}", "is_late": n % 2 == 1})
+    try:
+        await db.create_submission({"assignment_id": assignment_ids[0], "roll_number": "R0", "is_late": False})
+    except Exception:
+        pass
+    await db.get_submission_by_roll(assignment_ids[1], "R1")
+    await db.get_assignment_submissions(assignment_ids[2])
+    await db.get_submissions_page(assignment_ids[2], limit=1, is_late=False)
+    subs, cursor = await db.get_submissions_page(assignment_ids[2], limit=2)
+    await db.get_submissions_page(assignment_ids[2], limit=2, after=cursor)
+    await db.get_submission_counts(assignment_ids)
+    await db.get_submission_counts([])
+    await db.get_all_assignments(WS)
+    page, cursor = await db.get_assignments_page(WS, limit=2)
+    await db.get_assignments_page(WS, limit=2, after=cursor)
+    await db.get_assignment_by_id(assignment_ids[1], db.ASSIGNMENT_PUBLIC_FIELDS)
+    await db.get_assignment_by_id("bad-id")
+    await db.get_assignments_needing_reminder()
+    await db.update_assignment_reminder_sent(assignment_ids[1])
+    await db.get_assignments_needing_reminder()
+    await db.delete_assignment(assignment_ids[0], WS)
+    await db.delete_document("assignments", assignment_ids[1], WS)
+    await db.bulk_write_documents("assignments", WS, [{"index": 0, "op": "delete", "id": assignment_ids[2], "data": None}])
+
+    # Generation history
+    for i in range(5):
+        await db.save_generation_to_db({"topic": f"T{i}"})
+    await db.get_generation_history(limit=3)
+    history, cursor = await db.get_generation_history_page(limit=2)
+    await db.get_generation_history_page(limit=2, after=cursor)
+
+    # Workspace-wide deletes
+    await db.delete_all_documents("assignments", WS)
+    await db.delete_all_documents("exam_plans", WS)
+    await db.delete_all_documents("students", OTHER_WS)
+    await db.delete_all_documents("rooms", WS)
+    await db.delete_workspace(workspace_id, "someone-else")
+    await db.delete_workspace(workspace_id, owner_id)
+
+async def compare_contents(mirror: Mirror, collections: list):
+    """Every collection's documents must end up identical on both backends."""
+    for name in collections:
+        memory_docs = await mirror.memory[name].find({}).to_list(length=None)
+        reference_docs = await mirror.reference[name].find({}).to_list(length=None)
+        mirror.compare(f"{name} contents", unordered(normalize(memory_docs)), unordered(normalize(reference_docs)))
+
+
+async def check():
+    failures = 0
+
+    missing = missing_operators()
+    if missing:
+        print(f"db.py uses operators memory_db.py doesn't implement: {', '.join(missing)}")
+        failures += 1
+
+    mirror = Mirror(MemoryClient()[db.DB_NAME], AsyncMongoMockClient()[db.DB_NAME])
+    db.client, db.db = MirrorClient(), MirrorDatabase(mirror)
+    helpers = async_helpers()
+    called = track_helpers()
+    await workload()
+    await compare_contents(mirror, sorted(set(db.INDEXES) | {"enrollments", "exam_plan_heads"}))
+
+    unexercised = sorted(helpers - called - UNCHECKED_HELPERS)
+    if unexercised:
+        print(f"db.py helpers the workload never calls: {', '.join(unexercised)}")
+        failures += 1
+
+    for label, mine, theirs in mirror.mismatches[:MAX_REPORTED]:
+        print(f"\nMISMATCH {label}\n  memory:   {mine!r}\n  mongomock: {theirs!r}")
+    if mirror.mismatches:
+        print(f"\n{len(mirror.mismatches)} of {mirror.calls} mirrored calls diverged.")
+        failures += 1
+    else:
+        print(f"All {mirror.calls} mirrored calls over {len(called)} db.py helpers matched mongomock.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(check()))
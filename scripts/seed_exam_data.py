@@ -5,7 +5,7 @@ import sys
 # specific to allow importing from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from db import get_database, create_user, create_workspace
+from db import get_database, create_user, create_workspace, rebuild_enrollment_index
 from exam_agent.models import Building, Department, Room, Student, User, Workspace
 from auth_utils import get_password_hash
 
@@ -20,6 +20,7 @@ async def seed_data():
     await db.buildings.delete_many({})
     await db.rooms.delete_many({})
     await db.students.delete_many({})
+    await db.enrollments.delete_many({})
     await db.invitations.delete_many({})
 
     # --- User ---
@@ -107,6 +108,7 @@ async def seed_data():
         
     print("Seeding Students...")
     await db.students.insert_many([s.model_dump() for s in students])
+    await rebuild_enrollment_index(workspace_id)
     
     print(f"Seeding Complete! Demo User: demo@campus.com / password")
 
@@ -0,0 +1,185 @@
+"""
+Index verification suite.
+
+Bootstraps the index registry from db.py, runs `explain()` on every query
+shape the db.py helpers issue and exits non-zero if any winning plan falls
+back to a COLLSCAN. Run it against a scratch database:
+
+    MONGODB_URI=mongodb://localhost:27017 python scripts/verify_indexes.py
+"""
+import asyncio
+import os
+import sys
+
+# specific to allow importing from parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timezone, timedelta
+
+from bson.objectid import ObjectId
+
+from db import get_database, ensure_indexes, COLLECTION_NAME
+
+WS = "000000000000000000000000"
+NOW = datetime.now(timezone.utc)
+LAST_ID = ObjectId()
+
+
+def keyset(base: dict, field: str, value, op: str) -> dict:
+    """The filter find_page issues for a page after (value, LAST_ID)."""
+    return {"$and": [base, {"$or": [{field: {op: value}}, {field: value, "_id": {op: LAST_ID}}]}]}
+
+# (label, collection, filter, sort)
+FIND_SHAPES = [
+    ("get_generation_history_page", COLLECTION_NAME, {}, [("created_at", -1), ("_id", -1)]),
+    ("get_generation_history_page (after)", COLLECTION_NAME, keyset({}, "created_at", NOW, "$lt"), [("created_at", -1), ("_id", -1)]),
+    ("get_all_students", "students", {"workspace_id": WS}, None),
+    ("get_students_page (by id)", "students", {"workspace_id": WS}, [("id", 1), ("_id", 1)]),
+    ("get_students_page (by id, after)", "students", keyset({"workspace_id": WS}, "id", "S100", "$gt"), [("id", 1), ("_id", 1)]),
+    ("get_students_page (by name desc, after)", "students", keyset({"workspace_id": WS}, "name", "M", "$lt"), [("name", -1), ("_id", -1)]),
+    ("get_students_page (filtered)", "students", {"workspace_id": WS, "semester": 1, "batch_year": 2024}, [("id", 1), ("_id", 1)]),
+    ("get_filtered_students", "students", {"workspace_id": WS, "batch_year": 2024, "program_id": "P1", "semester": 1}, None),
+    ("get_filtered_students (semester only)", "students", {"workspace_id": WS, "semester": 1}, None),
+    ("get_cycle_membership", "students", {"workspace_id": WS, "batch_year": 2024, "semester": 1}, None),
+    ("_sync_cycle_membership (program check)", "students", {"workspace_id": WS, "batch_year": 2024, "program_id": "P1", "semester": 1}, None),
+    ("_sync_cycle_membership (cycles)", "exam_cycles", {"workspace_id": WS, "semester": 1, "batch_year": 2024}, None),
+    ("bulk_write_students (upsert prefetch)", "students", {"workspace_id": WS, "id": {"$in": ["S1", "S2"]}}, None),
+    ("students by enrolled course", "students", {"workspace_id": WS, "enrolled_courses": "CS101"}, None),
+    ("get_students_by_ids", "students", {"workspace_id": WS, "_id": {"$in": [LAST_ID]}}, None),
+    ("get_course_enrollments", "enrollments", {"workspace_id": WS, "course_code": {"$in": ["CS101", "MA101"]}}, None),
+    ("_sync_enrollments", "enrollments", {"workspace_id": WS, "course_code": "CS101"}, None),
+    ("get_all_rooms", "rooms", {"workspace_id": WS}, None),
+    ("get_rooms_by_building", "rooms", {"workspace_id": WS, "building_id": "BGB"}, None),
+    ("get_all_buildings", "buildings", {"workspace_id": WS}, None),
+    ("get_all_departments", "departments", {"workspace_id": WS}, None),
+    ("get_all_degrees", "degrees", {"workspace_id": WS}, None),
+    ("get_all_exam_cycles", "exam_cycles", {"workspace_id": WS}, None),
+    ("get_exam_cycle_by_id", "exam_cycles", {"_id": LAST_ID, "workspace_id": WS}, None),
+    ("get_rooms_by_ids", "rooms", {"workspace_id": WS, "id": {"$in": ["101", "102"]}}, None),
+    ("find_courses (cycle)", "courses", {"workspace_id": WS, "semester": 1, "batch_ids": 2024, "program_ids": {"$in": ["P1", "P2"]}}, None),
+    ("find_courses (codes)", "courses", {"workspace_id": WS, "code": {"$in": ["CS101", "MA101"]}}, None),
+    ("get_calendar_events", "calendar_events", {"workspace_id": WS}, None),
+    ("get_calendar_events (range)", "calendar_events", {"workspace_id": WS, "date": {"$gte": "2026-01-01", "$lte": "2026-01-31"}}, None),
+    ("get_holiday_rules", "holiday_rules", {"workspace_id": WS}, None),
+    ("get_all_courses", "courses", {"workspace_id": WS}, None),
+    ("get_all_programs", "programs", {"workspace_id": WS}, None),
+    ("get_user_by_email", "users", {"email": "demo@campus.com"}, None),
+    ("get_workspaces_for_user", "workspaces", {"$or": [{"owner_id": "u1"}, {"members": "u1"}]}, None),
+    ("get_invitation_by_token", "invitations", {"token": "t1"}, None),
+    ("get_latest_exam_plan (head)", "exam_plan_heads", {"workspace_id": WS}, None),
+    ("get_latest_exam_plan (legacy)", "exam_plans", {"workspace_id": WS, "version": {"$exists": False}}, [("created_at", -1)]),
+    ("get_exam_plan_version (snapshot)", "exam_plans", {"workspace_id": WS, "kind": "snapshot", "version": {"$lte": 7}}, [("version", -1)]),
+    ("get_exam_plan_version (deltas)", "exam_plans", {"workspace_id": WS, "version": {"$gt": 3, "$lte": 7}}, [("version", 1)]),
+    ("list_exam_plan_versions", "exam_plans", {"workspace_id": WS, "version": {"$exists": True}}, [("version", -1)]),
+    ("get_all_assignments", "assignments", {"workspace_id": WS}, [("created_at", -1)]),
+    ("get_assignments_page (after)", "assignments", keyset({"workspace_id": WS}, "created_at", NOW, "$lt"), [("created_at", -1), ("_id", -1)]),
+    ("get_assignments_needing_reminder", "assignments", {
+        "reminder_sent": False,
+        "deadline": {"$gte": NOW.isoformat(), "$lte": (NOW + timedelta(hours=24)).isoformat()}
+    }, None),
+    ("get_assignment_submissions", "assignment_submissions", {"assignment_id": "a1"}, [("submitted_at", -1)]),
+    ("get_submissions_page (after)", "assignment_submissions", keyset({"assignment_id": "a1"}, "submitted_at", NOW, "$lt"), [("submitted_at", -1), ("_id", -1)]),
+    ("get_submission_by_roll", "assignment_submissions", {"assignment_id": "a1", "roll_number": "R1"}, None),
+    ("get_roster_entry", "assignment_rosters", {"assignment_id": "a1", "roll_number": "R1"}, None),
+    ("iter_roster", "assignment_rosters", {"assignment_id": "a1"}, None),
+    ("save_seat_allocations (swap slot)", "seat_allocation_slots", {
+        "workspace_id": WS, "exam_date": "2026-01-05", "exam_session": "morning"
+    }, None),
+    ("save_seat_allocations (drop replaced)", "seat_allocations", {
+        "workspace_id": WS, "exam_date": "2026-01-05", "exam_session": "morning", "allocation_id": "s1"
+    }, None),
+    ("iter_seat_allocations (current runs)", "seat_allocation_slots", {"workspace_id": WS}, None),
+    ("iter_seat_allocations", "seat_allocations", {"workspace_id": WS, "allocation_id": {"$in": ["s1", "s2"]}},
+     [("exam_date", 1), ("exam_session", 1), ("room_id", 1), ("_id", 1)]),
+    ("_delete_assignment_dependents (rosters)", "assignment_rosters", {"assignment_id": {"$in": ["a1", "a2"]}}, None),
+    ("_delete_assignment_dependents (submissions)", "assignment_submissions", {"assignment_id": {"$in": ["a1", "a2"]}}, None),
+]
+
+# delete_document / update_document fall back to the custom string `id` field
+GENERIC_CRUD_COLLECTIONS = [
+    "courses", "exams", "exam_cycles", "buildings", "rooms", "departments",
+    "students", "programs", "degrees", "exam_plans", "assignments",
+]
+for _name in GENERIC_CRUD_COLLECTIONS:
+    FIND_SHAPES.append((f"delete_document/update_document ({_name})", _name, {"id": "x", "workspace_id": WS}, None))
+    FIND_SHAPES.append((f"bulk_write_documents prefetch ({_name})", _name, {
+        "workspace_id": WS, "$or": [{"_id": {"$in": [LAST_ID]}}, {"id": {"$in": ["x"]}}]
+    }, None))
+
+# (label, command)
+COMMAND_SHAPES = [
+    ("list_batches", {"distinct": "students", "key": "batch_year", "query": {"workspace_id": WS}}),
+    ("rebuild_enrollment_index", {"aggregate": "students", "cursor": {}, "pipeline": [
+        {"$match": {"workspace_id": WS}},
+        {"$unwind": "$enrolled_courses"},
+        {"$group": {"_id": "$enrolled_courses", "student_ids": {"$addToSet": "$_id"}}}
+    ]}),
+    ("get_submission_counts", {"aggregate": "assignment_submissions", "cursor": {}, "pipeline": [
+        {"$match": {"assignment_id": {"$in": ["a1", "a2"]}}},
+        {"$group": {"_id": "$assignment_id", "submitted": {"$sum": 1}}}
+    ]}),
+]
+
+
+def collect_stages(plan: dict) -> list:
+    """Flattens every `stage` name in an explain plan tree."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(collect_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(collect_stages(item))
+    return stages
+
+
+def winning_plans(explain: dict) -> list:
+    """Returns the winning plans of a (possibly sharded or aggregate) explain result."""
+    if "queryPlanner" in explain:
+        return [explain["queryPlanner"].get("winningPlan", {})]
+    plans = []
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            plans.extend(winning_plans(stage["$cursor"]))
+    return plans
+
+
+async def verify():
+    db = get_database()
+    await ensure_indexes()
+
+    failures = []
+
+    for label, collection, query, sort in FIND_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = collect_stages(winning_plans(explain))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"[{status:>8}] {label}: {' <- '.join(stages)}")
+        if status != "ok":
+            failures.append(label)
+
+    for label, command in COMMAND_SHAPES:
+        explain = await db.command("explain", command)
+        stages = collect_stages(winning_plans(explain))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"[{status:>8}] {label}: {' <- '.join(stages)}")
+        if status != "ok":
+            failures.append(label)
+
+    if failures:
+        print(f"\n{len(failures)} query shape(s) fell back to COLLSCAN:")
+        for label in failures:
+            print(f"  - {label}")
+        return 1
+
+    print(f"\nAll {len(FIND_SHAPES) + len(COMMAND_SHAPES)} query shapes are index-backed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(verify()))
@@ -4,6 +4,8 @@ from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
 
+from db import rebuild_enrollment_index
+
 load_dotenv()
 
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
@@ -55,6 +57,7 @@ async def seed_data():
     await db.courses.delete_many({"workspace_id": workspace_id})
     await db.exam_cycles.delete_many({"workspace_id": workspace_id})
     await db.students.delete_many({"workspace_id": workspace_id})
+    await db.enrollments.delete_many({"workspace_id": workspace_id})
     
     # Degrees
     degrees_data = [
@@ -204,6 +207,8 @@ async def seed_data():
 
     await db.students.insert_many(students)
     print(f"Created {len(students)} students")
+    courses_indexed = await rebuild_enrollment_index(workspace_id)
+    print(f"Rebuilt the enrollment index ({courses_indexed} courses)")
     
     print("\n✅ Mock data seeded successfully!")
     print(f"Login with: demo@campus.com / password")